@@ -0,0 +1,721 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+
+PasswordMaker - Python benchmarks
+=================================
+
+Create and manage passwords.
+
+
+Copyright (C):
+
+    2018      Martin Manns
+              <mmanns@gmx.net>
+
+    This file is part of PasswordMaker.
+
+    PasswordMaker is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Foobar is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with Foobar.  If not, see <https://www.gnu.org/licenses/>.
+
+Run all benchmarks with
+
+    python benchpwmlib.py
+
+or single benchmarks with
+
+    python benchpwmlib.py rstr2any_batch
+
+"""
+
+import hashlib
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+
+import attr
+from timeit import default_timer
+
+from pwmlib import HAS_NUMPY, FULL_CHARSET
+from pwmlib import PwmHashUtils, PwmSettings, PwmSettingsList
+from pwmlib import STRETCHING_ALGORITHMS, STRETCHING_ALGORITHM_2_HASH_FUNC
+from pwmlib import generatepassword, generatepasswordfrom
+from pwmlib import ALGORITHMS, generatepasswords_all, find_matching_algorithm
+from pwmlib import generatepasswordsfrom, rstr2any_batch
+from pwmlib import LeetKeyCache, SecretKey
+from pwmlib import complete_profiles, list_profiles, load_profile_index
+from pwmlib import resolve_profile, save_profile_index
+from pwmarchive import PwmArchive, export_archive
+from pwmurl import UrlNormalizer, ProfileIndex
+from pwmsink import SINK_FORMATS, open_sink, write_passwords
+from pwmbulk import export_profiles, import_profiles
+from pwmrecover import SearchSpace, recover_settings
+from pwmrotate import ROTATION_FIELDS, rotate_passwords
+
+
+def _timeit(func, repeat=3):
+    """Returns the best runtime of func in seconds out of repeat runs"""
+
+    best = None
+    for _ in range(repeat):
+        start = default_timer()
+        func()
+        elapsed = default_timer() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def bench_rstr2any_batch():
+    """Compares rstr2any_batch with rstr2any for N = 1, 100 and 100k"""
+
+    print("rstr2any_batch (NumPy: {})".format(HAS_NUMPY))
+
+    hash_utils = PwmHashUtils("md5", FULL_CHARSET)
+
+    for n_digests in (1, 100, 100000):
+        digests = [hashlib.md5(str(i).encode("utf-8")).digest()
+                   for i in range(n_digests)]
+
+        def scalar():
+            """Scalar reference path"""
+            return [hash_utils.rstr2any(digest) for digest in digests]
+
+        def batch():
+            """Batch path"""
+            return rstr2any_batch(digests, FULL_CHARSET)
+
+        assert scalar() == batch()
+
+        scalar_time = _timeit(scalar)
+        batch_time = _timeit(batch)
+        print("  N={:<8} scalar {:10.4f} s  batch {:10.4f} s  speedup {:6.2f}"
+              .format(n_digests, scalar_time, batch_time,
+                      scalar_time / batch_time))
+
+
+def bench_rstr2any_head():
+    """Compares full and early-exit charset conversion for Length 1 to 128"""
+
+    print("rstr2any with max_digits")
+
+    hash_utils = PwmHashUtils("sha256", FULL_CHARSET)
+    digests = [hashlib.sha256(str(i).encode("utf-8")).digest()
+               for i in range(2000)]
+
+    def derive(length, head):
+        """Emulates the rounds of generatepassword for every digest"""
+        for digest in digests:
+            password = ""
+            while len(password) < length:
+                if head:
+                    password += hash_utils.rstr2any(
+                        digest, max_digits=length - len(password))
+                else:
+                    password += hash_utils.rstr2any(digest)
+
+    for length in (1, 2, 4, 8, 16, 32, 64, 128):
+        full_time = _timeit(lambda: derive(length, False))
+        head_time = _timeit(lambda: derive(length, True))
+        print("  Length={:<4} full {:8.4f} s  early exit {:8.4f} s  "
+              "speedup {:5.2f}".format(length, full_time, head_time,
+                                       full_time / head_time))
+
+
+def bench_normalize_url():
+    """Measures bulk URL normalisation with 1M URLs from 10k hosts"""
+
+    print("UrlNormalizer.normalize_many")
+
+    urls = ["https://www{}.site{}.co.uk/path/{}?q={}".format(i % 3, i % 10000,
+                                                          i, i)
+            for i in range(1000000)]
+
+    for cache_size in (0, 65536):
+        normalizer = UrlNormalizer(cache_size=cache_size)
+
+        def run():
+            """Normalises all urls"""
+            for _ in normalizer.normalize_many(urls):
+                pass
+
+        elapsed = _timeit(run, repeat=1)
+        print("  cache_size={:<8} {:8.3f} s  {:12.0f} URLs/s".format(
+            cache_size, elapsed, len(urls) / elapsed))
+
+
+def bench_profile_index():
+    """Measures ProfileIndex lookups per second for 50k profiles"""
+
+    print("ProfileIndex.resolve")
+
+    n_profiles = 50000
+    index = ProfileIndex()
+    for i in range(n_profiles):
+        if i % 10 == 0:
+            patterns = "/^https://intranet{}[.]/".format(i)
+        elif i % 2:
+            patterns = "*.site{}.com".format(i)
+        else:
+            patterns = "login.site{}.com".format(i)
+        index.add("profile{}".format(i), patterns)
+
+    kinds = [
+        ("exact", ["https://login.site{}.com/".format(i)
+                   for i in range(2, n_profiles, 10)]),
+        ("suffix", ["https://www.site{}.com/".format(i)
+                    for i in range(1, n_profiles, 2)]),
+        ("miss", ["https://www.unknown{}.org/".format(i)
+                  for i in range(1000)]),
+    ]
+
+    for kind, urls in kinds:
+        def run():
+            """Resolves all urls"""
+            for url in urls:
+                index.resolve(url)
+
+        elapsed = _timeit(run)
+        print("  {:<8} {:12.0f} lookups/s".format(kind, len(urls) / elapsed))
+
+
+def bench_settings_list():
+    """Measures PwmSettingsList operations with 100k profiles"""
+
+    print("PwmSettingsList with 100k profiles")
+
+    names = ["profile{}".format(i) for i in range(100000)]
+    settings = PwmSettings()
+    settings_list = PwmSettingsList()
+
+    def add():
+        """Adds all profiles"""
+        for name in names:
+            settings_list.add(name, settings)
+
+    def lookup():
+        """Selects each profile"""
+        for name in names:
+            settings_list.current = name
+            settings_list.get_pwm_settings()
+
+    def rename():
+        """Renames each profile twice"""
+        for name in names:
+            settings_list.rename(name, name + "_")
+            settings_list.rename(name + "_", name)
+
+    def contains():
+        """Checks each name for existence"""
+        for name in names:
+            assert name in settings_list
+
+    def remove():
+        """Removes all profiles"""
+        for name in names:
+            settings_list.remove(name)
+
+    for label, func in (("add", add), ("lookup", lookup),
+                        ("rename x2", rename), ("contains", contains),
+                        ("remove", remove)):
+        elapsed = _timeit(func, repeat=1)
+        print("  {:<10} {:8.3f} s  {:12.0f} ops/s".format(
+            label, elapsed, len(names) / elapsed))
+
+
+def bench_profile_list():
+    """Measures loading 10k profile names into the GUI profile list
+
+    Requires a display.
+
+    """
+
+    print("ProfileListWidget with 10k profiles")
+
+    try:
+        import tkinter as tk
+        from pwmgui import ProfileListWidget
+        root = tk.Tk()
+    except Exception as err:  # No tkinter or no display
+        print("  skipped: {}".format(err))
+        return
+
+    names = ["default"] + ["profile{}".format(i) for i in range(10000)]
+
+    listbox = tk.Listbox(root)
+    profile_list = ProfileListWidget(root)
+
+    def full_reload():
+        """Previous update_listbox: delete and reinsert all rows"""
+        listbox.delete(0, "end")
+        for name in names:
+            listbox.insert("end", name)
+            listbox.select_set(0)
+        root.update_idletasks()
+
+    def virtual_reload():
+        """ProfileListWidget.set_names"""
+        profile_list.set_names(names, selected="default")
+        root.update_idletasks()
+
+    for label, func in (("full", full_reload), ("virtual", virtual_reload)):
+        print("  {:<8} {:8.4f} s".format(label, _timeit(func)))
+
+    root.destroy()
+
+
+def bench_archive():
+    """Compares startup of 50k profiles from JSON files and an archive"""
+
+    print("PwmArchive with 50k profiles")
+
+    n_profiles = 50000
+    settings_list = PwmSettingsList()
+    for i in range(n_profiles):
+        settings_list.add("profile{}".format(i),
+                          PwmSettings(URL="site{}.com".format(i)))
+
+    directory = tempfile.mkdtemp()
+    try:
+        settings_list.save(directory)
+        filepath = os.path.join(directory, "profiles.pwma")
+        export_archive(settings_list, filepath)
+
+        def json_load():
+            """Loads all JSON setting files"""
+            PwmSettingsList().load(directory)
+
+        def archive_lookup():
+            """Opens the archive and looks up one profile"""
+            with PwmArchive(filepath) as archive:
+                archive["profile{}".format(n_profiles // 2)]
+
+        print("  JSON load        {:10.4f} s".format(
+            _timeit(json_load, repeat=1)))
+        print("  archive lookup   {:10.6f} s".format(_timeit(archive_lookup)))
+        print("  archive size     {:10d} bytes".format(
+            os.path.getsize(filepath)))
+    finally:
+        shutil.rmtree(directory)
+
+
+def bench_stretching():
+    """Compares serial and parallel key stretching for 32 sites"""
+
+    print("generatepasswordsfrom with key stretching")
+
+    for algorithm in sorted(STRETCHING_ALGORITHM_2_HASH_FUNC):
+        settings_seq = [PwmSettings(URL="site{}.com".format(i),
+                                    MasterPass="asdf", Algorithm=algorithm,
+                                    Cost=12)
+                        for i in range(32)]
+
+        def serial():
+            """One site after the other"""
+            return [generatepasswordfrom(settings)
+                    for settings in settings_seq]
+
+        def parallel():
+            """Thread pool with one thread per CPU"""
+            return generatepasswordsfrom(settings_seq)
+
+        serial_time = _timeit(serial)
+        parallel_time = _timeit(parallel)
+        print("  {:<14} serial {:8.4f} s  parallel {:8.4f} s  speedup {:5.2f}"
+              .format(algorithm, serial_time, parallel_time,
+                      serial_time / parallel_time))
+
+
+def bench_default_profile():
+    """Compares the default profile fast path with the general path"""
+
+    print("Default profile fast path")
+
+    settings_seq = [PwmSettings(URL="site{}.com".format(i), MasterPass="asdf")
+                    for i in range(20000)]
+    assert [generatepasswordfrom(s) for s in settings_seq[:100]] == \
+        [generatepassword("md5", "asdf", s.URL, 8, FULL_CHARSET)
+         for s in settings_seq[:100]]
+
+    def fast():
+        """Settings that match the default profile"""
+        for settings in settings_seq:
+            generatepasswordfrom(settings)
+
+    def slow():
+        """Same passwords via the general path"""
+        for settings in settings_seq:
+            generatepassword("md5", settings.MasterPass, settings.URL, 8,
+                             FULL_CHARSET)
+
+    fast_time = _timeit(fast)
+    slow_time = _timeit(slow)
+    print("  general {:8.4f} s  fast {:8.4f} s  speedup {:5.2f}".format(
+        slow_time, fast_time, slow_time / fast_time))
+
+
+def bench_sinks():
+    """Measures streaming output and its peak memory for 10k and 50k jobs"""
+
+    print("Output sinks")
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        for sink_format in SINK_FORMATS:
+            filepath = os.path.join(tmpdir, "out." + sink_format)
+            for n_jobs in (10000, 50000):
+                settings_iter = (PwmSettings(URL="site{}.com".format(i),
+                                             MasterPass="asdf")
+                                 for i in range(n_jobs))
+                tracemalloc.start()
+                start = default_timer()
+                with open_sink(sink_format, filepath) as sink:
+                    write_passwords(settings_iter, sink)
+                elapsed = default_timer() - start
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                print("  {:<6} jobs={:<6} {:9.0f} records/s  peak {:6.0f} kB"
+                      .format(sink_format, n_jobs, n_jobs / elapsed,
+                              peak / 1024.0))
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+def bench_rotation():
+    """Compares rotate_passwords with two generatepasswordfrom calls each"""
+
+    print("Master password rotation, 20k hmac-sha1 profiles")
+
+    names = ["site{}".format(i) for i in range(20000)]
+    pwms = [PwmSettings(URL=name + ".com", Algorithm="hmac-sha1", Length=16)
+            for name in names]
+    settings_list = PwmSettingsList(names[0], names, pwms)
+
+    tmpdir = tempfile.mkdtemp()
+    filepath = os.path.join(tmpdir, "rotation.csv")
+    try:
+        def naive():
+            """Unprimed derivation with both master passwords"""
+            with open_sink("csv", filepath, fields=ROTATION_FIELDS) as sink:
+                for name, pwm in zip(names, pwms):
+                    old = generatepasswordfrom(attr.evolve(pwm,
+                                                           MasterPass="old"))
+                    new = generatepasswordfrom(attr.evolve(pwm,
+                                                           MasterPass="new"))
+                    sink.write(pwm, Name=name, OldPassword=old,
+                               NewPassword=new)
+
+        def rotate():
+            """Primed derivation"""
+            with open_sink("csv", filepath, fields=ROTATION_FIELDS) as sink:
+                rotate_passwords(settings_list, "old", "new", sink)
+
+        naive_time = _timeit(naive, repeat=1)
+        rotate_time = _timeit(rotate, repeat=1)
+    finally:
+        shutil.rmtree(tmpdir)
+
+    print("  naive {:8.4f} s  rotate_passwords {:8.4f} s  speedup {:5.2f}"
+          .format(naive_time, rotate_time, naive_time / rotate_time))
+
+
+def bench_all_algorithms():
+    """Compares generatepasswords_all with one call per algorithm"""
+
+    print("All algorithms for one site (key stretching at cost 8)")
+
+    algorithms = ALGORITHMS + STRETCHING_ALGORITHMS
+
+    for use_leet, length in (("none", 8), ("both", 32), ("both", 128)):
+        def loop():
+            """generatepassword for each algorithm"""
+            return [generatepassword(algorithm, "master", "site.com", length,
+                                     FULL_CHARSET, use_leet=use_leet,
+                                     leet_level=9, cost=8)
+                    for algorithm in algorithms]
+
+        def shared():
+            """Shared preprocessing, concurrent hash families"""
+            return list(generatepasswords_all(
+                "master", "site.com", length, FULL_CHARSET,
+                use_leet=use_leet, leet_level=9, cost=8,
+                algorithms=algorithms).values())
+
+        assert loop() == shared()
+        loop_time = _timeit(loop)
+        shared_time = _timeit(shared)
+
+        password = generatepassword(algorithms[-1], "master", "site.com",
+                                    length, FULL_CHARSET, use_leet=use_leet,
+                                    leet_level=9, cost=8)
+
+        def find():
+            """Early stopping search for the last algorithm"""
+            return find_matching_algorithm(password, "master", "site.com",
+                                           FULL_CHARSET, use_leet=use_leet,
+                                           leet_level=9, cost=8,
+                                           algorithms=algorithms)
+
+        find_time = _timeit(find)
+        print("  leet={:<5} Length={:<4} loop {:8.4f} s  all {:8.4f} s  "
+              "find {:8.4f} s".format(use_leet, length, loop_time,
+                                      shared_time, find_time))
+
+
+def bench_startup(repeat=5):
+    """Measures the startup of fresh processes
+
+    The GUI, NumPy, pwmsink and pwmbulk are imported lazily. The eager rows
+    import them in addition for comparison.
+
+    """
+
+    print("Startup of fresh processes, best of {}".format(repeat))
+
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    commands = [
+        ("interpreter", "pass"),
+        ("import pwmlib", "import pwmlib"),
+        ("import pwmlib, eager NumPy", "import numpy, pwmlib"),
+        ("import passwordmaker", "import passwordmaker"),
+        ("import passwordmaker, eager", "import passwordmaker, pwmbulk, "
+                                        "pwmgui, pwmsink"),
+        ("passwordmaker generate",
+         "import passwordmaker; passwordmaker.cmd("
+         "['generate', '-r', 'site.com', '-m', 'key'])"),
+    ]
+    for label, code in commands:
+        def run():
+            """One fresh process"""
+            subprocess.check_call([sys.executable, "-c", code], cwd=cwd,
+                                  stdout=subprocess.DEVNULL)
+
+        try:
+            elapsed = _timeit(run, repeat)
+        except subprocess.CalledProcessError as err:  # E.g. no NumPy
+            print("  {:<28} skipped: {}".format(label, err))
+            continue
+        print("  {:<28} {:8.3f} ms".format(label, elapsed * 1e3))
+
+
+def bench_bulk_profiles(n_profiles=10000):
+    """Compares bulk profile files with one PWM_setting file per profile"""
+
+    print("Export and import of {} profiles".format(n_profiles))
+
+    settings_list = PwmSettingsList()
+    for i in range(n_profiles):
+        settings_list.add("profile{}".format(i),
+                          PwmSettings(URL="site{}.com".format(i)))
+
+    directory = tempfile.mkdtemp()
+    try:
+        results = []
+
+        def save_files():
+            """One file per profile"""
+            settings_list.save(directory)
+
+        def load_files():
+            """One file per profile"""
+            PwmSettingsList().load(directory)
+
+        results.append(("setting files", _timeit(save_files, repeat=1),
+                        _timeit(load_files, repeat=1), None))
+
+        for bulk_format in ("jsonl", "rdf"):
+            filepath = os.path.join(directory, "profiles." + bulk_format)
+
+            def export():
+                """One bulk file"""
+                export_profiles(settings_list, filepath)
+
+            def load():
+                """Streaming import"""
+                import_profiles(filepath, PwmSettingsList())
+
+            export_time = _timeit(export, repeat=1)
+            import_time = _timeit(load, repeat=1)
+            tracemalloc.start()
+            try:
+                load()
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+            results.append((bulk_format, export_time, import_time, peak))
+
+        for label, export_time, import_time, peak in results:
+            line = "  {:<14} export {:8.3f} s  import {:8.3f} s".format(
+                label, export_time, import_time)
+            if peak is not None:
+                line += "  import peak {:6.1f} MB".format(peak / 2.0 ** 20)
+            print(line)
+    finally:
+        shutil.rmtree(directory)
+
+
+def bench_profile_names(n_profiles=10000):
+    """Compares profile name lookups via the index with directory scans"""
+
+    print("Profile names of {} setting files".format(n_profiles))
+
+    directory = tempfile.mkdtemp()
+    try:
+        names = ["profile{}".format(i) for i in range(n_profiles)]
+        for name in names:
+            open(os.path.join(directory, "pwm." + name + ".setting"),
+                 "w").close()
+
+        def scan():
+            """Lists the directory on each call"""
+            return sorted(filename[4:-8]
+                          for filename in os.listdir(directory)
+                          if filename.startswith("pwm.") and
+                          filename.endswith(".setting"))
+
+        save_profile_index(names, directory)
+        assert load_profile_index(directory) == scan()
+
+        for label, func in (
+                ("scan", scan),
+                ("list", lambda: list_profiles(directory)),
+                ("complete", lambda: complete_profiles("profile99",
+                                                       directory)),
+                ("resolve", lambda: resolve_profile("profile9999",
+                                                    directory))):
+            elapsed = _timeit(func)
+            print("  {:<10} {:8.4f} s".format(label, elapsed))
+    finally:
+        shutil.rmtree(directory)
+
+
+def bench_leet_keys(n_sites=5000):
+    """Compares l33t before with and without LeetKeyCache"""
+
+    print("l33t before for {} sites, key length 28, Length 16".format(
+        n_sites))
+
+    password = "correct horse battery staple"
+    sites = ["site{}.example.com".format(i) for i in range(n_sites)]
+    leet_keys = LeetKeyCache()
+
+    for key in (password, SecretKey(password)):
+        key_type = type(key).__name__
+        for algorithm in ("md5", "hmac-sha256"):
+            for leet_level in range(1, 10):
+                def uncached():
+                    """l33t of key and data per site"""
+                    return [generatepassword(algorithm, key, site, 16,
+                                             FULL_CHARSET, use_leet="before",
+                                             leet_level=leet_level)
+                            for site in sites]
+
+                def cached():
+                    """l33t of data per site"""
+                    return [generatepassword(algorithm, key, site, 16,
+                                             FULL_CHARSET, use_leet="before",
+                                             leet_level=leet_level,
+                                             leet_keys=leet_keys)
+                            for site in sites]
+
+                assert uncached() == cached()
+                uncached_time = _timeit(uncached)
+                cached_time = _timeit(cached)
+                print("  {:<9} {:<12} level {}  uncached {:8.4f} s  "
+                      "cached {:8.4f} s  saving {:5.1f} %".format(
+                          key_type, algorithm, leet_level, uncached_time,
+                          cached_time,
+                          100.0 * (1 - cached_time / uncached_time)))
+
+    leet_keys.wipe()
+
+
+def bench_recovery():
+    """Compares recover_settings with deriving every candidate"""
+
+    print("Profile recovery, 3 modifiers, l33t levels 1, 5 and 9")
+
+    space = SearchSpace(leet_levels=(1, 5, 9), modifiers=("", "2018", "x"))
+    for settings in (PwmSettings(URL="site.com", MasterPass="master"),
+                     PwmSettings(URL="site.com", MasterPass="master",
+                                 Algorithm="hmac-sha256", Length=16,
+                                 Modifier="x", UseLeet="both", LeetLvl=5)):
+        password = generatepasswordfrom(settings)
+
+        def naive():
+            """generatepasswordfrom for each candidate"""
+            matches = []
+            for algorithm in space.algorithms:
+                for charset in space.charsets:
+                    for use_leet in space.leet_options:
+                        leet_levels = (1,) if use_leet == "none" \
+                            else space.leet_levels
+                        for leet_level in leet_levels:
+                            for modifier in space.modifiers:
+                                candidate = PwmSettings(
+                                    URL="site.com", MasterPass="master",
+                                    Algorithm=algorithm, Length=len(password),
+                                    CharacterSet=charset, Modifier=modifier,
+                                    UseLeet=use_leet, LeetLvl=leet_level)
+                                if generatepasswordfrom(candidate) == \
+                                   password:
+                                    matches.append(candidate)
+            return matches
+
+        def search():
+            """Pruned search with shared digests"""
+            return recover_settings(password, "site.com", "master", space)
+
+        search_time = _timeit(search)
+        naive_time = _timeit(naive)
+        print("  {:<12} Length={:<3} {:>6} candidates  naive {:8.4f} s  "
+              "search {:8.4f} s  speedup {:5.1f}x".format(
+                  settings.Algorithm, settings.Length, space.size,
+                  naive_time, search_time, naive_time / search_time))
+
+
+BENCHMARKS = {
+    "startup": bench_startup,
+    "bulk_profiles": bench_bulk_profiles,
+    "profile_names": bench_profile_names,
+    "leet_keys": bench_leet_keys,
+    "recovery": bench_recovery,
+    "all_algorithms": bench_all_algorithms,
+    "rotation": bench_rotation,
+    "sinks": bench_sinks,
+    "rstr2any_head": bench_rstr2any_head,
+    "default_profile": bench_default_profile,
+    "stretching": bench_stretching,
+    "archive": bench_archive,
+    "profile_list": bench_profile_list,
+    "settings_list": bench_settings_list,
+    "profile_index": bench_profile_index,
+    "normalize_url": bench_normalize_url,
+    "rstr2any_batch": bench_rstr2any_batch,
+}
+
+
+def main():
+    """Runs the benchmarks given on the command line or all benchmarks"""
+
+    names = sys.argv[1:] or sorted(BENCHMARKS)
+    for name in names:
+        BENCHMARKS[name]()
+
+
+if __name__ == "__main__":
+    main()
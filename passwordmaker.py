@@ -49,376 +49,468 @@ It can be used both on the command-line and with a GUI based on TKinter.
 
 
 import argparse
+import io
+import json
 import sys
 
-try:
-    import tkinter as tk
-    from tkinter import simpledialog, messagebox
-except ImportError:
-    tk = None
-
 import attr
 
-from pwmlib import ALGORITHMS, LEET_OPTIONS
-from pwmlib import generatepasswordfrom, PwmSettingsList, PwmSettings
+from pwmlib import PwmSettingsList, PwmSettings, profile
+from pwmlib import complete_profiles, list_profiles, load_profile
+from pwmlib import BACKEND_CACHE_PATH, save_backend_cache
 
+# pwmgui (tkinter), pwmsink and pwmbulk are imported by the commands that
+# use them, so that starting passwordmaker.py does not load them.
 
-class TextWidget(tk.Entry, object):
-    """Text entry widget
 
-    Interfaces: get, set
+def calibrate(write_cache=False):
+    """Prints calibration results and optionally writes the backend cache"""
 
-    """
+    from pwmcalibrate import calibrate as run_calibration, format_result
 
-    def set(self, value):
-        """Sets current text"""
+    backends = {}
+    for result in run_calibration():
+        print(format_result(result))
+        sys.stdout.flush()
+        if result.recommended_backend is not None:
+            backends[result.algorithm] = result.recommended_backend
 
-        self.delete(0, "end")
-        self.insert(0, value)
+    if write_cache:
+        save_backend_cache(backends)
+        print("Backend cache written to {}".format(BACKEND_CACHE_PATH))
 
 
-class PasswordWidget(TextWidget):
-    """Password entry widget
+# Command line interface
 
-    Interfaces: get, set
+COMMANDS = ("generate", "batch", "profiles", "bench", "calibrate",
+            "completion")
 
-    """
+# Options of the command line before subcommands existed
+COMMAND_ALIASES = {"--calibrate": "calibrate", "--batch": "batch"}
 
-    def __init__(self, parent, *args, **kwargs):
-        kwargs.update({'show': "*"})
+# Bash completion of commands and profile names, see completion command
+BASH_COMPLETION = """_passwordmaker()
+{
+    local cur="${COMP_WORDS[COMP_CWORD]}"
+    local prev="${COMP_WORDS[COMP_CWORD-1]}"
+    if [ "$prev" = "--profile" ] || [ "$prev" = "show" ]; then
+        COMPREPLY=( $("${COMP_WORDS[0]}" profiles complete -- "$cur") )
+    elif [ "$COMP_CWORD" -eq 1 ]; then
+        COMPREPLY=( $(compgen -W "%s" -- "$cur") )
+    fi
+}
+complete -o default -F _passwordmaker passwordmaker.py
+""" % " ".join(COMMANDS)
 
-        super(PasswordWidget, self).__init__(parent, *args, **kwargs)
 
+def get_settings(args):
+    """Returns PwmSettings from the profile and the setting options of args
 
-class IntWidget(tk.Spinbox, object):
-    """Spinbox widget for Integers
-
-    Interfaces: get, set
+    Without --profile, the options are interpreted as before subcommands
+    existed: URL is extended by username and modifier and the l33t level
+    is counted from 1. With --profile NAME, only the file of profile NAME is
+    read and the given options replace single fields. NAME has to be the
+    full profile name.
 
     """
 
-    def __init__(self, parent, *args, **kwargs):
-        kwargs.update({'from_': 1, "to": 128})
-        super(IntWidget, self).__init__(parent, *args, **kwargs)
+    names = [field.name for field in attr.fields(PwmSettings)]
 
-    def get(self):
-        return int(super(IntWidget, self).get())
+    if args.profile is None:
+        settings = PwmSettings()
+        for name in names:
+            if getattr(args, name) is not None:
+                setattr(settings, name, getattr(args, name))
+        settings.URL += settings.Username + settings.Modifier
+        settings.LeetLvl -= 1
+    else:
+        settings = _load_profile(args.profile, args.directory)
+        for name in names:
+            if getattr(args, name) is not None:
+                setattr(settings, name, getattr(args, name))
 
-    def set(self, value):
-        """Sets current text"""
+    attr.validate(settings)
+    return settings
 
-        self.delete(0, "end")
-        self.insert(0, value)
 
+def _load_profile(name, directory):
+    """Returns PwmSettings of profile name or exits"""
 
-class AlgorithmWidget(tk.OptionMenu, object):
-    """OptionMenu widget for Algorithms
+    try:
+        return load_profile(name, directory)
+    except KeyError:
+        matches = complete_profiles(name, directory)
+        if matches:
+            msg = "Unknown profile {}. Profiles that start with it: {}"
+            raise SystemExit(msg.format(name, ", ".join(matches)))
+        raise SystemExit("Unknown profile {}".format(name))
 
-    Interfaces: get, set
 
-    """
+def ask_master_pass(settings):
+    """Asks for the master password if settings has none"""
 
-    def __init__(self, parent):
-        self.alg = tk.StringVar(parent)
-        super(AlgorithmWidget, self).__init__(parent, self.alg, "md5",
-                                              *ALGORITHMS[1:])
+    if settings.MasterPass == "":
+        import getpass
+        settings.MasterPass = getpass.getpass("Master password: ")
 
-    def get(self):
-        """Returns the current algorithm as string"""
 
-        return self.alg.get()
+def run_jobs(settings_iter, output="-", output_format="text",
+             fields=("Password",), redact="none", workers=None):
+    """Derives and writes the passwords of settings_iter
 
-    def set(self, value):
-        """Sets current algorithm"""
+    Execution engine of the generate and batch commands. Returns the number
+    of written records.
 
-        assert value in ALGORITHMS
-        self.alg.set(value)
+    Parameters
+    ----------
 
+    * settings_iter: Iterable of PwmSettings
+    \tSettings instances, consumed lazily
+    * output: String (default: "-")
+    \tOutput file, "-" for stdout
+    * output_format: String (default: "text")
+    \tKey of SINK_FORMATS
+    * fields: Sequence of String (default: ("Password",))
+    \tFields of the output records
+    * redact: String (default: "none")
+    \tOne of REDACT_OPTIONS
+    * workers: Integer (default: number of CPUs)
+    \tNumber of threads
 
-class UseLeetWidget(tk.OptionMenu, object):
-    """OptionMenu widget for l33t speech usage
+    """
 
-    Interfaces: get, set
+    from pwmsink import open_sink, write_passwords
 
-    """
+    with open_sink(output_format, output, fields=fields,
+                   redact=redact) as sink:
+        return write_passwords(settings_iter, sink, workers)
 
-    def __init__(self, parent):
-        self.leet_usage = tk.StringVar(parent)
-        super(UseLeetWidget, self).__init__(parent, self.leet_usage, "none",
-                                            *LEET_OPTIONS[1:])
 
-    def get(self):
-        """Returns the current algorithm as string"""
-
-        return self.leet_usage.get()
-
-    def set(self, value):
-        """Sets current algorithm"""
-
-        assert value in LEET_OPTIONS
-        self.leet_usage.set(value)
-
-
-class Application(tk.Frame):
-    """Main application window class"""
-
-    type2widget = {
-        "str": TextWidget,
-        "pwd": PasswordWidget,
-        "int": IntWidget,
-        "alg": AlgorithmWidget,
-        "l3t": UseLeetWidget,
-    }
+def cmd_generate(args):
+    """Prints the password of one site"""
 
-    def __init__(self, root=None):
-        self.root = root
-        tk.Frame.__init__(self, root)
-        self.background = root.cget("background")
+    from pwmsink import SINK_FIELDS
 
-        self.settings_list = PwmSettingsList()
-        self.settings = self.settings_list.get_pwm_settings()
+    settings = get_settings(args)
+    ask_master_pass(settings)
 
-        self.create_widgets()
-        self.layout()
+    fields = ("Password",) if args.output_format == "text" else SINK_FIELDS
 
-        self.load()
+    if args.timing:
+        with profile() as prof:
+            run_jobs([settings], args.output, args.output_format, fields,
+                     args.redact, workers=1)
+        sys.stderr.write(prof.report() + "\n")
+    else:
+        run_jobs([settings], args.output, args.output_format, fields,
+                 args.redact, workers=1)
 
-    def create_widgets(self):
-        """Creates all widgets in main window"""
 
-        # Entry widgets
+def cmd_batch(args):
+    """Derives the passwords of JSON lines of settings"""
 
-        self.labels = []
-        self.entry_widgets = []
+    from pwmsink import SINK_FIELDS, iter_settings_jsonl
 
-        for setting in attr.fields(PwmSettings):
-            self.labels.append(tk.Label(self, justify="left",
-                                        text=setting.metadata["guitext"]))
+    settings = get_settings(args)
+    ask_master_pass(settings)
 
-            widget = self.type2widget[setting.type](self)
-            widget.set(self.settings[setting.name])
-            self.entry_widgets.append(widget)
+    if args.input == "-":
+        infile = sys.stdin
+    else:
+        infile = io.open(args.input, encoding="utf-8")
+    try:
+        run_jobs(iter_settings_jsonl(infile, settings), args.output,
+                 args.output_format, SINK_FIELDS, args.redact)
+    finally:
+        if infile is not sys.stdin:
+            infile.close()
 
-        # Buttons
 
-        self.generate_button = tk.Button(self, text="Generate",
-                                         command=self.generate)
-        self.load_button = tk.Button(self, text="Load", command=self.load)
-        self.save_button = tk.Button(self, text="Save", command=self.save)
-        self.passwd_label = tk.Label(self, justify="left", text="Password")
-        self.listbox_label = tk.Label(self, justify="left", text="Settings")
-        self.listbox = tk.Listbox(self)
-        self.listbox .bind('<<ListboxSelect>>', self.on_listbox)
-        self.listbox.insert("end", "default")
-        self.listbox.select_set(0)
-        self.new_setting_button = tk.Button(self, text="+",
-                                            command=self.new_setting)
-        self.delete_setting_button = tk.Button(self, text="-",
-                                               command=self.del_setting)
+def cmd_profiles_list(args):
+    """Prints the profile names"""
 
-        self.passwd_text = tk.Entry(self, fg="blue")
+    for name in list_profiles(args.directory):
+        print(name)
 
-    def layout(self):
-        """Places widgets on the grid"""
 
-        self.grid(sticky="nsew")
-        self.top = self.root.winfo_toplevel()
-        self.top.rowconfigure(0, weight=1)
-        self.top.columnconfigure(0, weight=1)
-        self.columnconfigure(0, weight=0)
-        self.columnconfigure(1, weight=1)
-        self.columnconfigure(2, weight=1)
+def cmd_profiles_show(args):
+    """Prints the fields of one profile as JSON"""
 
-        for i, label in enumerate(self.labels):
-            label.grid(row=i, column=0, sticky="w", padx=5, pady=2)
+    settings = _load_profile(args.name, args.directory)
 
-        for i, entry_widget in enumerate(self.entry_widgets):
-            entry_widget.grid(row=i, column=1, columnspan=2, sticky="we")
+    passwd_filter = attr.filters.exclude(attr.fields(PwmSettings).MasterPass)
+    print(json.dumps(attr.asdict(settings, filter=passwd_filter),
+                     sort_keys=True, indent=4))
 
-        self.rowconfigure(i+1, weight=1)
 
-        self.generate_button.grid(row=i+1, column=1, columnspan=2, pady=5,
-                                  sticky="nsew")
-        self.load_button.grid(row=i+2, column=1, columnspan=1, pady=5,
-                              sticky="we")
-        self.save_button.grid(row=i+2, column=2, columnspan=1, pady=5,
-                              sticky="we")
-        self.listbox_label.grid(row=i+3, column=0, sticky="nw", padx=5, pady=2)
-        self.listbox.grid(row=i+3, rowspan=3, column=1, columnspan=2,
-                          sticky="nsew")
-        self.new_setting_button.grid(row=i+4, column=0, sticky="n", padx=5,
-                                     pady=2)
-        self.delete_setting_button.grid(row=i+5, column=0, sticky="n",
-                                        padx=5, pady=2)
-        self.passwd_label.grid(row=i+6, column=0, sticky="w", padx=5, pady=2)
-        self.passwd_text.grid(row=i+6, column=1, columnspan=2, sticky="nsew")
+def cmd_profiles_complete(args):
+    """Prints the profile names that start with a prefix"""
 
-    def update_settings(self):
-        """Updates self.settings from entry widget values"""
+    for name in complete_profiles(args.prefix, args.directory):
+        print(name)
 
-        attr_fields = attr.fields(PwmSettings)
-        for setting, widget in zip(attr_fields, self.entry_widgets):
-            self.settings.__setattr__(setting.name, widget.get())
 
-    def update_widgets(self):
-        """Updates widgets from current self.settings"""
+def cmd_profiles_export(args):
+    """Writes all profiles without master passwords into one file"""
 
-        self.settings = self.settings_list.get_pwm_settings()
+    from pwmbulk import BULK_FORMATS, PROFILE_FIELDS, export_profiles
+    from pwmsink import open_sink
 
-        for setting, widget in zip(attr.fields(PwmSettings),
-                                   self.entry_widgets):
-            widget.set(self.settings[setting.name])
+    settings_list = PwmSettingsList()
+    settings_list.load(args.directory)
 
-    def update_listbox(self):
-        """Updates listbox from self.settings_list"""
+    if args.output_format in BULK_FORMATS:
+        export_profiles(settings_list, args.output, args.output_format)
+        return
 
-        self.listbox.delete(0, "end")
-        for pwm_name in self.settings_list.pwm_names:
-            self.listbox.insert("end", pwm_name)
-            self.listbox.select_set(0)
+    with open_sink(args.output_format, args.output,
+                   fields=PROFILE_FIELDS) as sink:
+        for name, settings in settings_list.items():
+            sink.write(settings, Name=name)
 
-    def save(self):
-        """Saves settings to json file"""
 
-        self.update_settings()
-        self.settings_list.save()
+def cmd_profiles_import(args):
+    """Imports the profiles of a bulk file into the profile directory"""
 
-    def load(self):
-        """Loads settings from json file"""
+    from pwmbulk import ProfileImportError, import_profiles
 
-        self.settings_list.load()
+    settings_list = PwmSettingsList()
+    settings_list.load(args.directory)
 
-        self.update_listbox()
-        self.update_widgets()
+    try:
+        count = import_profiles(args.input, settings_list, args.input_format,
+                                replace=not args.keep_existing)
+    except ProfileImportError as err:
+        raise SystemExit(str(err))
 
-    def on_listbox(self, event):
-        """Listbox event handler"""
-
-        self.update_settings()
-
-        widget = event.widget
-        if not widget.curselection():
-            # Empty cell
-            return
-        index = int(widget.curselection()[0])
-        value = widget.get(index)
-
-        self.settings_list.current = value
-        self.update_widgets()
-
-    def new_setting(self):
-        """Adds pwm setting to self.settings_list"""
+    # Only the files of added or changed profiles are written
+    settings_list.save_profiles([name for name in settings_list
+                                 if settings_list.is_modified(name)],
+                                args.directory)
+    print("{} profiles imported".format(count))
 
-        name = None
-        while name is None or not name or name in self.settings_list.pwm_names:
-            name = simpledialog.askstring("Create new settings set", "Name")
-            if name is None:
-                return
 
-        self.settings_list.pwm_names.append(name)
-        self.settings_list.pwms.append(PwmSettings())
+def cmd_bench(args):
+    """Runs benchmarks"""
 
-        self.update_listbox()
+    from benchpwmlib import BENCHMARKS
 
-    def del_setting(self):
-        """deletes setting from listbox and fromk settings_list"""
+    for name in args.names or sorted(BENCHMARKS):
+        if name not in BENCHMARKS:
+            msg = "Unknown benchmark {}. Use one of {}."
+            raise SystemExit(msg.format(name, ", ".join(sorted(BENCHMARKS))))
+        BENCHMARKS[name]()
 
-        index = int(self.listbox.curselection()[0])
-        value = self.listbox.get(index)
-        if value == "default":
-            return
 
-        # Check if the setting is intentionally being deleted
-        msgbox = messagebox.askyesno
-        if not msgbox("Delete setting",
-                      "Do you want to permanently delete the setting?"):
-            return
+def cmd_calibrate(args):
+    """Measures the cost of all algorithms on this machine"""
 
-        pwm_idx = self.settings_list.pwm_names.index(value)
-        self.settings_list.pwm_names.pop(pwm_idx)
-        self.settings_list.pwms.pop(pwm_idx)
-        if self.settings_list.current == value:
-            self.settings_list.current = "default"
+    calibrate(args.write_cache)
 
-        self.listbox.delete(index)
-        self.listbox.select_set(0)
 
-    def generate(self):
-        """Generates and prints password and copies it to the clipboard"""
+def cmd_completion(_):
+    """Prints the bash completion script"""
 
-        self.update_settings()
-        self.generate_button.flash()
+    sys.stdout.write(BASH_COMPLETION)
 
-        pwd = generatepasswordfrom(self.settings)
 
-        current_passwd = self.passwd_text.get()
-        if current_passwd:
-            self.passwd_text.delete(0, len(current_passwd))
-        self.passwd_text.insert(0, pwd[:2]+"*"*(len(pwd)-2))
-        self.clipboard_clear()
-        self.clipboard_append(pwd)
+def _add_setting_arguments(parser):
+    """Adds the PwmSettings options and --profile to parser"""
 
+    for setting in attr.fields(PwmSettings):
+        # argparse formats help strings with %
+        __help = setting.metadata["help"].replace("%", "%%")
+        parser.add_argument(setting.metadata["cmd1"],
+                            setting.metadata["cmd2"], dest=setting.name,
+                            default=None, help=__help,
+                            type=int if setting.type == "int" else None)
 
-def gui():
-    """Run application in GUI"""
+    parser.add_argument("--profile", dest="profile", default=None,
+                        metavar="NAME",
+                        help="Load the saved profile NAME; given options "
+                             "replace its fields")
+    parser.add_argument("--dir", dest="directory", default=".",
+                        help="Directory of the profile files (default: .)")
 
-    root = tk.Tk()
-    app = Application(root=root)
-    app.master.title("PasswordMaker")
-    app.mainloop()
 
+def _add_output_arguments(parser, default_format):
+    """Adds output file, format and redaction options to parser"""
 
-def cmd():
-    """Run application in the command line"""
+    from pwmsink import REDACT_OPTIONS, SINK_FORMATS
 
-    def get_parser():
-        """Returns command line argument parser"""
+    parser.add_argument("--output", dest="output", default="-",
+                        help="Output file (default: - for stdout)")
+    parser.add_argument("--format", dest="output_format",
+                        default=default_format, choices=list(SINK_FORMATS),
+                        help="Output format (default: {})".format(
+                            default_format))
+    parser.add_argument("--redact", dest="redact", default="none",
+                        choices=REDACT_OPTIONS,
+                        help="Redact or hash passwords (default: none)")
+
+
+_PARSER = None
+
+
+def get_parser():
+    """Returns the command line argument parser, built on first use"""
+
+    global _PARSER
+
+    if _PARSER is not None:
+        return _PARSER
+
+    from pwmbulk import BULK_FORMATS
+    from pwmsink import SINK_FORMATS
+
+    parser = argparse.ArgumentParser(
+        description="Create and manage passwords. Without a command, the "
+                    "options are those of generate.")
+    commands = parser.add_subparsers(dest="command", metavar="command")
 
-        description = "Usage: %prog [options]"
-        parser = argparse.ArgumentParser(description=description)
+    generate = commands.add_parser("generate",
+                                   help="Print the password of one site")
+    _add_setting_arguments(generate)
+    _add_output_arguments(generate, "text")
+    generate.add_argument("--timing", dest="timing", action="store_true",
+                          help="Print a timing breakdown to stderr")
+    generate.set_defaults(func=cmd_generate)
+
+    batch = commands.add_parser(
+        "batch", help="Derive passwords for JSON lines of settings")
+    batch.add_argument("input", help="JSON lines file, - for stdin. Fields "
+                                     "that are missing are taken from the "
+                                     "other options.")
+    _add_setting_arguments(batch)
+    _add_output_arguments(batch, "jsonl")
+    batch.set_defaults(func=cmd_batch)
+
+    profiles = commands.add_parser("profiles", help="Inspect saved profiles")
+    profile_commands = profiles.add_subparsers(dest="profile_command",
+                                               metavar="command")
+    profile_commands.required = True
+
+    profiles_list = profile_commands.add_parser(
+        "list", help="Print the profile names")
+    profiles_list.set_defaults(func=cmd_profiles_list)
+
+    profiles_show = profile_commands.add_parser(
+        "show", help="Print the fields of one profile")
+    profiles_show.add_argument("name", help="Profile name")
+    profiles_show.set_defaults(func=cmd_profiles_show)
+
+    profiles_complete = profile_commands.add_parser(
+        "complete", help="Print the profile names that start with a prefix")
+    profiles_complete.add_argument("prefix", nargs="?", default="",
+                                   help="Name prefix (default: all)")
+    profiles_complete.set_defaults(func=cmd_profiles_complete)
+
+    profiles_export = profile_commands.add_parser(
+        "export", help="Write all profiles without master passwords")
+    profiles_export.add_argument("--output", dest="output", default="-",
+                                 help="Output file (default: - for stdout)")
+    profiles_export.add_argument("--format", dest="output_format",
+                                 default="jsonl",
+                                 choices=list(SINK_FORMATS) + ["rdf"],
+                                 help="Output format, rdf for the browser "
+                                      "extension (default: jsonl)")
+    profiles_export.set_defaults(func=cmd_profiles_export)
+
+    profiles_import = profile_commands.add_parser(
+        "import", help="Import profiles from a JSON lines or browser "
+                       "extension RDF file")
+    profiles_import.add_argument("input", help="Bulk file, - for stdin")
+    profiles_import.add_argument("--format", dest="input_format",
+                                 default=None, choices=BULK_FORMATS,
+                                 help="Input format (default: rdf for "
+                                      "*.rdf files, else jsonl)")
+    profiles_import.add_argument("--keep-existing", dest="keep_existing",
+                                 action="store_true",
+                                 help="Fail instead of replacing profiles "
+                                      "with existing names")
+    profiles_import.set_defaults(func=cmd_profiles_import)
+
+    for profile_parser in (profiles_list, profiles_show, profiles_complete,
+                           profiles_export, profiles_import):
+        profile_parser.add_argument(
+            "--dir", dest="directory", default=".",
+            help="Directory of the profile files (default: .)")
+
+    bench = commands.add_parser("bench", help="Run benchmarks")
+    bench.add_argument("names", nargs="*", help="Benchmark names "
+                                                "(default: all)")
+    bench.set_defaults(func=cmd_bench)
+
+    calibrate_parser = commands.add_parser(
+        "calibrate", help="Measure the cost of all algorithms, lengths and "
+                          "charsets on this machine")
+    calibrate_parser.add_argument("--write-cache", dest="write_cache",
+                                  action="store_true",
+                                  help="Store the fastest hash backends in "
+                                       "the backend cache file")
+    calibrate_parser.set_defaults(func=cmd_calibrate)
+
+    completion = commands.add_parser(
+        "completion", help="Print a bash completion script, use with "
+                           "eval \"$(passwordmaker.py completion)\"")
+    completion.set_defaults(func=cmd_completion)
+
+    _PARSER = parser
+    return parser
+
+
+def expand_command_alias(argv):
+    """Returns argv with a leading command, generate if there is no alias
+
+    --calibrate and --batch FILE (or --batch=FILE) may appear anywhere
+    before "--" and select the calibrate and batch commands.
+
+    Parameters
+    ----------
+
+    * argv: List of String
+    \tCommand line arguments without a command
 
-        for setting in attr.fields(PwmSettings):
-            cmd1 = setting.metadata["cmd1"]
-            cmd2 = setting.metadata["cmd2"]
-            dest = setting.name
-            default = setting.default
-            __help = setting.metadata["help"]
-            parser.add_argument(cmd1, cmd2, dest=dest, default=default,
-                                help=__help)
-        return parser
+    """
 
-    def update_settings(options, settings):
-        """Updates self.settings from entry widget values"""
+    for i, arg in enumerate(argv):
+        if arg == "--":
+            break
+        option, equals, value = arg.partition("=")
+        if option in COMMAND_ALIASES:
+            args = argv[:i] + ([value] if equals else []) + argv[i + 1:]
+            return [COMMAND_ALIASES[option]] + args
 
-        for setting in attr.fields(PwmSettings):
-            val = getattr(options, setting.name)
-            if setting.name == "URL":
-                val += options.Username + options.Modifier
-            if setting.name in ("LeetLvl", "Length"):
-                val = int(val)
-            if setting.name == "LeetLvl":
-                val -= 1
-            settings.__setattr__(setting.name, val)
+    return ["generate"] + argv
 
-    parser = get_parser()
-    args = parser.parse_args()
 
-    args = parser.parse_args()
+def cmd(argv=None):
+    """Run application in the command line
 
-    if args.MasterPass == "":
-        import getpass
-        args.MasterPass = getpass.getpass("Master password: ")
+    Parameters
+    ----------
+
+    * argv: List of String (default: sys.argv[1:])
+    \tCommand line arguments. Without a command, generate is used unless
+    \tthe alias --calibrate or --batch is given.
+
+    """
+
+    if argv is None:
+        argv = sys.argv[1:]
 
-    settings = PwmSettings()
-    update_settings(args, settings)
+    if argv and argv[0] not in COMMANDS and argv[0] not in ("-h", "--help"):
+        argv = expand_command_alias(list(argv))
 
-    print(generatepasswordfrom(settings))
+    args = get_parser().parse_args(argv)
+    args.func(args)
 
 
 def main():
     """Main application that chooses between gui and non gui execution"""
 
     if len(sys.argv) == 1:
+        from pwmgui import gui
         gui()
     else:
         cmd()
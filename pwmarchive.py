@@ -0,0 +1,337 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+PasswordMaker - Binary profile archive
+======================================
+
+Create and manage passwords.
+
+
+Copyright (C):
+
+    2005      Eric H. Jung, Miquel Burns and LeahScape, Inc.
+              <http://passwordmaker.org>
+              <grimholtz@yahoo.com>
+    2005-2007 Pedro Gimeno Fortea and Miquel Matthew 'Fire' Burns
+              <http://www.formauri.es/personal/pgimeno/>
+              <miquelfire@gmail.com>
+    2010      Aurelien Bompard
+              <http://aurelien.bompard.org>
+    2012      Richard Beales
+              <rich@richbeales.net>
+    2014      Richard Beales, Laurent Bachelier and Christoph Sarnowski
+              <rich@richbeales.net>
+    2018      Martin Manns
+              <mmanns@gmx.net>
+
+    This file is part of PasswordMaker.
+
+    PasswordMaker is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Foobar is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with Foobar.  If not, see <https://www.gnu.org/licenses/>.
+
+Compiles a PwmSettingsList into a read-only binary archive that is opened
+via mmap. Opening is independent of the number of profiles and a lookup
+only touches the pages of the records and strings it needs.
+
+Archive layout (little endian)::
+
+    header    magic, version, counts, section offsets, current name
+    schema    one string slot per archived PwmSettings field
+    records   fixed width: name slot plus one slot per field
+    index     record numbers sorted by UTF-8 name
+    strings   deduplicated UTF-8 strings
+
+A string slot is (offset into strings, length) as two uint32, an integer
+slot is an int64. MasterPass is never archived.
+
+"""
+
+import mmap
+import os
+import struct
+
+import attr
+
+from pwmlib import PwmSettings, PwmSettingsList
+
+ARCHIVE_MAGIC = b"PWMA"
+ARCHIVE_VERSION = 1
+
+# magic, version, n_fields, n_records, record_size, schema_offset,
+# records_offset, index_offset, strings_offset, current string slot
+_HEADER = struct.Struct("<4sHHIIIIIIII")
+_STR_SLOT = struct.Struct("<II")
+_INT_SLOT = struct.Struct("<q")
+_UINT32 = struct.Struct("<I")
+
+_SLOT_SIZE = 8
+
+
+def _get_archive_fields():
+    """Returns the PwmSettings attr fields that are archived"""
+
+    return [field for field in attr.fields(PwmSettings)
+            if field.name != "MasterPass"]
+
+
+@attr.s
+class _StringTable(object):
+    """Deduplicating UTF-8 string table"""
+
+    _offsets = attr.ib(default=attr.Factory(dict))
+    _chunks = attr.ib(default=attr.Factory(list))
+    size = attr.ib(default=0)
+
+    def add(self, value):
+        """Returns string slot tuple (offset, length) for value"""
+
+        data = value.encode("utf-8")
+        try:
+            return self._offsets[data], len(data)
+        except KeyError:
+            offset = self._offsets[data] = self.size
+            self._chunks.append(data)
+            self.size += len(data)
+            return offset, len(data)
+
+    def tobytes(self):
+        """Returns the string table"""
+
+        return b"".join(self._chunks)
+
+
+def export_archive(settings_list, filepath):
+    """Writes settings_list into a binary archive file
+
+    The file is replaced atomically.
+
+    Parameters
+    ----------
+
+    * settings_list: PwmSettingsList
+    \tSettings to archive
+    * filepath: String
+    \tPath of the archive file
+
+    """
+
+    fields = _get_archive_fields()
+    strings = _StringTable()
+
+    schema = b"".join(_STR_SLOT.pack(*strings.add(field.name))
+                      for field in fields)
+
+    records = []
+    names = []
+    for name, pwm in settings_list.items():
+        names.append(name.encode("utf-8"))
+        record = [_STR_SLOT.pack(*strings.add(name))]
+        for field in fields:
+            value = getattr(pwm, field.name)
+            if field.type == "int":
+                record.append(_INT_SLOT.pack(value))
+            else:
+                record.append(_STR_SLOT.pack(*strings.add(value)))
+        records.append(b"".join(record))
+
+    index = sorted(range(len(names)), key=names.__getitem__)
+    current = strings.add(settings_list.current)
+
+    record_size = _SLOT_SIZE * (len(fields) + 1)
+    schema_offset = _HEADER.size
+    records_offset = schema_offset + len(schema)
+    index_offset = records_offset + record_size * len(records)
+    strings_offset = index_offset + _UINT32.size * len(index)
+
+    header = _HEADER.pack(ARCHIVE_MAGIC, ARCHIVE_VERSION, len(fields),
+                          len(records), record_size, schema_offset,
+                          records_offset, index_offset, strings_offset,
+                          current[0], current[1])
+
+    tmp_filepath = filepath + ".tmp"
+    with open(tmp_filepath, "wb") as outfile:
+        outfile.write(header)
+        outfile.write(schema)
+        outfile.write(b"".join(records))
+        outfile.write(b"".join(_UINT32.pack(record) for record in index))
+        outfile.write(strings.tobytes())
+    os.replace(tmp_filepath, filepath)
+
+
+@attr.s
+class PwmArchive(object):
+    """Read-only, memory-mapped view of a binary profile archive
+
+    Profiles are decoded on access. Lookups by name are a binary search over
+    the sorted name index. Use as context manager or call close.
+
+    Parameters
+    ----------
+
+    * filepath: String
+    \tPath of an archive that has been written by export_archive
+
+    """
+
+    filepath = attr.ib()
+    _file = attr.ib(init=False, repr=False)
+    _mmap = attr.ib(init=False, repr=False)
+    _fields = attr.ib(init=False, repr=False)
+
+    def __attrs_post_init__(self):
+        self._file = open(self.filepath, "rb")
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0,
+                                   access=mmap.ACCESS_READ)
+            self._read_header()
+        except (ValueError, struct.error):
+            self.close()
+            raise ValueError("{} is no PwmArchive".format(self.filepath))
+
+    def _read_header(self):
+        """Reads header and schema"""
+
+        (magic, version, n_fields, self._n_records, self._record_size,
+         schema_offset, self._records_offset, self._index_offset,
+         self._strings_offset, current_offset, current_length) = \
+            _HEADER.unpack_from(self._mmap, 0)
+
+        if magic != ARCHIVE_MAGIC or version != ARCHIVE_VERSION:
+            raise ValueError("Unsupported archive")
+
+        self.current = self._string(current_offset, current_length)
+
+        # Map archived field names to their slot number in a record.
+        # Fields that are missing in the archive keep their defaults.
+        slots = {}
+        for i in range(n_fields):
+            offset = schema_offset + i * _SLOT_SIZE
+            name = self._string(*_STR_SLOT.unpack_from(self._mmap, offset))
+            slots[name] = i + 1
+
+        self._fields = [(field, slots[field.name])
+                        for field in _get_archive_fields()
+                        if field.name in slots]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def __len__(self):
+        return self._n_records
+
+    def __contains__(self, name):
+        return self._find(name) is not None
+
+    def __iter__(self):
+        for record in range(self._n_records):
+            yield self._string(*self._slot(record, 0))
+
+    def __getitem__(self, name):
+        record = self._find(name)
+        if record is None:
+            raise KeyError(name)
+        return self._settings(record)
+
+    def close(self):
+        """Unmaps and closes the archive file"""
+
+        if getattr(self, "_mmap", None) is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._file.close()
+
+    def get(self, name, default=None):
+        """Returns PwmSettings for name or default"""
+
+        record = self._find(name)
+        if record is None:
+            return default
+        return self._settings(record)
+
+    def items(self):
+        """Returns iterator of (name, PwmSettings) tuples in archive order"""
+
+        for record in range(self._n_records):
+            yield self._string(*self._slot(record, 0)), self._settings(record)
+
+    def to_settings_list(self):
+        """Returns a PwmSettingsList with all archived settings"""
+
+        names = []
+        pwms = []
+        for name, pwm in self.items():
+            names.append(name)
+            pwms.append(pwm)
+        return PwmSettingsList(current=self.current, pwm_names=names,
+                               pwms=pwms)
+
+    def _string(self, offset, length):
+        """Returns string from the string table"""
+
+        start = self._strings_offset + offset
+        return self._mmap[start:start + length].decode("utf-8")
+
+    def _slot(self, record, slot):
+        """Returns string slot tuple of a record"""
+
+        offset = self._records_offset + record * self._record_size + \
+            slot * _SLOT_SIZE
+        return _STR_SLOT.unpack_from(self._mmap, offset)
+
+    def _find(self, name):
+        """Returns record number of name or None"""
+
+        key = name.encode("utf-8")
+        strings_offset = self._strings_offset
+        lo = 0
+        hi = self._n_records
+        while lo < hi:
+            mid = (lo + hi) // 2
+            record = _UINT32.unpack_from(self._mmap, self._index_offset +
+                                         mid * _UINT32.size)[0]
+            offset, length = self._slot(record, 0)
+            start = strings_offset + offset
+            record_key = self._mmap[start:start + length]
+            if record_key < key:
+                lo = mid + 1
+            elif record_key > key:
+                hi = mid
+            else:
+                return record
+        return None
+
+    def _settings(self, record):
+        """Returns PwmSettings of a record"""
+
+        record_offset = self._records_offset + record * self._record_size
+        kwargs = {}
+        for field, slot in self._fields:
+            offset = record_offset + slot * _SLOT_SIZE
+            if field.type == "int":
+                kwargs[field.name] = _INT_SLOT.unpack_from(self._mmap,
+                                                           offset)[0]
+            else:
+                kwargs[field.name] = self._string(
+                    *_STR_SLOT.unpack_from(self._mmap, offset))
+        return PwmSettings(**kwargs)
+
+
+def import_archive(filepath):
+    """Returns PwmSettingsList from a binary archive file"""
+
+    with PwmArchive(filepath) as archive:
+        return archive.to_settings_list()
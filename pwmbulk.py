@@ -0,0 +1,526 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+PasswordMaker - Bulk profile files
+================================
+
+Create and manage passwords.
+
+
+Copyright (C):
+
+    2005      Eric H. Jung, Miquel Burns and LeahScape, Inc.
+              <http://passwordmaker.org>
+              <grimholtz@yahoo.com>
+    2005-2007 Pedro Gimeno Fortea and Miquel Matthew 'Fire' Burns
+              <http://www.formauri.es/personal/pgimeno/>
+              <miquelfire@gmail.com>
+    2010      Aurelien Bompard
+              <http://aurelien.bompard.org>
+    2012      Richard Beales
+              <rich@richbeales.net>
+    2014      Richard Beales, Laurent Bachelier and Christoph Sarnowski
+              <rich@richbeales.net>
+    2018      Martin Manns
+              <mmanns@gmx.net>
+
+    This file is part of PasswordMaker.
+
+    PasswordMaker is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Foobar is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with Foobar.  If not, see <https://www.gnu.org/licenses/>.
+
+Exports and imports a whole PwmSettingsList as one file instead of one
+PWM_setting file per profile. Two formats are supported:
+
+    jsonl   one JSON object per profile with Name and the PwmSettings
+            fields, as written by `passwordmaker.py profiles export`
+    rdf     RDF/XML account list of the PasswordMaker browser extension
+
+Files are parsed as a stream, so that only one batch of records is held
+unvalidated in memory. Records are validated in batches and staged. The
+import commits all staged profiles at once after the whole file has been
+validated; a file with any invalid record leaves the PwmSettingsList
+unchanged. Exports are written to a temporary file that atomically
+replaces the target. MasterPass is never exported or imported.
+
+The wildcard URL patterns of the extension become /regex/ URLPatterns, or
+host patterns if they only select a host, and are converted back on export.
+
+"""
+
+import io
+import json
+import os
+import re
+import sys
+from collections import OrderedDict
+
+import attr
+
+from pwmlib import PwmSettings, STRETCHING_ALGORITHM_2_HASH_FUNC
+
+PROFILE_FIELDS = ("Name",) + tuple(field.name
+                                   for field in attr.fields(PwmSettings)
+                                   if field.name != "MasterPass")
+BULK_FORMATS = ("jsonl", "rdf")
+IMPORT_BATCH_SIZE = 1000
+# Number of invalid records that are reported in the error message
+MAX_REPORTED_ERRORS = 10
+
+# Browser extension RDF
+RDF_NS = "http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+PWM_NS = "http://passwordmaker.mozdev.org/rdf#"
+RDF_DEFAULTS = "http://passwordmaker.mozdev.org/defaults"
+RDF_ACCOUNTS = "http://passwordmaker.mozdev.org/accounts"
+
+# Maps extension attributes to PwmSettings fields
+RDF_ATTRIBUTES = (
+    ("name", "Name"),
+    ("urlToUse", "URL"),
+    ("usernameTB", "Username"),
+    ("counter", "Modifier"),
+    ("hashAlgorithmLB", "Algorithm"),
+    ("passwordLength", "Length"),
+    ("charset", "CharacterSet"),
+    ("prefix", "Prefix"),
+    ("suffix", "Suffix"),
+    ("whereLeetLB", "UseLeet"),
+    ("leetLevelLB", "LeetLvl"),
+)
+RDF_LEET = {
+    "off": "none",
+    "before-hashing": "before",
+    "after-hashing": "after",
+    "both": "both",
+}
+
+# Extension wildcards that only select a host, e.g. *://*.example.com/*,
+# become ProfileIndex host patterns.
+_HOST_WILDCARD_RE = re.compile(r"\*://((?:\*\.)?[^*?/:]+)/\*\Z")
+# Regular expressions that _wildcard_to_regex returns
+_WILDCARD_REGEX_RE = re.compile(r"\^((?:\.\*|\.|\\[^0-9A-Za-z*?]|"
+                                r"[^\\.^$*+?()\[\]{}|])*)\$\Z")
+_WILDCARD_TOKEN_RE = re.compile(r"\.\*|\.|\\(.)|(.)")
+
+
+class ProfileImportError(ValueError):
+    """Raised if records of an import file are invalid
+
+    Attributes
+    ----------
+
+    * errors: List of String
+    \tOne message per invalid record, at most MAX_REPORTED_ERRORS
+
+    """
+
+    def __init__(self, errors, count):
+        self.errors = errors
+        msg = "{} invalid records: {}".format(count, "; ".join(errors))
+        super(ProfileImportError, self).__init__(msg)
+
+
+# JSON lines
+
+def iter_records_jsonl(lines):
+    """Yields (record number, field dict) from JSON lines
+
+    Records are not validated. Lines that are no JSON objects yield a
+    ValueError instance instead of a dict.
+
+    """
+
+    for line_no, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError("Not a JSON object")
+        except ValueError as err:
+            record = err
+        yield line_no, record
+
+
+def write_profiles_jsonl(items, fileobj):
+    """Writes (name, PwmSettings) items as JSON lines to fileobj"""
+
+    for name, pwm in items:
+        record = [("Name", name)]
+        record.extend((field, getattr(pwm, field))
+                      for field in PROFILE_FIELDS[1:])
+        fileobj.write(json.dumps(dict(record), sort_keys=True))
+        fileobj.write("\n")
+
+
+# Browser extension RDF
+
+def _get_tag(namespace, name):
+    """Returns ElementTree tag or attribute name of name in namespace"""
+
+    return "{" + namespace + "}" + name
+
+
+def _wildcard_to_regex(wildcard):
+    """Returns the regular expression of an extension wildcard pattern
+
+    As in the extension, * matches any string, ? any character, and the
+    whole URL has to match.
+
+    """
+
+    parts = []
+    for char in wildcard:
+        if char == "*":
+            parts.append(".*")
+        elif char == "?":
+            parts.append(".")
+        else:
+            parts.append(re.escape(char))
+    return "^" + "".join(parts) + "$"
+
+
+def _regex_to_wildcard(regex):
+    """Returns the wildcard pattern of regex or None
+
+    Inverts _wildcard_to_regex. Other regular expressions give None.
+
+    """
+
+    match = _WILDCARD_REGEX_RE.match(regex)
+    if match is None:
+        return None
+
+    wildcard = []
+    for token in _WILDCARD_TOKEN_RE.finditer(match.group(1)):
+        if token.group() == ".*":
+            wildcard.append("*")
+        elif token.group() == ".":
+            wildcard.append("?")
+        else:
+            wildcard.append(token.group(1) or token.group(2))
+    return "".join(wildcard)
+
+
+def _from_rdf_pattern(pattern, pattern_type):
+    """Returns the URLPatterns entry of an extension pattern"""
+
+    if pattern_type == "regex":
+        return "/" + pattern + "/"
+
+    match = _HOST_WILDCARD_RE.match(pattern)
+    if match is not None:
+        return match.group(1)
+    return "/" + _wildcard_to_regex(pattern) + "/"
+
+
+def _to_rdf_pattern(pattern):
+    """Returns the extension (pattern, pattern type) of a URLPatterns entry"""
+
+    if len(pattern) > 1 and pattern[0] == pattern[-1] == "/":
+        wildcard = _regex_to_wildcard(pattern[1:-1])
+        if wildcard is None or _HOST_WILDCARD_RE.match(wildcard):
+            return pattern[1:-1], "regex"
+        return wildcard, "wildcard"
+
+    # Host patterns
+    return "*://" + pattern + "/*", "wildcard"
+
+
+def _get_url_patterns(attrib):
+    """Returns URLPatterns from the enabled pattern attributes of attrib"""
+
+    patterns = []
+    i = 0
+    while _get_tag(PWM_NS, "pattern{}".format(i)) in attrib:
+        pattern = attrib[_get_tag(PWM_NS, "pattern{}".format(i))]
+        pattern_type = attrib.get(_get_tag(PWM_NS,
+                                           "patterntype{}".format(i)))
+        enabled = attrib.get(_get_tag(PWM_NS, "patternenabled{}".format(i)),
+                             "true")
+        if enabled == "true" and pattern:
+            patterns.append(_from_rdf_pattern(pattern, pattern_type))
+        i += 1
+    return " ".join(patterns)
+
+
+def iter_records_rdf(fileobj):
+    """Yields (record number, field dict) from a browser extension RDF file
+
+    Accounts and the defaults become records, folders and settings are
+    skipped. The defaults are named "default". Records are not validated.
+
+    """
+
+    # Imported here, the XML modules are only needed for RDF files
+    from xml.etree.ElementTree import iterparse
+
+    description_tag = _get_tag(RDF_NS, "Description")
+    about_attribute = _get_tag(RDF_NS, "about")
+    algorithm_attribute = _get_tag(PWM_NS, "hashAlgorithmLB")
+
+    record_no = 0
+    for _, element in iterparse(fileobj):
+        if element.tag != description_tag:
+            continue
+
+        attrib = element.attrib
+        if algorithm_attribute in attrib:
+            record_no += 1
+            record = {}
+            for rdf_name, field in RDF_ATTRIBUTES:
+                value = attrib.get(_get_tag(PWM_NS, rdf_name))
+                if value is not None:
+                    record[field] = value
+            if attrib.get(about_attribute) == RDF_DEFAULTS:
+                record["Name"] = "default"
+            if "UseLeet" in record:
+                record["UseLeet"] = RDF_LEET.get(record["UseLeet"],
+                                                 record["UseLeet"])
+            for field in ("Length", "LeetLvl"):
+                if field in record:
+                    try:
+                        record[field] = int(record[field])
+                    except ValueError:
+                        pass  # Reported by the validation
+            record["URLPatterns"] = _get_url_patterns(attrib)
+            yield record_no, record
+
+        # Parsed elements are not needed any more
+        element.clear()
+
+
+def write_profiles_rdf(items, fileobj):
+    """Writes (name, PwmSettings) items as browser extension RDF to fileobj
+
+    Raises ValueError for key stretching algorithms, which the extension
+    does not support.
+
+    """
+
+    from xml.sax.saxutils import quoteattr
+
+    leet_options = dict((value, key) for key, value in RDF_LEET.items())
+
+    fileobj.write('<?xml version="1.0"?>\n'
+                  '<RDF:RDF xmlns:NS1={} xmlns:RDF={}>\n'.format(
+                      quoteattr(PWM_NS), quoteattr(RDF_NS)))
+
+    count = 0
+    for name, pwm in items:
+        if pwm.Algorithm in STRETCHING_ALGORITHM_2_HASH_FUNC:
+            msg = "{}: {} is not supported by the browser extension"
+            raise ValueError(msg.format(name, pwm.Algorithm))
+
+        if name == "default":
+            about = RDF_DEFAULTS
+        else:
+            count += 1
+            about = "rdf:#$pwm{}".format(count)
+
+        values = {
+            "Name": name,
+            "UseLeet": leet_options[pwm.UseLeet],
+        }
+        attributes = [("RDF:about", about)]
+        for rdf_name, field in RDF_ATTRIBUTES:
+            value = values[field] if field in values \
+                else getattr(pwm, field)
+            attributes.append(("NS1:" + rdf_name, value))
+        for i, pattern in enumerate(pwm.URLPatterns.split()):
+            pattern, pattern_type = _to_rdf_pattern(pattern)
+            attributes.extend([
+                ("NS1:pattern{}".format(i), pattern),
+                ("NS1:patterntype{}".format(i), pattern_type),
+                ("NS1:patternenabled{}".format(i), "true"),
+            ])
+
+        fileobj.write("  <RDF:Description")
+        for attribute, value in attributes:
+            fileobj.write("\n      {}={}".format(attribute,
+                                                 quoteattr(str(value))))
+        fileobj.write(" />\n")
+
+    # The accounts folder references the accounts in order
+    fileobj.write('  <RDF:Seq RDF:about={}>\n'.format(quoteattr(
+        RDF_ACCOUNTS)))
+    for i in range(1, count + 1):
+        fileobj.write('    <RDF:li RDF:resource="rdf:#$pwm{}"/>\n'.format(i))
+    fileobj.write("  </RDF:Seq>\n</RDF:RDF>\n")
+
+
+# Export and import
+
+def get_bulk_format(filepath, bulk_format=None):
+    """Returns bulk_format or the format from the file extension"""
+
+    if bulk_format is None:
+        bulk_format = "rdf" if filepath.lower().endswith(".rdf") \
+            else "jsonl"
+    if bulk_format not in BULK_FORMATS:
+        msg = "Unknown bulk format {}. Use one of {}."
+        raise ValueError(msg.format(bulk_format, ", ".join(BULK_FORMATS)))
+    return bulk_format
+
+
+def export_profiles(settings_list, filepath, bulk_format=None):
+    """Writes all profiles of settings_list into one file
+
+    The file is replaced atomically. Returns the number of profiles.
+
+    Parameters
+    ----------
+
+    * settings_list: PwmSettingsList
+    \tProfiles to export
+    * filepath: String
+    \tPath of the bulk file, "-" for stdout
+    * bulk_format: String (default: from the file extension, else "jsonl")
+    \tOne of BULK_FORMATS
+
+    """
+
+    bulk_format = get_bulk_format(filepath, bulk_format)
+    write_profiles = write_profiles_rdf if bulk_format == "rdf" \
+        else write_profiles_jsonl
+
+    if filepath == "-":
+        write_profiles(settings_list.items(), sys.stdout)
+        return len(settings_list)
+
+    tmp_filepath = filepath + ".tmp"
+    try:
+        with io.open(tmp_filepath, "w", encoding="utf-8",
+                     newline="") as outfile:
+            write_profiles(settings_list.items(), outfile)
+        os.replace(tmp_filepath, filepath)
+    except BaseException:
+        if os.path.exists(tmp_filepath):
+            os.remove(tmp_filepath)
+        raise
+    return len(settings_list)
+
+
+def validate_batch(batch):
+    """Returns (profiles, errors) for a batch of records
+
+    Parameters
+    ----------
+
+    * batch: List of (record number, field dict or ValueError)
+    \tRecords as yielded by iter_records_jsonl or iter_records_rdf
+
+    """
+
+    profiles = []
+    errors = []
+    for record_no, record in batch:
+        if isinstance(record, ValueError):
+            errors.append("Record {}: {}".format(record_no, record))
+            continue
+
+        fields = dict(record)
+        name = fields.pop("Name", None)
+        try:
+            if not isinstance(name, str) or not name or \
+               os.sep in name or (os.altsep and os.altsep in name):
+                raise ValueError("Invalid name {!r}".format(name))
+            if "MasterPass" in fields:
+                raise ValueError("MasterPass must not be imported")
+            profiles.append((name, PwmSettings(**fields)))
+        except (TypeError, ValueError) as err:
+            # attrs validators add the attribute and more to args
+            errors.append("Record {}: {}".format(record_no, err.args[0]))
+    return profiles, errors
+
+
+def import_profiles(filepath, settings_list, bulk_format=None,
+                    batch_size=IMPORT_BATCH_SIZE, replace=True):
+    """Imports the profiles of a bulk file into settings_list
+
+    Returns the number of imported profiles. All records are validated
+    before settings_list is changed. If any record is invalid,
+    ProfileImportError is raised and settings_list is left unchanged.
+
+    Parameters
+    ----------
+
+    * filepath: String
+    \tPath of the bulk file, "-" for stdin
+    * settings_list: PwmSettingsList
+    \tProfiles are added to or replaced in this list
+    * bulk_format: String (default: from the file extension, else "jsonl")
+    \tOne of BULK_FORMATS
+    * batch_size: Integer (default: IMPORT_BATCH_SIZE)
+    \tNumber of records that are validated at once
+    * replace: Bool (default: True)
+    \tReplace profiles with existing names, else such records are invalid
+
+    """
+
+    bulk_format = get_bulk_format(filepath, bulk_format)
+
+    if bulk_format == "rdf":
+        infile = sys.stdin.buffer if filepath == "-" \
+            else open(filepath, "rb")
+        records = iter_records_rdf(infile)
+    else:
+        infile = sys.stdin if filepath == "-" \
+            else io.open(filepath, encoding="utf-8")
+        records = iter_records_jsonl(infile)
+
+    staged = OrderedDict()
+    errors = []
+    error_count = 0
+
+    def validate(batch):
+        """Validates a batch and stages its profiles"""
+
+        profiles, batch_errors = validate_batch(batch)
+        for name, pwm in profiles:
+            if name in staged:
+                batch_errors.append("Duplicate name {}".format(name))
+            elif not replace and name in settings_list:
+                batch_errors.append("Existing name {}".format(name))
+            else:
+                staged[name] = pwm
+        return batch_errors
+
+    try:
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) >= batch_size:
+                batch_errors = validate(batch)
+                error_count += len(batch_errors)
+                errors.extend(batch_errors[:MAX_REPORTED_ERRORS -
+                                           len(errors)])
+                batch = []
+        batch_errors = validate(batch)
+        error_count += len(batch_errors)
+        errors.extend(batch_errors[:MAX_REPORTED_ERRORS - len(errors)])
+    except SyntaxError as err:
+        # ElementTree.ParseError
+        raise ProfileImportError(["Invalid XML: {}".format(err)], 1)
+    finally:
+        if infile not in (sys.stdin, getattr(sys.stdin, "buffer", None)):
+            infile.close()
+
+    if error_count:
+        raise ProfileImportError(errors, error_count)
+
+    # Commit
+    for name, pwm in staged.items():
+        settings_list[name] = pwm
+    return len(staged)
@@ -0,0 +1,200 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+PasswordMaker - Calibration
+===========================
+
+Create and manage passwords.
+
+
+Copyright (C):
+
+    2005      Eric H. Jung, Miquel Burns and LeahScape, Inc.
+              <http://passwordmaker.org>
+              <grimholtz@yahoo.com>
+    2005-2007 Pedro Gimeno Fortea and Miquel Matthew 'Fire' Burns
+              <http://www.formauri.es/personal/pgimeno/>
+              <miquelfire@gmail.com>
+    2010      Aurelien Bompard
+              <http://aurelien.bompard.org>
+    2012      Richard Beales
+              <rich@richbeales.net>
+    2014      Richard Beales, Laurent Bachelier and Christoph Sarnowski
+              <rich@richbeales.net>
+    2018      Martin Manns
+              <mmanns@gmx.net>
+
+    This file is part of PasswordMaker.
+
+    PasswordMaker is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Foobar is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with Foobar.  If not, see <https://www.gnu.org/licenses/>.
+
+Measures the derivation cost of each algorithm on the local machine and
+recommends the fastest hash backend per algorithm. Used by
+`passwordmaker.py calibrate`.
+
+"""
+
+import os
+from timeit import default_timer
+
+import attr
+
+from pwmlib import ALGORITHMS, CHARSET_PRESETS, HASH_BACKENDS
+from pwmlib import STRETCHING_ALGORITHMS, STRETCHING_ALGORITHM_2_HASH_FUNC
+from pwmlib import generatepassword, profile
+
+CALIBRATION_LENGTHS = (8, 16, 32, 64, 128)
+
+
+def _rate(func, min_time, min_calls=3):
+    """Returns calls per second of func() measured for at least min_time"""
+
+    calls = 0
+    start = default_timer()
+    while True:
+        func()
+        calls += 1
+        elapsed = default_timer() - start
+        if elapsed >= min_time and calls >= min_calls:
+            return calls / elapsed
+
+
+def measure_backends(algorithm, min_time=0.05):
+    """Returns dict backend name -> digests per second for algorithm"""
+
+    data = os.urandom(64)
+    key = os.urandom(16)
+
+    rates = {}
+    for backend, func in HASH_BACKENDS[algorithm].items():
+        if algorithm.startswith("hmac-"):
+            rates[backend] = _rate(lambda: func(key, data), min_time)
+        else:
+            rates[backend] = _rate(lambda: func(data), min_time)
+    return rates
+
+
+@attr.s
+class CalibrationResult(object):
+    """Results of calibrate for one algorithm
+
+    Attributes
+    ----------
+
+    * algorithm: String
+    * rates: Dict
+    \tMaps (password length, charset preset name) to passwords per second
+    * breakdown: List
+    \tPwmProfile.breakdown of one call per combination
+    * backend_rates: Dict
+    \tMaps backend name to digests per second
+    * recommended_backend: String or None
+    \tFastest backend, None for algorithms without backend choice
+
+    """
+
+    algorithm = attr.ib()
+    rates = attr.ib(default=attr.Factory(dict))
+    breakdown = attr.ib(default=attr.Factory(list))
+    backend_rates = attr.ib(default=attr.Factory(dict))
+    recommended_backend = attr.ib(default=None)
+
+
+def calibrate(algorithms=ALGORITHMS + STRETCHING_ALGORITHMS,
+              lengths=CALIBRATION_LENGTHS,
+              charsets=CHARSET_PRESETS, min_time=0.02):
+    """Generator of CalibrationResult instances, one per algorithm
+
+    Parameters
+    ----------
+
+    * algorithms: Iterable of strings
+    \t(default: ALGORITHMS + STRETCHING_ALGORITHMS)
+    * lengths: Iterable of integers (default: CALIBRATION_LENGTHS)
+    * charsets: Dict (default: CHARSET_PRESETS)
+    \tMaps charset names to charsets
+    * min_time: Float (default: 0.02)
+    \tMinimum measurement time per combination in seconds
+
+    """
+
+    for algorithm in algorithms:
+        result = CalibrationResult(algorithm)
+
+        # Stretching algorithms run at least three times per combination
+        calls_min_time = 0 if algorithm in STRETCHING_ALGORITHM_2_HASH_FUNC \
+            else min_time
+
+        for length in lengths:
+            for name, charset in charsets.items():
+                def derive():
+                    """Derives one password"""
+                    generatepassword(algorithm, "calibration",
+                                     "passwordmaker.org", length, charset)
+
+                result.rates[length, name] = _rate(derive, calls_min_time)
+
+        # Separate pass, so that the profile hooks do not bias the rates
+        with profile() as prof:
+            for length in lengths:
+                for charset in charsets.values():
+                    generatepassword(algorithm, "calibration",
+                                     "passwordmaker.org", length, charset)
+
+        result.breakdown = prof.breakdown()
+
+        if algorithm in HASH_BACKENDS:
+            result.backend_rates = measure_backends(algorithm)
+            result.recommended_backend = max(result.backend_rates,
+                                             key=result.backend_rates.get)
+
+        yield result
+
+
+def format_result(result):
+    """Returns a CalibrationResult as printable report"""
+
+    # Presets first in their order, then other charsets by name
+    presets = list(CHARSET_PRESETS)
+    charset_names = sorted(set(name for _, name in result.rates),
+                           key=lambda name: (name not in presets,
+                                             presets.index(name)
+                                             if name in presets else 0,
+                                             name))
+    lengths = sorted(set(length for length, _ in result.rates))
+
+    lines = [result.algorithm, "  passwords/s by length and charset"]
+    lines.append("  {:>8}".format("length") + "".join(
+        "{:>14}".format(name) for name in charset_names))
+    for length in lengths:
+        lines.append("  {:>8}".format(length) + "".join(
+            "{:>14.0f}".format(result.rates[length, name])
+            for name in charset_names))
+
+    total = sum(total for stage, _, total, _ in result.breakdown
+                if stage == "generatepassword") or 1.0
+    lines.append("  stage breakdown")
+    for stage, count, stage_total, mean in result.breakdown:
+        lines.append("  {:>18} {:>10} calls {:>10.2f} us/call {:>6.1f} %"
+                     .format(stage, count, mean * 1e6,
+                             100.0 * stage_total / total))
+
+    for backend, rate in sorted(result.backend_rates.items()):
+        marker = " (recommended)" if backend == result.recommended_backend \
+            else ""
+        lines.append("  backend {:<12} {:>12.0f} digests/s{}".format(
+            backend, rate, marker))
+
+    return "\n".join(lines)
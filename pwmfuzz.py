@@ -0,0 +1,505 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+PasswordMaker - Differential fuzzing
+====================================
+
+Create and manage passwords.
+
+
+Copyright (C):
+
+    2005      Eric H. Jung, Miquel Burns and LeahScape, Inc.
+              <http://passwordmaker.org>
+              <grimholtz@yahoo.com>
+    2005-2007 Pedro Gimeno Fortea and Miquel Matthew 'Fire' Burns
+              <http://www.formauri.es/personal/pgimeno/>
+              <miquelfire@gmail.com>
+    2010      Aurelien Bompard
+              <http://aurelien.bompard.org>
+    2012      Richard Beales
+              <rich@richbeales.net>
+    2014      Richard Beales, Laurent Bachelier and Christoph Sarnowski
+              <rich@richbeales.net>
+    2018      Martin Manns
+              <mmanns@gmx.net>
+
+    This file is part of PasswordMaker.
+
+    PasswordMaker is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Foobar is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with Foobar.  If not, see <https://www.gnu.org/licenses/>.
+
+Property-based differential tests of the optimised derivation paths. Random
+but reproducible cases (keys, URLs including non-ASCII characters, charsets
+of 2 to 256 characters with duplicates, lengths, prefixes, suffixes and
+l33t settings) are derived with each candidate and with a frozen reference
+implementation of generatepassword. Mismatches are shrunk to a minimal case.
+
+Run `python pwmfuzz.py [n_cases] [seed] [workers]`.
+
+"""
+
+import hashlib
+import hmac
+import random
+import sys
+from collections import OrderedDict
+from multiprocessing import Pool, cpu_count
+
+import attr
+
+from pwmlib import ALGORITHMS, ALGORITHM_2_HASH_FUNC
+from pwmlib import FULL_CHARSET, LEET_OPTIONS
+from pwmlib import PwmSettings, generatepassword, generatepasswordfrom
+
+try:
+    from Crypto.Hash import MD4, RIPEMD
+    HAS_CRYPTO = True
+except ImportError:
+    HAS_CRYPTO = False
+
+# Frozen reference implementation
+#
+# The following functions are a copy of the derivation before it has been
+# optimised, reduced to what generatepassword uses. They must not be
+# changed: they define the expected output of every candidate.
+
+_REFERENCE_HASH_NAMES = {
+    "md5": "md5",
+    "sha1": "sha1",
+    "sha256": "sha256",
+    "md4": "md4",
+    "rmd160": "ripemd160",
+}
+
+
+def _reference_constructor(name):
+    """Returns hash constructor for the digest name of a wrapper"""
+
+    hashlib_name = _REFERENCE_HASH_NAMES[name]
+    try:
+        hashlib.new(hashlib_name)
+    except ValueError:
+        if HAS_CRYPTO and name == "md4":
+            return MD4.new
+        elif HAS_CRYPTO and name == "rmd160":
+            return RIPEMD.new
+        raise
+    return lambda data=b"": hashlib.new(hashlib_name, data)
+
+
+def _reference_digest(hash_algorithm, key, data):
+    """Returns raw digest of one round of the reference derivation"""
+
+    # The hash function name, e. g. any_hmac_sha1, decides the digest. This
+    # keeps e. g. hmac-sha256 mapped to any_hmac_sha1 without pycrypto.
+    hash_func_name = ALGORITHM_2_HASH_FUNC[hash_algorithm]
+    if hash_func_name.startswith("any_hmac_"):
+        constructor = _reference_constructor(hash_func_name[9:])
+        return hmac.new(key, data, constructor).digest()
+    constructor = _reference_constructor(hash_func_name[4:])
+    return constructor(data).digest()
+
+
+def reference_rstr2any(inp, encoding):
+    """Reference conversion of a raw digest to an encoded string"""
+
+    divisor = len(encoding)
+
+    def get_quotient_remainder(dividend):
+        """Returns tuple (quotient, remainder) from dividend"""
+
+        quotient = []
+        remainder = 0
+        for dividend_ele in dividend:
+            remainder = (remainder << 16) + dividend_ele
+            quot = remainder // divisor
+            remainder -= quot * divisor
+            if quotient or quot:
+                quotient.append(quot)
+
+        return quotient, remainder
+
+    remainders = []
+
+    # Convert to an array of 16-bit big-endian values, forming the dividend
+    inp = bytearray(inp)
+    dividend = [(inp[i] << 8) | inp[i + 1] for i in range(0, len(inp), 2)]
+
+    while dividend:
+        dividend, remainder = get_quotient_remainder(dividend)
+        remainders.append(remainder)
+
+    output = ""
+    for i in reversed(remainders):
+        output += encoding[i]
+
+    return output
+
+
+def reference_leet(leet_level, message):
+    """Reference l33t conversion"""
+
+    leet_additional_mappings_per_level = [
+        {},
+        {"a": "4", "e": "3", "l": "1", "o": "0", "q": "9", "t": "7"},
+        {"i": "l", "s": "5", "z": "2"},
+        {"b": "8", "g": "6", "i": "'", "y": "'/"},
+        {"a": "@"},
+        {"b": "|3", "h": "#", "i": "!", "j": "7", "k": "|<", "p": "|>",
+         "r": "|2", "s": "$", "v": "\\/"},
+        {"d": "|)", "e": "&", "f": "|=", "j": ",|"},
+        {"c": "[", "m": "^^", "n": "^/", "p": "|*", "s": "5", "u": "(_)",
+         "w": "\\/\\/", "x": "><"},
+        {"b": "8", "c": "(", "h": "|-|", "j": "_|", "k": "|(", "m": "|\\/|",
+         "n": "|\\|", "o": "()", "p": "|>", "q": "(,)", "r": "|2", "s": "$",
+         "t": "|", "u": "|_|", "w": "\\^/", "x": ")(", "z": "\"/_"},
+        {"k": "|{", "l": "|_", "m": "/\\/\\"},
+    ]
+
+    leet_mapping = {}
+    for j in range(leet_level + 1):
+        leet_mapping.update(leet_additional_mappings_per_level[j])
+
+    leet_message = ""
+    for char in message.lower():
+        try:
+            leet_message += leet_mapping[char]
+        except KeyError:
+            leet_message += char
+
+    return leet_message
+
+
+def reference_generatepassword(hash_algorithm, key, data, password_length,
+                               charset, prefix="", suffix="", use_leet="none",
+                               leet_level=0):
+    """Reference implementation of generatepassword"""
+
+    if len(charset) < 2:
+        msg = "The charset {} contains less than 2 characters."
+        raise ValueError(msg.format(charset))
+
+    hash_uses_hmac = hash_algorithm.count("hmac") > 0
+
+    if use_leet in ("before", "both"):
+        key = reference_leet(leet_level, key)
+        data = reference_leet(leet_level, data)
+
+    key = key.encode("utf-8")
+    data = data.encode("utf-8")
+
+    tkey = key
+    dat = data
+
+    password = ''
+
+    for i in range(1000):
+        if i:
+            key = tkey + b"\n" + str(i).encode("utf-8")
+
+        if hash_uses_hmac:
+            digest = _reference_digest(hash_algorithm, key, dat)
+        else:
+            dat = key + data
+            digest = _reference_digest(hash_algorithm, None, dat)
+        password += reference_rstr2any(digest, charset)
+
+        if len(password) >= password_length:
+            break
+
+    if use_leet in ("after", "both"):
+        password = reference_leet(leet_level, password)
+
+    if prefix:
+        password = prefix + password
+    if suffix:
+        password = password[:password_length-len(suffix)] + suffix
+
+    return password[:password_length]
+
+
+# Cases
+
+FUZZ_ALGORITHMS = ALGORITHMS
+
+# Characters of random strings: ASCII, Latin-1, BMP and astral characters
+_ALPHABET = FULL_CHARSET + " \n\t\xe4\xf6\xfc\xdf\xe9\xf1\u20ac\u03a9\u0436" \
+    "\u4e2d\u6587\u0645\U0001f511\U0001f600"
+
+
+@attr.s(frozen=True)
+class FuzzCase(object):
+    """Arguments of one generatepassword call"""
+
+    algorithm = attr.ib(default="md5")
+    key = attr.ib(default="")
+    data = attr.ib(default="")
+    length = attr.ib(default=8)
+    charset = attr.ib(default=FULL_CHARSET)
+    prefix = attr.ib(default="")
+    suffix = attr.ib(default="")
+    use_leet = attr.ib(default="none")
+    leet_level = attr.ib(default=0)
+
+    def args(self):
+        """Returns positional arguments of generatepassword"""
+
+        return (self.algorithm, self.key, self.data, self.length, self.charset,
+                self.prefix, self.suffix, self.use_leet, self.leet_level)
+
+
+def _random_string(rand, max_length):
+    """Returns random string of characters from _ALPHABET"""
+
+    return "".join(rand.choice(_ALPHABET)
+                   for _ in range(rand.randint(0, max_length)))
+
+
+def generate_case(seed, index, algorithms=FUZZ_ALGORITHMS):
+    """Returns the reproducible FuzzCase number index of seed"""
+
+    rand = random.Random("{}:{}".format(seed, index))
+
+    if rand.random() < 0.1:
+        # Default profile, i. e. the specialised fast path
+        return FuzzCase(key=_random_string(rand, 16),
+                        data=_random_string(rand, 64))
+
+    charset = "".join(rand.choice(_ALPHABET)
+                      for _ in range(rand.randint(2, 256)))
+    if len(set(charset)) < 2:
+        charset += "ab"
+    use_leet = rand.choice(LEET_OPTIONS)
+
+    return FuzzCase(algorithm=rand.choice(algorithms),
+                    key=_random_string(rand, 16),
+                    data=_random_string(rand, 64),
+                    length=rand.randint(1, 128),
+                    charset=charset,
+                    prefix=_random_string(rand, 4) * (rand.random() < 0.2),
+                    suffix=_random_string(rand, 4) * (rand.random() < 0.2),
+                    use_leet=use_leet,
+                    leet_level=rand.randint(-1, 9))
+
+
+# Candidates
+
+def candidate_generatepassword(case):
+    """generatepassword including its early-exit conversion"""
+
+    return generatepassword(*case.args())
+
+
+def candidate_generatepasswordfrom(case):
+    """generatepasswordfrom including the default profile fast path"""
+
+    settings = PwmSettings(URL=case.data, MasterPass=case.key,
+                           Algorithm=case.algorithm, Length=case.length,
+                           CharacterSet=case.charset, Prefix=case.prefix,
+                           Suffix=case.suffix, UseLeet=case.use_leet,
+                           LeetLvl=case.leet_level)
+    return generatepasswordfrom(settings)
+
+
+CANDIDATES = OrderedDict([
+    ("generatepassword", candidate_generatepassword),
+    ("generatepasswordfrom", candidate_generatepasswordfrom),
+])
+
+
+def _outcome(func, case):
+    """Returns result of func(case) or the type name of its exception"""
+
+    try:
+        return func(case)
+    except Exception as err:
+        return "<{}>".format(type(err).__name__)
+
+
+@attr.s(frozen=True)
+class FuzzFailure(object):
+    """Mismatch between a candidate and the reference"""
+
+    index = attr.ib()
+    candidate = attr.ib()
+    case = attr.ib()
+    shrunk_case = attr.ib()
+    expected = attr.ib()
+    actual = attr.ib()
+
+
+def _reference(case):
+    """Reference outcome for case"""
+
+    return reference_generatepassword(*case.args())
+
+
+def _fails(candidate, case):
+    """Returns True if candidate and reference differ for case"""
+
+    return _outcome(candidate, case) != _outcome(_reference, case)
+
+
+def _deletions(value):
+    """Yields value with chunks of halving sizes removed, largest first"""
+
+    size = len(value)
+    while size:
+        for start in range(0, len(value), size):
+            yield value[:start] + value[start + size:]
+        size //= 2
+
+
+def _simplifications(case):
+    """Yields simpler variants of case, simplest first"""
+
+    if case.algorithm != "md5":
+        yield attr.evolve(case, algorithm="md5")
+    if case.use_leet != "none":
+        yield attr.evolve(case, use_leet="none")
+    if case.leet_level != 0:
+        yield attr.evolve(case, leet_level=0)
+    if case.length > 1:
+        yield attr.evolve(case, length=1)
+        yield attr.evolve(case, length=case.length // 2)
+        yield attr.evolve(case, length=case.length - 1)
+    if case.charset != "AB":
+        yield attr.evolve(case, charset="AB")
+    for charset in _deletions(case.charset):
+        if len(set(charset)) >= 2:
+            yield attr.evolve(case, charset=charset)
+    for name in ("prefix", "suffix", "key", "data"):
+        for value in _deletions(getattr(case, name)):
+            yield attr.evolve(case, **{name: value})
+
+
+def shrink(candidate, case, max_checks=5000):
+    """Returns a minimal case for which candidate still fails
+
+    Greedily applies the first simplification that keeps the failure until
+    none does or max_checks cases have been tried.
+
+    """
+
+    checks = 0
+    while checks < max_checks:
+        for simpler in _simplifications(case):
+            checks += 1
+            if _fails(candidate, simpler):
+                case = simpler
+                break
+            if checks >= max_checks:
+                break
+        else:
+            break
+    return case
+
+
+def check_case(seed, index, candidates=None):
+    """Returns list of (name, case, expected, actual) for failing candidates"""
+
+    if candidates is None:
+        candidates = CANDIDATES
+
+    case = generate_case(seed, index)
+    expected = _outcome(_reference, case)
+    failures = []
+    for name, candidate in candidates.items():
+        actual = _outcome(candidate, case)
+        if actual != expected:
+            failures.append((name, case, expected, actual))
+    return failures
+
+
+def _check_chunk(task):
+    """Pool worker: checks cases start to stop"""
+
+    seed, start, stop, candidates = task
+    return [(index, failure) for index in range(start, stop)
+            for failure in check_case(seed, index, candidates)]
+
+
+def run_fuzz(n_cases=1000, seed=0, workers=None, candidates=None,
+             chunk_size=50):
+    """Returns list of FuzzFailure for n_cases cases of seed
+
+    Case number i only depends on seed and i, so that a failure is
+    reproduced by generate_case(seed, i) regardless of workers.
+
+    Parameters
+    ----------
+
+    * n_cases: Integer (default: 1000)
+    \tNumber of cases
+    * seed: Integer or String (default: 0)
+    \tSeed of the case generator
+    * workers: Integer (default: number of CPUs)
+    \tNumber of processes. Candidates must be picklable if workers > 1.
+    * candidates: Mapping name -> callable(FuzzCase) (default: CANDIDATES)
+    \tImplementations that are compared with the reference
+    * chunk_size: Integer (default: 50)
+    \tNumber of cases per worker task
+
+    """
+
+    if candidates is None:
+        candidates = CANDIDATES
+    if workers is None:
+        workers = cpu_count()
+
+    tasks = [(seed, start, min(start + chunk_size, n_cases), candidates)
+             for start in range(0, n_cases, chunk_size)]
+
+    if workers > 1 and len(tasks) > 1:
+        pool = Pool(min(workers, len(tasks)))
+        try:
+            results = pool.map(_check_chunk, tasks)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        results = [_check_chunk(task) for task in tasks]
+
+    failures = []
+    for result in results:
+        for index, (name, case, expected, actual) in result:
+            shrunk_case = shrink(candidates[name], case)
+            failures.append(FuzzFailure(index, name, case, shrunk_case,
+                                        expected, actual))
+    return failures
+
+
+def main():
+    """Runs the fuzzer with n_cases, seed and workers from argv"""
+
+    n_cases = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    seed = sys.argv[2] if len(sys.argv) > 2 else "0"
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else None
+
+    failures = run_fuzz(n_cases, seed, workers)
+    for failure in failures:
+        print("Case {} ({}): expected {!r}, got {!r}".format(
+            failure.index, failure.candidate, failure.expected,
+            failure.actual))
+        print("  minimal case: {!r}".format(failure.shrunk_case))
+        print("  minimal expected {!r}, got {!r}".format(
+            _outcome(_reference, failure.shrunk_case),
+            _outcome(CANDIDATES[failure.candidate], failure.shrunk_case)))
+    print("{} cases, {} failures".format(n_cases, len(failures)))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
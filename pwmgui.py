@@ -0,0 +1,597 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+PasswordMaker - GUI
+===================
+
+Create and manage passwords.
+
+
+Copyright (C):
+
+    2005      Eric H. Jung, Miquel Burns and LeahScape, Inc.
+              <http://passwordmaker.org>
+              <grimholtz@yahoo.com>
+    2005-2007 Pedro Gimeno Fortea and Miquel Matthew 'Fire' Burns
+              <http://www.formauri.es/personal/pgimeno/>
+              <miquelfire@gmail.com>
+    2010      Aurelien Bompard
+              <http://aurelien.bompard.org>
+    2012      Richard Beales
+              <rich@richbeales.net>
+    2014      Richard Beales, Laurent Bachelier and Christoph Sarnowski
+              <rich@richbeales.net>
+    2018      Martin Manns
+              <mmanns@gmx.net>
+
+    This file is part of PasswordMaker.
+
+    PasswordMaker is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Foobar is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with Foobar.  If not, see <https://www.gnu.org/licenses/>.
+
+Tkinter GUI of passwordmaker.py. It is imported only when the GUI is
+started, so that the command-line interface does not load tkinter.
+
+"""
+
+
+import attr
+
+import tkinter as tk
+from tkinter import simpledialog, messagebox
+from tkinter import font as tkfont
+
+from pwmlib import ALGORITHMS, LEET_OPTIONS, STRETCHING_ALGORITHMS
+from pwmlib import generatepasswordfrom, PwmSettingsList, PwmSettings
+from pwmlib import PrefixIndex
+
+
+class TextWidget(tk.Entry, object):
+    """Text entry widget
+
+    Interfaces: get, set
+
+    """
+
+    def set(self, value):
+        """Sets current text"""
+
+        self.delete(0, "end")
+        self.insert(0, value)
+
+
+class PasswordWidget(TextWidget):
+    """Password entry widget
+
+    Interfaces: get, set
+
+    """
+
+    def __init__(self, parent, *args, **kwargs):
+        kwargs.update({'show': "*"})
+
+        super(PasswordWidget, self).__init__(parent, *args, **kwargs)
+
+
+class IntWidget(tk.Spinbox, object):
+    """Spinbox widget for Integers
+
+    Interfaces: get, set
+
+    """
+
+    def __init__(self, parent, *args, **kwargs):
+        kwargs.setdefault("from_", 1)
+        kwargs.setdefault("to", 128)
+        super(IntWidget, self).__init__(parent, *args, **kwargs)
+
+    def get(self):
+        return int(super(IntWidget, self).get())
+
+    def set(self, value):
+        """Sets current text"""
+
+        self.delete(0, "end")
+        self.insert(0, value)
+
+
+class AlgorithmWidget(tk.OptionMenu, object):
+    """OptionMenu widget for Algorithms
+
+    Interfaces: get, set
+
+    """
+
+    def __init__(self, parent):
+        self.alg = tk.StringVar(parent)
+        super(AlgorithmWidget, self).__init__(
+            parent, self.alg, "md5",
+            *(ALGORITHMS[1:] + STRETCHING_ALGORITHMS))
+
+    def get(self):
+        """Returns the current algorithm as string"""
+
+        return self.alg.get()
+
+    def set(self, value):
+        """Sets current algorithm"""
+
+        assert value in ALGORITHMS + STRETCHING_ALGORITHMS
+        self.alg.set(value)
+
+
+class UseLeetWidget(tk.OptionMenu, object):
+    """OptionMenu widget for l33t speech usage
+
+    Interfaces: get, set
+
+    """
+
+    def __init__(self, parent):
+        self.leet_usage = tk.StringVar(parent)
+        super(UseLeetWidget, self).__init__(parent, self.leet_usage, "none",
+                                            *LEET_OPTIONS[1:])
+
+    def get(self):
+        """Returns the current algorithm as string"""
+
+        return self.leet_usage.get()
+
+    def set(self, value):
+        """Sets current algorithm"""
+
+        assert value in LEET_OPTIONS
+        self.leet_usage.set(value)
+
+
+class ProfileListWidget(tk.Frame, object):
+    """Virtualised profile list with a type-to-filter search box
+
+    The Listbox only holds the currently visible page of profile names.
+    Scrolling, filtering and adding or deleting profiles only rewrite the
+    visible rows that have changed. Filtering uses a PrefixIndex.
+
+    Interfaces: get, select, set_names, insert, delete
+
+    """
+
+    def __init__(self, parent, command=None, rows=10):
+        super(ProfileListWidget, self).__init__(parent)
+
+        self.command = command
+        self.rows = rows
+
+        self.names = []  # All profile names in settings order
+        self.shown = []  # Names that match the filter
+        self.prefix_index = PrefixIndex()
+        self.offset = 0  # Index in self.shown of the first visible row
+        self.selected = None
+        self._page = []  # Names that are currently in the Listbox
+
+        self.filter_var = tk.StringVar(self)
+        self.filter_entry = tk.Entry(self, textvariable=self.filter_var)
+        self.listbox = tk.Listbox(self, height=rows, exportselection=False)
+        self.scrollbar = tk.Scrollbar(self, orient="vertical",
+                                      command=self.on_scroll)
+
+        self.filter_var.trace_add("write", self.on_filter)
+        self.listbox.bind("<<ListboxSelect>>", self.on_select)
+        self.listbox.bind("<Configure>", self.on_configure)
+        self.listbox.bind("<MouseWheel>", self.on_mousewheel)
+        self.listbox.bind("<Button-4>",
+                          lambda event: self.on_scroll("scroll", -1, "units"))
+        self.listbox.bind("<Button-5>",
+                          lambda event: self.on_scroll("scroll", 1, "units"))
+
+        self.filter_entry.grid(row=0, column=0, columnspan=2, sticky="we")
+        self.listbox.grid(row=1, column=0, sticky="nsew")
+        self.scrollbar.grid(row=1, column=1, sticky="ns")
+        self.rowconfigure(1, weight=1)
+        self.columnconfigure(0, weight=1)
+
+    def get(self):
+        """Returns the selected profile name or None"""
+
+        return self.selected
+
+    def select(self, name):
+        """Selects profile name and scrolls it into view"""
+
+        self.selected = name
+        if name in self._page:
+            self._refresh()
+            return
+
+        try:
+            self.offset = self.shown.index(name)
+        except ValueError:
+            pass
+        self._refresh()
+
+    def set_names(self, names, selected=None):
+        """Replaces all profile names"""
+
+        self.names = list(names)
+        self.prefix_index = PrefixIndex(self.names)
+        self.selected = selected
+        self.offset = 0
+        self._apply_filter()
+
+    def insert(self, name):
+        """Appends profile name"""
+
+        self.names.append(name)
+        self.prefix_index.add(name)
+
+        prefix = self.filter_var.get()
+        if not prefix:
+            self.shown.append(name)
+        elif name.startswith(prefix):
+            self.shown = self.prefix_index.find(prefix)
+
+        self._refresh()
+
+    def delete(self, name):
+        """Removes profile name"""
+
+        self.names.remove(name)
+        self.prefix_index.remove(name)
+        if name in self.shown:
+            self.shown.remove(name)
+        if self.selected == name:
+            self.selected = None
+
+        self._refresh()
+
+    def _apply_filter(self):
+        """Updates self.shown from the filter text"""
+
+        prefix = self.filter_var.get()
+        if prefix:
+            self.shown = self.prefix_index.find(prefix)
+        else:
+            self.shown = list(self.names)
+        self._refresh()
+
+    def _refresh(self):
+        """Rewrites the visible rows that differ from the current page"""
+
+        self.offset = max(0, min(self.offset, len(self.shown) - self.rows))
+        page = self.shown[self.offset:self.offset + self.rows]
+
+        listbox = self.listbox
+        for idx, name in enumerate(page):
+            if idx >= len(self._page):
+                listbox.insert("end", name)
+            elif self._page[idx] != name:
+                listbox.delete(idx)
+                listbox.insert(idx, name)
+        if len(self._page) > len(page):
+            listbox.delete(len(page), "end")
+        self._page = page
+
+        listbox.selection_clear(0, "end")
+        if self.selected in page:
+            listbox.selection_set(page.index(self.selected))
+
+        n_shown = float(max(1, len(self.shown)))
+        self.scrollbar.set(self.offset / n_shown,
+                           min(1.0, (self.offset + self.rows) / n_shown))
+
+    def on_filter(self, *_):
+        """Filter entry event handler"""
+
+        self.offset = 0
+        self._apply_filter()
+
+    def on_scroll(self, *args):
+        """Scrollbar command"""
+
+        if args[0] == "moveto":
+            self.offset = int(float(args[1]) * len(self.shown))
+        elif args[0] == "scroll":
+            step = int(args[1])
+            if args[2] == "pages":
+                step *= self.rows
+            self.offset += step
+        self._refresh()
+
+    def on_mousewheel(self, event):
+        """Mouse wheel event handler"""
+
+        self.on_scroll("scroll", -1 if event.delta > 0 else 1, "units")
+
+    def on_configure(self, event):
+        """Adjusts the number of visible rows to the Listbox height"""
+
+        font = tkfont.Font(root=self, font=self.listbox.cget("font"))
+        rows = max(1, event.height // (font.metrics("linespace") + 1))
+        if rows != self.rows:
+            self.rows = rows
+            self._refresh()
+
+    def on_select(self, _):
+        """Listbox event handler"""
+
+        selection = self.listbox.curselection()
+        if not selection:
+            # Empty cell
+            return
+
+        self.selected = self._page[int(selection[0])]
+        if self.command is not None:
+            self.command(self.selected)
+
+
+class Application(tk.Frame):
+    """Main application window class"""
+
+    type2widget = {
+        "str": TextWidget,
+        "pwd": PasswordWidget,
+        "int": IntWidget,
+        "alg": AlgorithmWidget,
+        "l3t": UseLeetWidget,
+    }
+
+    # Interval for checking setting files for external changes
+    reload_interval_ms = 2000
+
+    def __init__(self, root=None):
+        self.root = root
+        tk.Frame.__init__(self, root)
+        self.background = root.cget("background")
+
+        self.settings_list = PwmSettingsList()
+        self.settings = self.settings_list.get_pwm_settings()
+
+        self.create_widgets()
+        self.layout()
+
+        self.load()
+
+        self.after(self.reload_interval_ms, self.poll_settings)
+
+    def create_widgets(self):
+        """Creates all widgets in main window"""
+
+        # Entry widgets
+
+        self.labels = []
+        self.entry_widgets = []
+
+        for setting in attr.fields(PwmSettings):
+            self.labels.append(tk.Label(self, justify="left",
+                                        text=setting.metadata["guitext"]))
+
+            # Field bounds, e.g. of Cost, replace the widget defaults
+            widget_kwargs = {}
+            if "range" in setting.metadata:
+                widget_kwargs["from_"], widget_kwargs["to"] = \
+                    setting.metadata["range"]
+            widget = self.type2widget[setting.type](self, **widget_kwargs)
+            widget.set(self.settings[setting.name])
+            self.entry_widgets.append(widget)
+
+        # Buttons
+
+        self.generate_button = tk.Button(self, text="Generate",
+                                         command=self.generate)
+        self.load_button = tk.Button(self, text="Load", command=self.load)
+        self.save_button = tk.Button(self, text="Save", command=self.save)
+        self.passwd_label = tk.Label(self, justify="left", text="Password")
+        self.listbox_label = tk.Label(self, justify="left", text="Settings")
+        self.profile_list = ProfileListWidget(self, command=self.on_listbox)
+        self.profile_list.set_names(["default"], selected="default")
+        self.new_setting_button = tk.Button(self, text="+",
+                                            command=self.new_setting)
+        self.delete_setting_button = tk.Button(self, text="-",
+                                               command=self.del_setting)
+
+        self.passwd_text = tk.Entry(self, fg="blue")
+
+    def layout(self):
+        """Places widgets on the grid"""
+
+        self.grid(sticky="nsew")
+        self.top = self.root.winfo_toplevel()
+        self.top.rowconfigure(0, weight=1)
+        self.top.columnconfigure(0, weight=1)
+        self.columnconfigure(0, weight=0)
+        self.columnconfigure(1, weight=1)
+        self.columnconfigure(2, weight=1)
+
+        for i, label in enumerate(self.labels):
+            label.grid(row=i, column=0, sticky="w", padx=5, pady=2)
+
+        for i, entry_widget in enumerate(self.entry_widgets):
+            entry_widget.grid(row=i, column=1, columnspan=2, sticky="we")
+
+        self.rowconfigure(i+1, weight=1)
+
+        self.generate_button.grid(row=i+1, column=1, columnspan=2, pady=5,
+                                  sticky="nsew")
+        self.load_button.grid(row=i+2, column=1, columnspan=1, pady=5,
+                              sticky="we")
+        self.save_button.grid(row=i+2, column=2, columnspan=1, pady=5,
+                              sticky="we")
+        self.listbox_label.grid(row=i+3, column=0, sticky="nw", padx=5, pady=2)
+        self.profile_list.grid(row=i+3, rowspan=3, column=1, columnspan=2,
+                               sticky="nsew")
+        self.new_setting_button.grid(row=i+4, column=0, sticky="n", padx=5,
+                                     pady=2)
+        self.delete_setting_button.grid(row=i+5, column=0, sticky="n",
+                                        padx=5, pady=2)
+        self.passwd_label.grid(row=i+6, column=0, sticky="w", padx=5, pady=2)
+        self.passwd_text.grid(row=i+6, column=1, columnspan=2, sticky="nsew")
+
+    def update_settings(self):
+        """Updates self.settings from entry widget values"""
+
+        attr_fields = attr.fields(PwmSettings)
+        for setting, widget in zip(attr_fields, self.entry_widgets):
+            self.settings.__setattr__(setting.name, widget.get())
+
+    def update_widgets(self):
+        """Updates widgets from current self.settings"""
+
+        self.settings = self.settings_list.get_pwm_settings()
+
+        for setting, widget in zip(attr.fields(PwmSettings),
+                                   self.entry_widgets):
+            widget.set(self.settings[setting.name])
+
+    def get_edits(self):
+        """Returns dict of widget values that differ from self.settings
+
+        The master password is always included. Values that cannot be
+        parsed, e.g. of a spinbox that is being edited, are skipped.
+
+        """
+
+        edits = {}
+        for setting, widget in zip(attr.fields(PwmSettings),
+                                   self.entry_widgets):
+            try:
+                value = widget.get()
+            except ValueError:
+                continue
+            if setting.name == "MasterPass" or \
+               value != self.settings[setting.name]:
+                edits[setting.name] = value
+        return edits
+
+    def apply_edits(self, edits):
+        """Sets widgets and self.settings from a get_edits dict"""
+
+        for setting, widget in zip(attr.fields(PwmSettings),
+                                   self.entry_widgets):
+            if setting.name in edits:
+                widget.set(edits[setting.name])
+        self.update_settings()
+
+    def update_listbox(self):
+        """Updates profile list from self.settings_list"""
+
+        self.profile_list.set_names(self.settings_list.pwm_names,
+                                    selected=self.settings_list.current)
+
+    def save(self):
+        """Saves settings to json file"""
+
+        self.update_settings()
+        self.settings_list.save()
+
+    def load(self):
+        """Loads settings from json file"""
+
+        self.settings_list.load()
+
+        self.update_listbox()
+        self.update_widgets()
+
+    def poll_settings(self):
+        """Applies external changes of setting files and reschedules itself
+
+        Only changed, added or removed setting files are parsed and only the
+        affected profile list rows are updated. Profiles with unsaved
+        changes are not replaced, see PwmSettingsList.reload. If the file of
+        the current profile changes, edits in the widgets and the master
+        password, which is not stored in files, are kept.
+
+        """
+
+        try:
+            current = self.settings_list.current
+            edits = self.get_edits()
+            changes = self.settings_list.reload()
+
+            for name in changes.removed:
+                if name in self.profile_list.prefix_index:
+                    self.profile_list.delete(name)
+            for name in changes.added:
+                if name not in self.profile_list.prefix_index:
+                    self.profile_list.insert(name)
+
+            if current in changes.changed or current in changes.removed or \
+               current in changes.added:
+                self.profile_list.select(self.settings_list.current)
+                self.update_widgets()
+                if self.settings_list.current == current:
+                    self.apply_edits(edits)
+        finally:
+            self.after(self.reload_interval_ms, self.poll_settings)
+
+    def on_listbox(self, name):
+        """Profile list selection handler"""
+
+        self.update_settings()
+
+        self.settings_list.current = name
+        self.update_widgets()
+
+    def new_setting(self):
+        """Adds pwm setting to self.settings_list"""
+
+        name = None
+        while name is None or not name or name in self.settings_list:
+            name = simpledialog.askstring("Create new settings set", "Name")
+            if name is None:
+                return
+
+        self.settings_list.add(name)
+        self.profile_list.insert(name)
+
+    def del_setting(self):
+        """deletes setting from listbox and fromk settings_list"""
+
+        value = self.profile_list.get()
+        if value is None or value == "default":
+            return
+
+        # Check if the setting is intentionally being deleted
+        msgbox = messagebox.askyesno
+        if not msgbox("Delete setting",
+                      "Do you want to permanently delete the setting?"):
+            return
+
+        self.settings_list.remove(value)
+
+        self.profile_list.delete(value)
+        self.profile_list.select(self.settings_list.current)
+        self.update_widgets()
+
+    def generate(self):
+        """Generates and prints password and copies it to the clipboard"""
+
+        self.update_settings()
+        self.generate_button.flash()
+
+        pwd = generatepasswordfrom(self.settings)
+
+        current_passwd = self.passwd_text.get()
+        if current_passwd:
+            self.passwd_text.delete(0, len(current_passwd))
+        self.passwd_text.insert(0, pwd[:2]+"*"*(len(pwd)-2))
+        self.clipboard_clear()
+        self.clipboard_append(pwd)
+
+
+def gui():
+    """Run application in GUI"""
+
+    root = tk.Tk()
+    app = Application(root=root)
+    app.master.title("PasswordMaker")
+    app.mainloop()
@@ -51,8 +51,28 @@ It can be used both on the command-line and with a GUI based on TKinter.
 import os
 import sys
 import hmac
+import binascii
 import json
+import functools
+import threading
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict
+from itertools import islice
+from contextlib import contextmanager
 from math import ceil, log
+from multiprocessing import cpu_count
+from multiprocessing.pool import ThreadPool
+from timeit import default_timer
+
+try:
+    from types import MappingProxyType
+except ImportError:  # Python 2
+    MappingProxyType = dict
+
+try:
+    from collections.abc import Mapping
+except ImportError:  # Python 2
+    from collections import Mapping
 
 import attr
 
@@ -63,6 +83,16 @@ try:
 except ImportError:
     HAS_CRYPTO = False
 
+try:
+    # Do we have NumPy ? Enables rstr2any_batch acceleration. NumPy is
+    # imported by the first batch, importing it dominates the startup time.
+    from importlib.util import find_spec
+    HAS_NUMPY = find_spec("numpy") is not None
+except ImportError:  # Python 2
+    HAS_NUMPY = False
+
+numpy = None
+
 HAS_HASHLIB = float(sys.version[:3]) >= 2.5
 
 if HAS_HASHLIB:
@@ -77,6 +107,172 @@ else:
 FULL_CHARSET = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz" + \
                "0123456789`~!@#$%^&*()_-+={}|[]\\:\";\'<>?,./"
 
+# Character set options of the PasswordMaker browser extension
+
+CHARSET_PRESETS = OrderedDict([
+    ("full", FULL_CHARSET),
+    ("alphanumeric",
+     "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789"),
+    ("hex", "0123456789abcdef"),
+    ("numbers", "0123456789"),
+    ("letters", "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"),
+    ("special", "`~!@#$%^&*()_-+={}|[]\\:\";\'<>?,./"),
+])
+
+# Digest sizes in bytes of the hash functions in ALGORITHM_2_HASH_FUNC
+
+DIGEST_SIZES = (16, 20, 32, 64)
+
+# Hash backends
+#
+# HASH_BACKENDS maps each hash algorithm to an OrderedDict of the available
+# implementations, backend name -> digest function. Digest functions are
+# func(inp) for plain and func(key, inp) for HMAC algorithms. The first
+# backend is used unless another one is selected via select_backend, e.g.
+# from the backend cache file that `passwordmaker.py calibrate --write-cache`
+# writes.
+
+HASH_BACKENDS = {}
+
+
+def _register_backend(algorithm, backend, func):
+    """Adds digest function func as backend for algorithm"""
+
+    HASH_BACKENDS.setdefault(algorithm, OrderedDict())[backend] = func
+
+
+def _register_hashlib_backends(algorithm, hashlib_name):
+    """Registers hashlib and hmac backends if hashlib supports hashlib_name"""
+
+    try:
+        hashlib.new(hashlib_name)
+    except ValueError:
+        return
+
+    constructor = getattr(hashlib, hashlib_name, None) or \
+        functools.partial(hashlib.new, hashlib_name)
+
+    _register_backend(algorithm, "hashlib",
+                      lambda inp: constructor(inp).digest())
+
+    if hasattr(hmac, "digest"):
+        # One-shot C implementation, Python >= 3.7
+        _register_backend("hmac-" + algorithm, "hmac.digest",
+                          lambda key, inp: hmac.digest(key, inp,
+                                                       hashlib_name))
+    _register_backend("hmac-" + algorithm, "hmac.new",
+                      lambda key, inp: hmac.new(key, inp,
+                                                constructor).digest())
+
+
+def _register_module_backends(algorithm, backend, module):
+    """Registers backends of a hash module with a new function"""
+
+    _register_backend(algorithm, backend, lambda inp: module.new(inp).digest())
+    _register_backend("hmac-" + algorithm, backend,
+                      lambda key, inp: hmac.new(key, inp, module).digest())
+
+
+# Algorithm name -> hashlib name
+HASHLIB_NAMES = OrderedDict([
+    ("md5", "md5"),
+    ("sha1", "sha1"),
+    ("sha256", "sha256"),
+    ("md4", "md4"),
+    ("rmd160", "ripemd160"),
+])
+
+if HAS_HASHLIB:
+    for _algorithm, _hashlib_name in HASHLIB_NAMES.items():
+        _register_hashlib_backends(_algorithm, _hashlib_name)
+else:
+    _register_module_backends("md5", "legacy", md5)
+    _register_module_backends("sha1", "legacy", sha)
+
+if HAS_CRYPTO:
+    for _algorithm, _module in (("md4", MD4), ("sha256", SHA256),
+                                ("rmd160", RIPEMD)):
+        _register_module_backends(_algorithm, "pycrypto", _module)
+
+# Digest functions of the selected backends
+_DIGEST_FUNCS = dict((algorithm, next(iter(backends.values())))
+                     for algorithm, backends in HASH_BACKENDS.items())
+_SELECTED_BACKENDS = dict((algorithm, next(iter(backends)))
+                          for algorithm, backends in HASH_BACKENDS.items())
+
+
+def select_backend(algorithm, backend):
+    """Selects the implementation that is used for algorithm
+
+    Parameters
+    ----------
+
+    * algorithm: String
+    \tAlgorithm from HASH_BACKENDS
+    * backend: String
+    \tBackend name from HASH_BACKENDS[algorithm]
+
+    """
+
+    try:
+        func = HASH_BACKENDS[algorithm][backend]
+    except KeyError:
+        msg = "Backend {} unavailable for {}"
+        raise ValueError(msg.format(backend, algorithm))
+
+    _DIGEST_FUNCS[algorithm] = func
+    _SELECTED_BACKENDS[algorithm] = backend
+
+
+def get_selected_backends():
+    """Returns dict algorithm -> name of the selected backend"""
+
+    return dict(_SELECTED_BACKENDS)
+
+
+BACKEND_CACHE_PATH = os.environ.get(
+    "PASSWORDMAKER_BACKENDS",
+    os.path.join(os.path.expanduser("~"), ".passwordmaker", "backends.json"))
+
+
+def load_backend_cache(filepath=BACKEND_CACHE_PATH):
+    """Selects backends from a JSON backend cache file
+
+    Missing files and unavailable backends are ignored, so that a cache
+    from another machine or Python version does no harm. Returns dict of
+    the applied selections.
+
+    """
+
+    try:
+        with open(filepath) as infile:
+            cache = json.load(infile)
+    except (IOError, OSError, ValueError):
+        return {}
+
+    applied = {}
+    for algorithm, backend in cache.get("backends", {}).items():
+        if backend in HASH_BACKENDS.get(algorithm, ()):
+            select_backend(algorithm, backend)
+            applied[algorithm] = backend
+    return applied
+
+
+def save_backend_cache(backends, filepath=BACKEND_CACHE_PATH):
+    """Writes dict algorithm -> backend name to a JSON backend cache file"""
+
+    directory = os.path.dirname(filepath)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory)
+
+    with open(filepath, "w") as outfile:
+        json.dump({"python": sys.version.split()[0], "backends": backends},
+                  outfile, sort_keys=True, indent=4)
+
+
+load_backend_cache()
+
+
 # ALGORITHMS tells, which algorithms are available on the current platform.
 # This depends on the Python version, i.e. if hashlib is available and on
 # the availablity of pycrypto.
@@ -105,13 +301,383 @@ CRYPTO_ALGORITHM_2_HASH_FUNC = {
 if HAS_HASHLIB:
     ALGORITHM_2_HASH_FUNC.update(HASHLIB_ALGORITHM_2_HASH_FUNC)
 
+# Key stretching algorithms are opt-in. Their cost is the log2 of the work
+# factor, i.e. 2 ** cost PBKDF2 iterations or scrypt's parameter N.
+
+STRETCHING_ALGORITHM_2_HASH_FUNC = {}
+
+if HAS_HASHLIB and hasattr(hashlib, "pbkdf2_hmac"):
+    STRETCHING_ALGORITHM_2_HASH_FUNC.update({
+        "pbkdf2-sha256": "any_pbkdf2_sha256",
+        "pbkdf2-sha512": "any_pbkdf2_sha512",
+    })
+
+if HAS_HASHLIB and hasattr(hashlib, "scrypt"):
+    STRETCHING_ALGORITHM_2_HASH_FUNC["scrypt"] = "any_scrypt"
+
+DEFAULT_COSTS = {
+    "pbkdf2-sha256": 17,
+    "pbkdf2-sha512": 16,
+    "scrypt": 14,
+}
+
+MAX_COSTS = {
+    "pbkdf2-sha256": 30,
+    "pbkdf2-sha512": 30,
+    "scrypt": 20,
+}
+
 if HAS_CRYPTO:
     ALGORITHM_2_HASH_FUNC.update(CRYPTO_ALGORITHM_2_HASH_FUNC)
 
+# OpenSSL may provide md4 and rmd160 via hashlib without pycrypto
+for _algorithm, _hash_func in CRYPTO_ALGORITHM_2_HASH_FUNC.items():
+    if _algorithm in HASH_BACKENDS and _algorithm not in ALGORITHM_2_HASH_FUNC:
+        ALGORITHM_2_HASH_FUNC[_algorithm] = _hash_func
+
 ALGORITHMS = tuple(ALGORITHM_2_HASH_FUNC.keys())
 
+# Not PasswordMaker compatible, so kept out of ALGORITHMS. They are opted in
+# per profile by selecting one as Algorithm, in the GUI or with --alg.
+STRETCHING_ALGORITHMS = tuple(STRETCHING_ALGORITHM_2_HASH_FUNC.keys())
+
 LEET_OPTIONS = ("none", "before", "after", "both")
 
+# URL components that PwmSettings.URLParts may select, see pwmurl
+URL_PARTS = ("protocol", "subdomains", "domain", "path")
+
+# Instrumentation
+#
+# Profile hooks are callables hook(stage, elapsed) that are called after each
+# instrumented stage. If no hook is registered, the only overhead is a
+# truthiness check of _PROFILE_HOOKS.
+
+PROFILE_STAGES = ("generatepassword", "hash", "rstr2any", "leet",
+                  "settings_io")
+
+_PROFILE_HOOKS = []
+
+
+def add_profile_hook(hook):
+    """Registers a profile hook
+
+    Parameters
+    ----------
+    * hook: Callable
+    \tCalled as hook(stage, elapsed) after each instrumented stage.
+    \tstage is from PROFILE_STAGES, elapsed is the duration in seconds.
+
+    """
+
+    _PROFILE_HOOKS.append(hook)
+
+
+def remove_profile_hook(hook):
+    """Unregisters a profile hook that has been added by add_profile_hook"""
+
+    _PROFILE_HOOKS.remove(hook)
+
+
+def _profiled(stage):
+    """Decorator that reports the runtime of func to the profile hooks"""
+
+    def decorator(func):
+        """Returns wrapped func"""
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            """Calls func and notifies profile hooks if there are any"""
+
+            if not _PROFILE_HOOKS:
+                return func(*args, **kwargs)
+
+            start = default_timer()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = default_timer() - start
+                for hook in tuple(_PROFILE_HOOKS):
+                    hook(stage, elapsed)
+
+        return wrapper
+
+    return decorator
+
+
+@attr.s
+class PwmProfile(object):
+    """Profile hook that collects counters and timers per stage
+
+    Note that the "hash" stage includes the "rstr2any" conversion of each
+    hash round and "generatepassword" includes all other stages but
+    "settings_io".
+
+    """
+
+    counters = attr.ib(default=attr.Factory(dict))
+    timers = attr.ib(default=attr.Factory(dict))
+
+    def __call__(self, stage, elapsed):
+        self.counters[stage] = self.counters.get(stage, 0) + 1
+        self.timers[stage] = self.timers.get(stage, 0.0) + elapsed
+
+    def breakdown(self):
+        """Returns list of (stage, count, total time, time per call) tuples"""
+
+        stages = [stage for stage in PROFILE_STAGES if stage in self.counters]
+        stages += sorted(set(self.counters) - set(PROFILE_STAGES))
+
+        return [(stage, self.counters[stage], self.timers[stage],
+                 self.timers[stage] / self.counters[stage])
+                for stage in stages]
+
+    def report(self):
+        """Returns breakdown as printable table"""
+
+        lines = ["{:<18}{:>10}{:>14}{:>14}".format("stage", "calls",
+                                                   "total [ms]", "mean [us]")]
+        for stage, count, total, mean in self.breakdown():
+            lines.append("{:<18}{:>10}{:>14.3f}{:>14.3f}".format(
+                stage, count, total * 1e3, mean * 1e6))
+
+        return "\n".join(lines)
+
+
+@contextmanager
+def profile():
+    """Context manager that yields a PwmProfile for all calls inside it
+
+    Example
+    -------
+
+    >>> with profile() as prof:
+    ...     password = generatepasswordfrom(PwmSettings(MasterPass="asdf"))
+    >>> prof.counters["generatepassword"]
+    1
+
+    """
+
+    prof = PwmProfile()
+    add_profile_hook(prof)
+    try:
+        yield prof
+    finally:
+        remove_profile_hook(prof)
+
+
+@attr.s
+class LRUCache(object):
+    """Bounded mapping that evicts the least recently used entry
+
+    Each operation is a few atomic OrderedDict calls, so that the cache may
+    be shared by threads. Concurrent readers may see spurious misses.
+
+    Parameters
+    ----------
+
+    * maxsize: Integer
+    \tMaximum number of entries
+
+    """
+
+    maxsize = attr.ib(default=128)
+    _data = attr.ib(default=attr.Factory(OrderedDict), init=False,
+                    repr=False)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def __getitem__(self, key):
+        value = self._data.pop(key)
+        self._data[key] = value
+        return value
+
+    def __setitem__(self, key, value):
+        self._data.pop(key, None)
+        self._data[key] = value
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def get(self, key, default=None):
+        """Returns value for key and marks it as recently used"""
+
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def values(self):
+        """Returns list of the values from least to most recently used"""
+
+        return list(self._data.values())
+
+    def clear(self):
+        """Removes all entries"""
+
+        self._data.clear()
+
+
+@attr.s
+class PrefixIndex(object):
+    """Sorted index of names for prefix queries
+
+    find is O(log n + k) for k results, add and remove are O(log n) plus
+    a memory move.
+
+    Parameters
+    ----------
+
+    * names: Iterable of strings (default: empty)
+    \tInitially indexed names
+
+    """
+
+    _names = attr.ib(default=(), converter=sorted)
+
+    def __contains__(self, name):
+        idx = bisect_left(self._names, name)
+        return idx < len(self._names) and self._names[idx] == name
+
+    def __len__(self):
+        return len(self._names)
+
+    def add(self, name):
+        """Adds name to the index"""
+
+        insort(self._names, name)
+
+    def remove(self, name):
+        """Removes name from the index, raises KeyError if it is missing"""
+
+        idx = bisect_left(self._names, name)
+        if idx == len(self._names) or self._names[idx] != name:
+            raise KeyError(name)
+        del self._names[idx]
+
+    def find(self, prefix, limit=None):
+        """Returns sorted list of names that start with prefix
+
+        Parameters
+        ----------
+
+        * prefix: String
+        \tPrefix to look up
+        * limit: Integer (default: None)
+        \tMaximum number of returned names, None for no limit
+
+        """
+
+        names = self._names
+        result = []
+        for idx in range(bisect_left(names, prefix), len(names)):
+            if not names[idx].startswith(prefix) or len(result) == limit:
+                break
+            result.append(names[idx])
+        return result
+
+
+class CompiledCharset(str):
+    """Charset string with precomputed conversion parameters
+
+    CompiledCharset is a str, so that it may be used wherever a charset or
+    CharacterSet is expected. Obtain instances via compile_charset, which
+    caches them.
+
+    Attributes
+    ----------
+
+    * length: Integer
+    \tNumber of characters, i.e. the base of the conversion
+    * bits_per_char: Float
+    \tlog2 density, i.e. bits of entropy per character
+    * table: Tuple
+    \tLookup table from digit to character
+
+    """
+
+    def __new__(cls, charset):
+        # If the charset's length < 2 the hash algorithms will run
+        # indefinitely.
+        if len(charset) < 2:
+            msg = "The charset {} contains less than 2 characters."
+            raise ValueError(msg.format(charset))
+
+        self = str.__new__(cls, charset)
+        self.length = len(charset)
+        self.bits_per_char = log(self.length) / log(2)
+        self.table = tuple(charset)
+        self._digits_per_block = {}
+        for digest_size in DIGEST_SIZES:
+            self.digits_per_block(digest_size)
+        self._powers = [1]
+        self.power(self.digits_per_block(max(DIGEST_SIZES)))
+        return self
+
+    def digits_per_block(self, digest_size):
+        """Returns the number of digits of a digest_size bytes digest"""
+
+        try:
+            return self._digits_per_block[digest_size]
+        except KeyError:
+            digits = int(ceil(digest_size * 8 / self.bits_per_char))
+            self._digits_per_block[digest_size] = digits
+            return digits
+
+    def power(self, exponent):
+        """Returns length ** exponent from a table of precomputed powers"""
+
+        powers = self._powers
+        while len(powers) <= exponent:
+            powers.append(powers[-1] * self.length)
+        return powers[exponent]
+
+    def digit_count(self, value):
+        """Returns the number of digits of the non-negative integer value
+
+        0 has no digits.
+
+        """
+
+        powers = self._powers
+        while powers[-1] <= value:
+            powers.append(powers[-1] * self.length)
+        return bisect_right(powers, value)
+
+
+CHARSET_CACHE_SIZE = 64
+
+_CHARSET_CACHE = LRUCache(CHARSET_CACHE_SIZE)
+
+
+def compile_charset(charset):
+    """Returns a CompiledCharset for charset from a bounded LRU cache
+
+    Raises ValueError if charset contains less than 2 characters.
+
+    Parameters
+    ----------
+
+    * charset: String or CompiledCharset
+    \tCharacters that may appear in the generated password
+
+    """
+
+    if isinstance(charset, CompiledCharset):
+        return charset
+
+    compiled_charset = _CHARSET_CACHE.get(charset)
+    if compiled_charset is None:
+        compiled_charset = CompiledCharset(charset)
+        _CHARSET_CACHE[charset] = compiled_charset
+    return compiled_charset
+
+
+for _charset in CHARSET_PRESETS.values():
+    compile_charset(_charset)
+
 
 @attr.s
 class PwmHashUtils(object):
@@ -125,38 +691,83 @@ class PwmHashUtils(object):
     \tIf hashlib is present also out of "sha256", "hmac-sha256"
     \tIf pycrypto is present also out of "md4", "hmac-md4", "sha256",
     \t"hmac-sha256", "rmd160", "hmac-rmd160"
-    * encoding: String
+    \tKey stretching algorithms from STRETCHING_ALGORITHMS
+    * encoding: String or CompiledCharset
     \tCharacters that may appear in the generated password
+    * cost: Integer (default: 0)
+    \tlog2 work factor of key stretching algorithms, 0 for DEFAULT_COSTS
 
     """
 
     algorithm = attr.ib()
-    encoding = attr.ib()
+    encoding = attr.ib(converter=compile_charset)
+    cost = attr.ib(default=0)
 
     @algorithm.validator
     def _check_algorithm(self, _, value):
-        if value not in ALGORITHMS:
+        if value not in ALGORITHMS + STRETCHING_ALGORITHMS:
             msg = "Unknown algorithm: {}. Valid algorithms: {}"
-            valid_algs = ", ".join(ALGORITHMS)
+            valid_algs = ", ".join(ALGORITHMS + STRETCHING_ALGORITHMS)
             raise ValueError(msg.format(value, valid_algs))
 
+    @cost.validator
+    def _check_cost(self, _, value):
+        if self.algorithm in MAX_COSTS and \
+           not 0 <= value <= MAX_COSTS[self.algorithm]:
+            msg = "Cost {} of {} not in [0, {}]"
+            raise ValueError(msg.format(value, self.algorithm,
+                                        MAX_COSTS[self.algorithm]))
+
+    @property
+    def stretch_cost(self):
+        """Returns the effective log2 work factor of key stretching"""
+
+        return self.cost or DEFAULT_COSTS[self.algorithm]
+
+    @property
+    def _hash_func_name(self):
+        """Returns the name of the hash function wrapper method"""
+
+        if self.algorithm in STRETCHING_ALGORITHM_2_HASH_FUNC:
+            return STRETCHING_ALGORITHM_2_HASH_FUNC[self.algorithm]
+        return ALGORITHM_2_HASH_FUNC[self.algorithm]
+
     @property
     def hash_func_wrapper(self):
         """Returns hash_function wrapper that may be used for self.algorithm"""
 
-        hash_func_name = ALGORITHM_2_HASH_FUNC[self.algorithm]
-        return getattr(self, hash_func_name)
+        return getattr(self, self._hash_func_name)
+
+    @property
+    def digest_func(self):
+        """Returns function that computes the raw digest of hash_func_wrapper
+
+        It takes the same hash arguments as hash_func_wrapper.
+
+        """
+
+        hash_func_name = self._hash_func_name
+        if self.algorithm in STRETCHING_ALGORITHM_2_HASH_FUNC:
+            return getattr(self, hash_func_name.replace("any_", "digest_"))
+        return _DIGEST_FUNCS[hash_func_name[4:].replace("_", "-")]
 
-    def rstr2any(self, inp, trim=True):
+    @_profiled("rstr2any")
+    def rstr2any(self, inp, trim=True, max_digits=None):
         """Convert a raw string to encoded string
 
         Set trim to false for keeping leading zeros.
-        The generated string only contains characters from self.charset.
+        The generated string only contains characters from self.encoding.
+
+        If max_digits is given, only the max_digits most significant digits
+        are computed. The result equals rstr2any(inp, trim)[:max_digits].
 
         """
 
-        encoding = self.encoding
-        divisor = len(encoding)
+        encoding = compile_charset(self.encoding)
+        divisor = encoding.length
+
+        if max_digits is not None:
+            return self._rstr2any_head(inp, trim, max_digits)
 
         def get_quotient_remainder(dividend):
             """Returns tuple (quotient, remainder) from dividend"""
@@ -197,120 +808,253 @@ class PwmHashUtils(object):
                 remainders.append(remainder)
 
         else:
-            full_length = ceil(float(len(inp) * 8) /
-                               (log(len(encoding)) / log(2)))
-            for j in range(len(full_length)):
+            for _ in range(encoding.digits_per_block(len(inp))):
                 dividend, remainder = get_quotient_remainder(dividend)
-                remainders[j] = remainder
+                remainders.append(remainder)
 
         # Convert the remainders to the output string
-        output = ""
-        for i in reversed(remainders):
-            output += encoding[i]
+        table = encoding.table
+        return "".join([table[i] for i in reversed(remainders)])
 
-        return output
+    def _rstr2any_head(self, inp, trim, max_digits):
+        """Returns the max_digits most significant digits of rstr2any(inp)
 
-    def any_md5(self, inp, trim=True):
-        """MD5 function wrapper"""
+        The digits are emitted from the high end: dividing the digest's
+        integer value by a precomputed power of the base drops all digits
+        that would be truncated anyway.
+
+        """
 
-        if HAS_HASHLIB:
-            __hash = hashlib.md5(inp).digest()
+        encoding = compile_charset(self.encoding)
+        inp = bytearray(inp)
+        value = int(binascii.hexlify(inp), 16) if inp else 0
+
+        if not trim:
+            n_digits = encoding.digits_per_block(len(inp))
+        elif inp:
+            # rstr2any emits one zero digit for a zero digest
+            n_digits = encoding.digit_count(value) or 1
         else:
-            __hash = md5.new(inp).digest()
-        return self.rstr2any(__hash, trim)
+            n_digits = 0
+
+        n_head = max(min(max_digits, n_digits), 0)
+        head = value // encoding.power(n_digits - n_head)
+
+        digits = []
+        for _ in range(n_head):
+            head, remainder = divmod(head, encoding.length)
+            digits.append(remainder)
+
+        table = encoding.table
+        return "".join([table[i] for i in reversed(digits)])
 
-    def any_hmac_md5(self, key, inp, trim=True):
+    def any_md5(self, inp, trim=True, max_digits=None):
+        """MD5 function wrapper"""
+
+        return self.rstr2any(_DIGEST_FUNCS["md5"](inp), trim, max_digits)
+
+    def any_hmac_md5(self, key, inp, trim=True, max_digits=None):
         """MD5 HMAC function wrapper"""
 
-        if HAS_HASHLIB:
-            hashfunc = hashlib.md5
-        else:
-            hashfunc = md5
-        return self.rstr2any(hmac.new(key, inp, hashfunc).digest(), trim)
+        __hash = _DIGEST_FUNCS["hmac-md5"](key, inp)
+        return self.rstr2any(__hash, trim, max_digits)
 
-    def any_sha1(self, inp, trim=True):
+    def any_sha1(self, inp, trim=True, max_digits=None):
         """SHA1 function wrapper"""
 
-        if HAS_HASHLIB:
-            __hash = hashlib.sha1(inp).digest()
-        else:
-            __hash = sha.new(inp).digest()
-        return self.rstr2any(__hash, trim)
+        return self.rstr2any(_DIGEST_FUNCS["sha1"](inp), trim, max_digits)
 
-    def any_hmac_sha1(self, key, inp, trim=True):
+    def any_hmac_sha1(self, key, inp, trim=True, max_digits=None):
         """SHA1 HMAC function wrapper"""
 
-        if HAS_HASHLIB:
-            hashfunc = hashlib.sha1
-        else:
-            hashfunc = sha
-        return self.rstr2any(hmac.new(key, inp, hashfunc).digest(), trim)
+        __hash = _DIGEST_FUNCS["hmac-sha1"](key, inp)
+        return self.rstr2any(__hash, trim, max_digits)
 
-    def any_sha256(self, inp, trim=True):
+    def any_sha256(self, inp, trim=True, max_digits=None):
         """SHA256 function wrapper"""
 
-        if HAS_HASHLIB:
-            __hash = hashlib.sha256(inp).digest()
-        else:
-            __hash = SHA256.new(inp).digest()
-        return self.rstr2any(__hash, trim)
+        return self.rstr2any(_DIGEST_FUNCS["sha256"](inp), trim, max_digits)
 
-    def any_hmac_sha256(self, key, inp, trim=True):
+    def any_hmac_sha256(self, key, inp, trim=True, max_digits=None):
         """SHA256 HMAC function wrapper"""
 
-        if HAS_HASHLIB:
-            hashfunc = hashlib.sha256
-        else:
-            hashfunc = SHA256
-        return self.rstr2any(hmac.new(key, inp, hashfunc).digest(), trim)
+        __hash = _DIGEST_FUNCS["hmac-sha256"](key, inp)
+        return self.rstr2any(__hash, trim, max_digits)
 
-    def any_md4(self, inp, trim=True):
+    def any_md4(self, inp, trim=True, max_digits=None):
         """MD4 function wrapper"""
 
-        return self.rstr2any(MD4.new(inp).digest(), trim)
+        return self.rstr2any(_DIGEST_FUNCS["md4"](inp), trim, max_digits)
 
-    def any_hmac_md4(self, key, inp, trim=True):
+    def any_hmac_md4(self, key, inp, trim=True, max_digits=None):
         """MD4 HMAC function wrapper"""
 
-        return self.rstr2any(hmac.new(key, inp, MD4).digest(), trim)
+        __hash = _DIGEST_FUNCS["hmac-md4"](key, inp)
+        return self.rstr2any(__hash, trim, max_digits)
 
-    def any_rmd160(self, inp, trim=True):
+    def any_rmd160(self, inp, trim=True, max_digits=None):
         """RMD160 function wrapper"""
 
-        return self.rstr2any(RIPEMD.new(inp).digest(), trim)
+        return self.rstr2any(_DIGEST_FUNCS["rmd160"](inp), trim, max_digits)
 
-    def any_hmac_rmd160(self, key, inp, trim=True):
+    def any_hmac_rmd160(self, key, inp, trim=True, max_digits=None):
         """RMD160 HMAC function wrapper"""
 
-        return self.rstr2any(hmac.new(key, inp, RIPEMD).digest(), trim)
+        __hash = _DIGEST_FUNCS["hmac-rmd160"](key, inp)
+        return self.rstr2any(__hash, trim, max_digits)
 
+    def digest_pbkdf2_sha256(self, key, inp):
+        """PBKDF2-HMAC-SHA256 raw digest, inp is used as salt"""
 
-@attr.s
-class PwmSettings(object):
-    """Setting class holding all parameters for hash generation"""
+        iterations = 2 ** self.stretch_cost
+        return hashlib.pbkdf2_hmac("sha256", key, inp, iterations)
 
-    int_val = attr.validators.instance_of(int)
-    str_val = attr.validators.instance_of(str)
-    algorithm_val = attr.validators.in_(ALGORITHMS)
-    leet_val = attr.validators.in_(LEET_OPTIONS)
+    def any_pbkdf2_sha256(self, key, inp, trim=True, max_digits=None):
+        """PBKDF2-HMAC-SHA256 key stretching function wrapper
 
-    _url_metadata = {'cmd1': "-r", 'cmd2': "--url", "guitext": "URL",
-                     "help": "URL (default blank)"}
-    URL = attr.ib(default="", validator=str_val, type="str",
-                  metadata=_url_metadata)
+        inp is used as salt.
 
-    _mpw_metadata = {'cmd1': "-m", 'cmd2': "--mpw", "guitext": "Master PW",
-                     "help": "Master password (default: ask)"}
-    MasterPass = attr.ib(default="", validator=str_val, type="pwd",
-                         metadata=_mpw_metadata)
+        """
 
-    _alg_metadata = {'cmd1': "-a", 'cmd2': "--alg", "guitext": "Algorithm",
-                     "help": "Hash algorithm [hmac-] md4/md5/sha1/sha256/"
-                             "rmd160 (default md5)"}
-    Algorithm = attr.ib(default="md5", validator=algorithm_val, type="alg",
-                        metadata=_alg_metadata)
+        __hash = self.digest_pbkdf2_sha256(key, inp)
+        return self.rstr2any(__hash, trim, max_digits)
 
-    _usr_metadata = {'cmd1': "-u", 'cmd2': "--user", "guitext": "Username",
+    def digest_pbkdf2_sha512(self, key, inp):
+        """PBKDF2-HMAC-SHA512 raw digest, inp is used as salt"""
+
+        iterations = 2 ** self.stretch_cost
+        return hashlib.pbkdf2_hmac("sha512", key, inp, iterations)
+
+    def any_pbkdf2_sha512(self, key, inp, trim=True, max_digits=None):
+        """PBKDF2-HMAC-SHA512 key stretching function wrapper
+
+        inp is used as salt.
+
+        """
+
+        __hash = self.digest_pbkdf2_sha512(key, inp)
+        return self.rstr2any(__hash, trim, max_digits)
+
+    def digest_scrypt(self, key, inp):
+        """scrypt raw digest, inp is used as salt, r=8 and p=1"""
+
+        n = 2 ** self.stretch_cost
+        maxmem = 2 * 128 * 8 * n + 2 ** 20
+        return hashlib.scrypt(key, salt=inp, n=n, r=8, p=1, maxmem=maxmem,
+                              dklen=32)
+
+    def any_scrypt(self, key, inp, trim=True, max_digits=None):
+        """scrypt key stretching function wrapper
+
+        inp is used as salt, r=8 and p=1.
+
+        """
+
+        __hash = self.digest_scrypt(key, inp)
+        return self.rstr2any(__hash, trim, max_digits)
+
+
+RSTR2ANY_BATCH_MIN_ROWS = 32
+
+
+def rstr2any_batch(digests, encoding):
+    """Converts a batch of raw digests to encoded strings
+
+    The result equals [PwmHashUtils(..., encoding).rstr2any(digest)
+    for digest in digests]. If NumPy is available, the long division is
+    performed for all digests at once. Otherwise or for batches smaller than
+    RSTR2ANY_BATCH_MIN_ROWS, rstr2any is called for each digest.
+
+    Parameters
+    ----------
+
+    * digests: numpy.ndarray or sequence of bytes
+    \tuint8 array of shape (N, digest_len) or N digests of equal length.
+    \tdigest_len must be even.
+    * encoding: String or CompiledCharset
+    \tCharacters that may appear in the encoded strings
+
+    """
+
+    encoding = compile_charset(encoding)
+
+    # For small batches the NumPy setup costs more than it saves
+    if not HAS_NUMPY or len(digests) < RSTR2ANY_BATCH_MIN_ROWS:
+        hash_utils = PwmHashUtils(ALGORITHMS[0], encoding)
+        return [hash_utils.rstr2any(bytes(bytearray(digest)))
+                for digest in digests]
+
+    global numpy
+    if numpy is None:
+        import numpy
+
+    if not isinstance(digests, numpy.ndarray):
+        digests = numpy.array([bytearray(digest) for digest in digests],
+                              dtype=numpy.uint8)
+
+    if digests.ndim != 2 or digests.shape[1] % 2:
+        msg = "digests must have shape (N, digest_len) with even digest_len"
+        raise ValueError(msg)
+
+    n_rows = digests.shape[0]
+    divisor = encoding.length
+
+    # 16-bit big-endian words, one row per digest as in rstr2any
+    dividend = (digests[:, 0::2].astype(numpy.int64) << 8) | digests[:, 1::2]
+
+    max_digits = encoding.digits_per_block(digests.shape[1]) + 1
+    remainders = numpy.zeros((n_rows, max_digits), dtype=numpy.int64)
+    n_digits = numpy.zeros(n_rows, dtype=numpy.int64)
+    active = numpy.ones(n_rows, dtype=bool)
+
+    for j in range(max_digits):
+        if not active.any():
+            break
+
+        remainder = numpy.zeros(n_rows, dtype=numpy.int64)
+        for col in range(dividend.shape[1]):
+            remainder = (remainder << 16) + dividend[:, col]
+            quotient = remainder // divisor
+            remainder -= quotient * divisor
+            dividend[:, col] = quotient
+
+        remainders[:, j] = remainder
+        # Rows whose dividend has become zero in an earlier step are done
+        n_digits += active
+        active = dividend.any(axis=1)
+
+    table = encoding.table
+    return ["".join([table[digit] for digit in reversed(row[:count])])
+            for row, count in zip(remainders.tolist(), n_digits.tolist())]
+
+
+@attr.s
+class PwmSettings(object):
+    """Setting class holding all parameters for hash generation"""
+
+    int_val = attr.validators.instance_of(int)
+    str_val = attr.validators.instance_of(str)
+    algorithm_val = attr.validators.in_(ALGORITHMS + STRETCHING_ALGORITHMS)
+    leet_val = attr.validators.in_(LEET_OPTIONS)
+
+    _url_metadata = {'cmd1': "-r", 'cmd2': "--url", "guitext": "URL",
+                     "help": "URL (default blank)"}
+    URL = attr.ib(default="", validator=str_val, type="str",
+                  metadata=_url_metadata)
+
+    _mpw_metadata = {'cmd1': "-m", 'cmd2': "--mpw", "guitext": "Master PW",
+                     "help": "Master password (default: ask)"}
+    MasterPass = attr.ib(default="", validator=str_val, type="pwd",
+                         metadata=_mpw_metadata)
+
+    _alg_metadata = {'cmd1': "-a", 'cmd2': "--alg", "guitext": "Algorithm",
+                     "help": "Hash algorithm [hmac-] md4/md5/sha1/sha256/"
+                             "rmd160 or key stretching pbkdf2-sha256/"
+                             "pbkdf2-sha512/scrypt (default md5)"}
+    Algorithm = attr.ib(default="md5", validator=algorithm_val, type="alg",
+                        metadata=_alg_metadata)
+
+    _usr_metadata = {'cmd1': "-u", 'cmd2': "--user", "guitext": "Username",
                      "help": "Username (default blank)"}
     Username = attr.ib(default="", validator=str_val, type="str",
                        metadata=_usr_metadata)
@@ -354,6 +1098,38 @@ class PwmSettings(object):
     LeetLvl = attr.ib(default=1, validator=int_val, type="int",
                       metadata=_leetlvl_metadata)
 
+    _pattern_metadata = {'cmd1': "-P", 'cmd2': "--patterns",
+                         "guitext": "URL patterns",
+                         "help": "Space separated URL patterns that select "
+                                 "this setting: example.com, *.example.com "
+                                 "or /regex/ (default blank)"}
+    URLPatterns = attr.ib(default="", validator=str_val, type="str",
+                          metadata=_pattern_metadata)
+
+    _cost_metadata = {'cmd1': "-C", 'cmd2': "--cost", "guitext": "Cost",
+                      "help": "log2 work factor of key stretching "
+                              "algorithms pbkdf2-*/scrypt (default 0: "
+                              "algorithm default)",
+                      "range": (0, max(MAX_COSTS.values()))}
+    Cost = attr.ib(default=0, validator=int_val, type="int",
+                   metadata=_cost_metadata)
+
+    _parts_metadata = {'cmd1': "-U", 'cmd2': "--url-parts",
+                       "guitext": "URL parts",
+                       "help": "Space separated parts of the URL that are "
+                               "used: protocol, subdomains, domain, path "
+                               "(default blank: the URL as given)"}
+    URLParts = attr.ib(default="", type="str", metadata=_parts_metadata)
+
+    @URLParts.validator
+    def _check_url_parts(self, _, value):
+        if not isinstance(value, str):
+            raise TypeError("URLParts must be a string")
+        for part in value.split():
+            if part not in URL_PARTS:
+                msg = "Unknown URL part: {}. Valid parts: {}"
+                raise ValueError(msg.format(part, ", ".join(URL_PARTS)))
+
     def __getitem__(self, __attr):
         return self.__getattribute__(__attr)
 
@@ -363,6 +1139,7 @@ class PwmSettings(object):
 
         return attr.filters.exclude(attr.fields(PwmSettings).MasterPass)
 
+    @_profiled("settings_io")
     def load(self, filepath='pwm.settings'):
         """Loads setting from a json file"""
 
@@ -390,6 +1167,7 @@ class PwmSettings(object):
                 self.__setattr__(attr_key, attr_fields[attr_key])
             raise TypeError(err)
 
+    @_profiled("settings_io")
     def save(self, filepath='pwm.settings'):
         """Saves setting to a json file"""
 
@@ -400,234 +1178,1816 @@ class PwmSettings(object):
             json.dump(attr_dict, outfile, sort_keys=True, indent=4)
 
 
-@attr.s
 class PwmSettingsList(object):
-    """Stores a list of PwmSettings"""
+    """Stores PwmSettings by name in insertion order
 
-    current = attr.ib(default="default")
-    pwm_names = attr.ib(default=["default"])
-    pwms = attr.ib(default=[PwmSettings()])
+    Lookup, insertion, renaming and deletion by name are O(1).
+    pwm_names and pwms return tuples of the names and settings in order.
+    Use add, remove and rename to change the PwmSettingsList.
+
+    Parameters
+    ----------
+
+    * current: String (default: "default")
+    \tName of the current settings
+    * pwm_names: List of strings (default: ["default"])
+    \tNames of the settings
+    * pwms: List of PwmSettings (default: [PwmSettings()])
+    \tSettings in the order of pwm_names
+
+    """
+
+    def __init__(self, current="default", pwm_names=None, pwms=None):
+        if pwm_names is None:
+            pwm_names = ["default"]
+        if pwms is None:
+            pwms = [PwmSettings() for _ in pwm_names]
+        if len(pwm_names) != len(pwms):
+            raise ValueError("pwm_names and pwms differ in length")
+
+        self.current = current
+        # slot -> name in display order. Renaming keeps the slot.
+        self._names = OrderedDict()
+        # name -> (slot, PwmSettings)
+        self._entries = {}
+        self._next_slot = 0
+        # PWM_setting file name -> fingerprint at last load, reload or save
+        self._fingerprints = {}
+        # Name -> PwmSettings as in its file, for finding unsaved changes
+        self._file_pwms = {}
+        self._directory = "."
+        for name, pwm in zip(pwm_names, pwms):
+            self.add(name, pwm)
+
+    def __repr__(self):
+        return "PwmSettingsList(current={!r}, pwm_names={!r})".format(
+            self.current, self.pwm_names)
+
+    def __eq__(self, other):
+        if not isinstance(other, PwmSettingsList):
+            return NotImplemented
+        return self.current == other.current and \
+            list(self.items()) == list(other.items())
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    __hash__ = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, name):
+        return name in self._entries
+
+    def __iter__(self):
+        return iter(self._names.values())
+
+    def __getitem__(self, name):
+        return self._entries[name][1]
+
+    @property
+    def pwm_names(self):
+        """Tuple of setting names in order"""
+
+        return tuple(self._names.values())
+
+    @property
+    def pwms(self):
+        """Tuple of PwmSettings in the order of pwm_names"""
+
+        entries = self._entries
+        return tuple(entries[name][1] for name in self._names.values())
+
+    def items(self):
+        """Returns iterator of (name, PwmSettings) tuples in order"""
+
+        entries = self._entries
+        return ((name, entries[name][1]) for name in self._names.values())
+
+    def add(self, name, pwm=None, first=False):
+        """Adds PwmSettings pwm as name
+
+        Raises ValueError if name exists.
+
+        Parameters
+        ----------
+
+        * name: String
+        \tName of the new settings
+        * pwm: PwmSettings (default: new PwmSettings instance)
+        \tSettings to add
+        * first: Bool (default: False)
+        \tInsert before all other settings instead of appending
+
+        """
+
+        if name in self._entries:
+            raise ValueError("Setting {} exists.".format(name))
+
+        if pwm is None:
+            pwm = PwmSettings()
+
+        slot = self._next_slot
+        self._next_slot += 1
+        self._names[slot] = name
+        if first:
+            self._names.move_to_end(slot, last=False)
+        self._entries[name] = slot, pwm
+
+    def remove(self, name):
+        """Removes and returns setting name
+
+        If name is the current setting, the first remaining setting becomes
+        current.
+
+        """
+
+        slot, pwm = self._entries.pop(name)
+        del self._names[slot]
+        self._file_pwms.pop(name, None)
+
+        if self.current == name and self._names:
+            self.current = next(iter(self._names.values()))
+
+        return pwm
+
+    def rename(self, old_name, new_name):
+        """Renames setting old_name to new_name keeping its position"""
+
+        if new_name in self._entries:
+            raise ValueError("Setting {} exists.".format(new_name))
+
+        slot, pwm = self._entries.pop(old_name)
+        self._names[slot] = new_name
+        self._entries[new_name] = slot, pwm
+        self._file_pwms.pop(old_name, None)
+
+        if self.current == old_name:
+            self.current = new_name
 
     def get_pwm_settings(self):
         """Returns current PwmSettings"""
 
-        pwm_idx = self.pwm_names.index(self.current)
-        return self.pwms[pwm_idx]
+        return self._entries[self.current][1]
+
+    def is_modified(self, name):
+        """Returns True if setting name has changes that are not saved
+
+        The master password, which is not saved, is ignored. Settings
+        without file are modified if they differ from PwmSettings().
+
+        """
+
+        pwm = attr.evolve(self._entries[name][1], MasterPass="")
+        return pwm != self._file_pwms.get(name, PwmSettings())
+
+    def __setitem__(self, name, pwm):
+        if name in self._entries:
+            slot = self._entries[name][0]
+            self._entries[name] = slot, pwm
+        else:
+            self.add(name, pwm)
 
     def load(self, directory="."):
-        """Loads all PWM_setting files from current directory"""
+        """Loads all PWM_setting files from directory"""
 
-        filenames = [f for f in os.listdir(directory)
-                     if f.endswith(".setting")]
-        filenames.sort()
-        pwm_names = [f[4:-8] for f in filenames]
+        filenames = _get_setting_filenames(directory)
 
-        self.pwm_names = []
-        self.pwms = []
-        for pwm_name, filename in zip(pwm_names, filenames):
-            pwm = PwmSettings()
-            pwm.load(filename)
+        self._names.clear()
+        self._entries.clear()
+        self._fingerprints = {}
+        self._file_pwms = {}
+        self._directory = directory
 
-            if pwm_name == "default":
-                self.pwm_names.insert(0, pwm_name)
-                self.pwms.insert(0, pwm)
-            else:
-                self.pwm_names.append(pwm_name)
-                self.pwms.append(pwm)
+        for pwm_name in sorted(filenames):
+            filepath = os.path.join(directory, filenames[pwm_name])
+            fingerprint = _get_fingerprint(filepath)
+            pwm = PwmSettings()
+            pwm.load(filepath)
+            self.add(pwm_name, pwm, first=pwm_name == "default")
+            self._fingerprints[pwm_name] = fingerprint
+            self._file_pwms[pwm_name] = attr.evolve(pwm)
 
-        if not pwm_names:
-            self.pwm_names.append("default")
-            self.pwms.append(PwmSettings())
+        if not self._entries:
+            self.add("default")
 
-        if "default" in pwm_names:
+        if "default" in self._entries:
             self.current = "default"
         else:
-            self.current = self.pwm_names[0]
+            self.current = next(iter(self._names.values()))
+
+    def reload(self, directory=None):
+        """Applies changes of PWM_setting files since the last load or save
+
+        Only files that have been added, changed or removed are parsed.
+        Changes are detected by mtime and size fingerprints. Files that
+        cannot be parsed, e.g. because they are being written, are retried
+        on the next call. Settings with unsaved changes, see is_modified,
+        are kept and reported as conflicts; saving them overwrites the
+        external change. Returns a SettingsChanges instance.
+
+        Parameters
+        ----------
+
+        * directory: String (default: directory of the last load)
+        \tDirectory of the PWM_setting files
+
+        """
+
+        if directory is None:
+            directory = self._directory
+        elif directory != self._directory:
+            self._fingerprints = {}
+            self._directory = directory
+
+        changes = SettingsChanges()
+
+        filenames = _get_setting_filenames(directory)
+
+        for pwm_name in sorted(filenames):
+            filepath = os.path.join(directory, filenames[pwm_name])
+            try:
+                fingerprint = _get_fingerprint(filepath)
+            except OSError:
+                continue  # Removed in the meantime
+            if self._fingerprints.get(pwm_name) == fingerprint:
+                continue
+
+            pwm = PwmSettings()
+            try:
+                pwm.load(filepath)
+            except (OSError, ValueError, TypeError):
+                continue
+
+            if pwm_name not in self._entries:
+                self.add(pwm_name, pwm, first=pwm_name == "default")
+                changes.added.append(pwm_name)
+            elif self.is_modified(pwm_name):
+                changes.conflicts.append(pwm_name)
+            else:
+                self[pwm_name] = pwm
+                if pwm_name in self._fingerprints:
+                    changes.changed.append(pwm_name)
+                else:
+                    changes.added.append(pwm_name)
+            self._fingerprints[pwm_name] = fingerprint
+            self._file_pwms[pwm_name] = attr.evolve(pwm)
+
+        for pwm_name in sorted(set(self._fingerprints) - set(filenames)):
+            del self._fingerprints[pwm_name]
+            if pwm_name not in self._entries:
+                continue
+            if self.is_modified(pwm_name):
+                changes.conflicts.append(pwm_name)
+                del self._file_pwms[pwm_name]
+            else:
+                self.remove(pwm_name)
+                changes.removed.append(pwm_name)
+
+        if not self._entries:
+            self.add("default")
+            changes.added.append("default")
+            self.current = "default"
+
+        return changes
 
     def save(self, directory="."):
-        """Saves all PWM_setting files from current directory"""
+        """Saves all PWM_setting files to directory
 
-        for name, pwm in zip(self.pwm_names, self.pwms):
-            pwm.save(filepath="pwm."+name+".setting")
+        Setting files of removed settings are deleted. The profile name
+        index file of the directory is updated.
 
-        filenames = [f for f in os.listdir(directory)
-                     if f.endswith(".setting")]
-        pwm_names = [f[4:-8] for f in filenames]
+        """
 
-        for pwm_name in pwm_names:
-            if pwm_name not in self.pwm_names:
-                os.remove("pwm."+pwm_name+".setting")
+        if directory != self._directory:
+            self._fingerprints = {}
+            self._directory = directory
 
+        self._write_files(self.pwm_names, directory)
 
-# Main PasswordMaker functions
+        filenames = _get_setting_filenames(directory)
 
+        for pwm_name, filename in filenames.items():
+            if pwm_name not in self._entries:
+                os.remove(os.path.join(directory, filename))
+                self._fingerprints.pop(pwm_name, None)
 
-def get_leet_mapping(leet_level):
-    """Returns a leet mappings for given leet level
+        save_profile_index(self._entries, directory)
 
-    For levels not in [1, 9], an empty dict is returned.
+    def save_profiles(self, names, directory="."):
+        """Saves the PWM_setting files of the settings names to directory
 
-    Parameters
-    ----------
-    * leet_level: Integer in [1, 9]
-    \tLeet level.
+        Other setting files are left as they are. The files are replaced
+        only after all of them have been written.
 
-    """
+        """
 
-    # In leet_additional_mappings_per_level low level conversions are
-    # maintained at higher levels unless they are overridden.
-    # Conversions in the dicts always refer to the original character,
-    # i. e. not to converted ones.
+        if directory != self._directory:
+            self._fingerprints = {}
+            self._directory = directory
 
-    leet_additional_mappings_per_level = [
-        {},
-        {"a": "4", "e": "3", "l": "1", "o": "0", "q": "9", "t": "7"},
-        {"i": "l", "s": "5", "z": "2"},
-        {"b": "8", "g": "6", "i": "'", "y": "'/"},
-        {"a": "@"},
-        {"b": "|3", "h": "#", "i": "!", "j": "7", "k": "|<", "p": "|>",
-         "r": "|2", "s": "$", "v": "\\/"},
-        {"d": "|)", "e": "&", "f": "|=", "j": ",|"},
-        {"c": "[", "m": "^^", "n": "^/", "p": "|*", "s": "5", "u": "(_)",
-         "w": "\\/\\/", "x": "><"},
-        {"b": "8", "c": "(", "h": "|-|", "j": "_|", "k": "|(", "m": "|\\/|",
-         "n": "|\\|", "o": "()", "p": "|>", "q": "(,)", "r": "|2", "s": "$",
-         "t": "|", "u": "|_|", "w": "\\^/", "x": ")(", "z": "\"/_"},
-        {"k": "|{", "l": "|_", "m": "/\\/\\"},
-    ]
+        self._write_files(names, directory)
+        save_profile_index(self._entries, directory)
 
-    leet_mapping = {}
-    for j in range(leet_level + 1):
-        leet_mapping.update(leet_additional_mappings_per_level[j])
+    def _write_files(self, names, directory):
+        """Writes the setting files of names via temporary files"""
 
-    return leet_mapping
+        filepaths = [get_setting_filepath(name, directory) for name in names]
+        try:
+            for name, filepath in zip(names, filepaths):
+                self[name].save(filepath=filepath + ".tmp")
+        except BaseException:
+            for filepath in filepaths:
+                if os.path.exists(filepath + ".tmp"):
+                    os.remove(filepath + ".tmp")
+            raise
 
+        for name, filepath in zip(names, filepaths):
+            os.replace(filepath + ".tmp", filepath)
+            self._fingerprints[name] = _get_fingerprint(filepath)
+            self._file_pwms[name] = attr.evolve(self[name], MasterPass="")
 
-def leet(leet_level, message):
-    """Converts the string in message to l33t-speak
 
-    The l33t level is specified by leet_level.
-    l33t levels are 1-9 with 1 being the simplest form of l33t-speak and
-    9 being the most complex.
+@attr.s
+class SettingsChanges(object):
+    """Names of settings that PwmSettingsList.reload has updated
 
-    Note that _message_ is converted to lower-case if the l33t conversion is
-    performed. Using a _leetLevel_ <= 0 results in the original message
-    being returned.
+    conflicts names settings whose files have changed or have been removed
+    while they had unsaved changes. These settings are left unchanged.
 
     """
 
-    leet_mapping = get_leet_mapping(leet_level)
+    added = attr.ib(default=attr.Factory(list))
+    changed = attr.ib(default=attr.Factory(list))
+    removed = attr.ib(default=attr.Factory(list))
+    conflicts = attr.ib(default=attr.Factory(list))
 
-    leet_message = ""
-    for char in message.lower():
-        try:
-            leet_message += leet_mapping[char]
-        except KeyError:
-            leet_message += char
+    def __bool__(self):
+        return bool(self.added or self.changed or self.removed or
+                    self.conflicts)
 
-    return leet_message
+    __nonzero__ = __bool__  # Python 2
 
 
-def generatepasswordfrom(settings):
-    """Calls self.generatepassword with parameters from settings
+def _get_setting_filenames(directory):
+    """Returns dict that maps setting names to pwm.*.setting filenames"""
+
+    return dict((filename[4:-8], filename)
+                for filename in os.listdir(directory)
+                if filename.startswith("pwm.") and
+                filename.endswith(".setting"))
+
+
+def get_setting_filepath(name, directory="."):
+    """Returns path of the PWM_setting file of profile name"""
+
+    return os.path.join(directory, "pwm." + name + ".setting")
+
+
+PROFILE_INDEX_FILENAME = "pwm.index"
+PROFILE_INDEX_VERSION = 1
+
+
+def _get_directory_mtime(directory):
+    """Returns mtime of directory, changed when files are added or removed"""
+
+    stat = os.stat(directory)
+    return getattr(stat, "st_mtime_ns", stat.st_mtime)
+
+
+def save_profile_index(names, directory="."):
+    """Writes the profile name index file of directory
+
+    The index stores the names together with the directory mtime. The file
+    is created first and then overwritten in place, which does not change
+    the directory mtime again. Errors of read-only directories are left to
+    the caller.
 
     Parameters
     ----------
 
-    * settings: PwmSettingsList
-    \tSettings instance
+    * names: Iterable of String
+    \tProfile names of the PWM_setting files in directory
+    * directory: String (default: ".")
+    \tDirectory of the PWM_setting files
 
     """
 
-    concat_url = settings.URL + settings.Username + settings.Modifier
-    return generatepassword(hash_algorithm=settings.Algorithm,
-                            key=settings.MasterPass,
-                            data=concat_url,
-                            password_length=settings.Length,
-                            charset=settings.CharacterSet,
-                            prefix=settings.Prefix,
-                            suffix=settings.Suffix,
-                            use_leet=settings.UseLeet,
-                            leet_level=settings.LeetLvl)
+    filepath = os.path.join(directory, PROFILE_INDEX_FILENAME)
+    if not os.path.exists(filepath):
+        open(filepath, "a").close()
 
+    index = {"version": PROFILE_INDEX_VERSION,
+             "mtime": _get_directory_mtime(directory),
+             "names": sorted(names)}
+    with open(filepath, "w") as outfile:
+        json.dump(index, outfile)
 
-def generatepassword(hash_algorithm, key, data, password_length, charset,
-                     prefix="", suffix="", use_leet="none", leet_level=0):
-    """Generates PasswordMaker password
 
-    Note: L33t ist not supported, yet.
+def load_profile_index(directory="."):
+    """Returns sorted list of profile names from the index file
 
-    Parameters
-    ----------
+    Returns None if the index is missing, unreadable or stale, i. e. if
+    files have been added to or removed from directory since it has been
+    written.
+
+    """
+
+    filepath = os.path.join(directory, PROFILE_INDEX_FILENAME)
+    try:
+        with open(filepath) as infile:
+            index = json.load(infile)
+        mtime = _get_directory_mtime(directory)
+    except (IOError, OSError, ValueError):
+        return None
+
+    if not isinstance(index, dict) or \
+       index.get("version") != PROFILE_INDEX_VERSION or \
+       index.get("mtime") != mtime:
+        return None
+    return index.get("names")
 
-    * hash_algorithm: String
-    \tHash algorithm from ALGORITHMS
-    * key: String
-    \tPassword key, normally maps from master password(!)
-    * data: String
-    \tBase data string, normally concatenates url, username and modifier
-    * password_length: Integer
-    \tLength of the generated password, must be in range(2, 129)
-    * charset: String
-    \tCharacters that may appear in the generated password
-    * prefix: String (default: "")
-    \tPassword prefix
-    * suffix: String (default: "")
-    \tPassword suffix
-    * use_leet: String (default: "none")
-    \tUse leet speech. May be from ["none", "before", "after", "both"]
-    * leet_level: Integer (default: 0)
-    \tl33t level may be from [1-9]. Other values disable leet
+
+def list_profiles(directory="."):
+    """Returns sorted list of the profile names of PWM_setting files
+
+    Names are read from the index file. If it is stale, the directory is
+    scanned. The index is only rewritten by PwmSettingsList.save, so
+    listing never writes.
 
     """
 
-    # If the charset's length < 2 the hash algorithms will run indefinitely.
+    names = load_profile_index(directory)
+    if names is None:
+        names = sorted(_get_setting_filenames(directory))
+    return names
 
-    if len(charset) < 2:
-        msg = "The charset {} contains less than 2 characters."
-        raise ValueError(msg.format(charset))
 
-    # apply the algorithm
-    hash_func_wrapper = PwmHashUtils(hash_algorithm, charset).hash_func_wrapper
-    hash_uses_hmac = hash_algorithm.count("hmac") > 0
+def complete_profiles(prefix, directory="."):
+    """Returns sorted list of the profile names that start with prefix"""
 
-    # Apply l33t before the algorithm?
-    if use_leet in ("before", "both"):
-        key = leet(leet_level, key)
-        data = leet(leet_level, data)
+    return PrefixIndex(list_profiles(directory)).find(prefix)
 
-    # Ensure encoding to avoid Python3 issues
-    key = key.encode("utf-8")
-    data = data.encode("utf-8")
 
-    tkey = key  # Copy of the master password so we don't interfere with it
-    dat = data
+def resolve_profile(name, directory="."):
+    """Returns name if it is the name of a profile in directory
 
-    password = ''
+    Only exact names are accepted, so that no password is derived for a
+    profile that merely starts with name. Prefixes are completed by
+    complete_profiles. Raises KeyError if there is no such profile.
 
-    for i in range(1000):
-        if i:
-            key = tkey + b"\n" + str(i).encode("utf-8")
+    """
 
-        # For non-hmac algorithms, the key is master pw and url
-        # concatenated
+    filepath = get_setting_filepath(name, directory)
+    if os.sep in name or (os.altsep and os.altsep in name) or \
+       not os.path.isfile(filepath):
+        raise KeyError(name)
+    return name
 
-        if hash_uses_hmac:
-            password += hash_func_wrapper(key, dat)
-        else:
-            dat = key + data
-            password += hash_func_wrapper(dat)
 
-        if len(password) >= password_length:
-            break
+def load_profile(name, directory="."):
+    """Returns PwmSettings of profile name from its PWM_setting file
 
-    # Apply l33t after the algorithm?
-    if use_leet in ("after", "both"):
-        password = leet(leet_level, password)
+    Only this file is read. Raises KeyError if it does not exist.
 
-    if prefix:
-        password = prefix + password
-    if suffix:
-        password = password[:password_length-len(suffix)] + suffix
+    Parameters
+    ----------
+
+    * name: String
+    \tProfile name
+    * directory: String (default: ".")
+    \tDirectory of the PWM_setting files
+
+    """
+
+    filepath = get_setting_filepath(resolve_profile(name, directory),
+                                    directory)
+    pwm = PwmSettings()
+    pwm.load(filepath)
+    return pwm
+
+
+def _get_fingerprint(filepath):
+    """Returns tuple (mtime, size) of filepath"""
+
+    stat = os.stat(filepath)
+    return getattr(stat, "st_mtime_ns", stat.st_mtime), stat.st_size
+
+
+def _copy_profiles(profiles):
+    """Returns OrderedDict of private copies of the PwmSettings in profiles
+
+    Parameters
+    ----------
+
+    * profiles: Mapping or iterable of (name, PwmSettings) tuples
+    \tProfiles to copy
+
+    """
+
+    if hasattr(profiles, "items"):
+        profiles = profiles.items()
+    return OrderedDict((name, attr.evolve(pwm)) for name, pwm in profiles)
+
+
+def _freeze_profiles(profiles):
+    """Returns read-only mapping of private copies of profiles"""
+
+    return MappingProxyType(_copy_profiles(profiles))
+
+
+class _ProfilesView(Mapping):
+    """Read-only mapping name -> PwmSettings that returns copies
+
+    Parameters
+    ----------
+
+    * profiles: Mapping name -> PwmSettings
+    \tProfiles that are never handed out themselves
+
+    """
+
+    __slots__ = ("_profiles",)
+
+    def __init__(self, profiles):
+        self._profiles = profiles
+
+    def __getitem__(self, name):
+        return attr.evolve(self._profiles[name])
+
+    def __iter__(self):
+        return iter(self._profiles)
+
+    def __len__(self):
+        return len(self._profiles)
+
+    def __contains__(self, name):
+        return name in self._profiles
+
+    def __repr__(self):
+        return "_ProfilesView({!r})".format(list(self._profiles))
+
+
+LEET_KEY_CACHE_SIZE = 16
+
+
+@attr.s
+class LeetKeyCache(object):
+    """Bounded cache of l33t transformed and encoded keys
+
+    With l33t "before" or "both", generatepassword transforms the key of
+    every derivation although it does not change within a session. For
+    SecretKey keys, the cache keeps the transformed key per key and l33t
+    level as SecretKey, so that only the data is transformed per site.
+    Entries are found by a keyed BLAKE2 digest of the key with a random
+    salt, the cache holds no plain copy of it. Like LRUCache, it may be
+    shared by threads.
+
+    String keys are transformed by leet without caching. Their l33t costs
+    less than a lookup, and derivations with a cached SecretKey take the
+    slower buffer path of generatepassword.
+
+    Evicted keys are wiped by SecretKey when the last derivation that uses
+    them is done. wipe overwrites all keys at once and must not be called
+    while derivations with the cache are running.
+
+    Parameters
+    ----------
+
+    * maxsize: Integer (default: LEET_KEY_CACHE_SIZE)
+    \tMaximum number of (key, l33t level) entries
+
+    """
+
+    maxsize = attr.ib(default=LEET_KEY_CACHE_SIZE)
+    _keys = attr.ib(init=False, repr=False, eq=False)
+    _hasher = attr.ib(init=False, repr=False, eq=False)
+
+    @_keys.default
+    def _keys_default(self):
+        return LRUCache(self.maxsize)
+
+    @_hasher.default
+    def _hasher_default(self):
+        # Copying a keyed state is cheaper than keying a new one per lookup
+        return hashlib.blake2b(key=os.urandom(16), digest_size=16)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _get_key_id(self, key, leet_level):
+        """Returns cache key of the SecretKey key"""
+
+        key_hash = self._hasher.copy()
+        with key.view() as key_view:
+            key_hash.update(key_view)
+        return key_hash.digest(), leet_level
+
+    def get(self, key, leet_level):
+        """Returns l33t transformed key, a SecretKey for SecretKey keys
+
+        Parameters
+        ----------
+
+        * key: String or SecretKey
+        \tPassword key, normally the master password
+        * leet_level: Integer
+        \tl33t level
+
+        """
+
+        if not isinstance(key, SecretKey):
+            return leet(leet_level, key)
+
+        key_id = self._get_key_id(key, leet_level)
+        leet_key = self._keys.get(key_id)
+        if leet_key is None:
+            with key.view() as key_view:
+                leet_key = SecretKey.from_buffer(
+                    leet_buffer(leet_level, key_view))
+            self._keys[key_id] = leet_key
+        return leet_key
+
+    def wipe(self):
+        """Overwrites all cached keys with zeros and empties the cache"""
+
+        for leet_key in self._keys.values():
+            leet_key.wipe()
+        self._keys.clear()
+
+
+@attr.s(frozen=True)
+class ContextSnapshot(object):
+    """Immutable snapshot of a profile set
+
+    The profiles of a snapshot are never mutated after it has been created;
+    get and profiles hand out copies.
+    Any number of threads may read from and derive with a snapshot without
+    locking. Changes create a new snapshot via evolve, which copies only the
+    changed profiles (copy-on-write).
+
+    Parameters
+    ----------
+
+    * profiles: Iterable of (name, PwmSettings) tuples (default: empty)
+    \tProfiles in order. The snapshot stores copies.
+    * current: String (default: "default")
+    \tName of the current profile
+    * version: Integer (default: 0)
+    \tIncremented by evolve
+
+    """
+
+    _profiles = attr.ib(default=(), converter=_freeze_profiles)
+    current = attr.ib(default="default")
+    version = attr.ib(default=0)
+
+    def __len__(self):
+        return len(self._profiles)
+
+    def __contains__(self, name):
+        return name in self._profiles
+
+    def __iter__(self):
+        return iter(self._profiles)
+
+    @property
+    def profiles(self):
+        """Returns read-only mapping name -> copy of the PwmSettings"""
+
+        return _ProfilesView(self._profiles)
+
+    def get(self, name=None):
+        """Returns a copy of the PwmSettings of name, default: current
+
+        Raises KeyError if name is unknown.
+
+        """
+
+        return attr.evolve(self._profiles[self.current if name is None
+                                          else name])
+
+    def derive(self, name=None, leet_keys=None, **overrides):
+        """Returns the password of profile name, default: current
+
+        Parameters
+        ----------
+
+        * name: String (default: current profile)
+        \tProfile name
+        * leet_keys: LeetKeyCache (default: None)
+        \tCache of l33t transformed keys
+        * overrides: Keyword arguments
+        \tPwmSettings fields that replace the profile's values, e. g. URL or
+        \tMasterPass
+
+        """
+
+        pwm = self._profiles[self.current if name is None else name]
+        if overrides:
+            pwm = attr.evolve(pwm, **overrides)
+        return generatepasswordfrom(pwm, leet_keys)
+
+    def evolve(self, profiles=None, removed=(), current=None):
+        """Returns a new snapshot with the given changes
+
+        If the current profile is removed, the first remaining profile
+        becomes current.
+
+        Parameters
+        ----------
+
+        * profiles: Mapping name -> PwmSettings (default: no changes)
+        \tProfiles that are added or replaced. The snapshot stores copies.
+        * removed: Iterable of String (default: empty)
+        \tNames of profiles that are removed. Raises KeyError if unknown.
+        * current: String (default: unchanged)
+        \tName of the new current profile. Raises KeyError if unknown.
+
+        """
+
+        new_profiles = OrderedDict(self._profiles)
+        if profiles:
+            new_profiles.update(_copy_profiles(profiles))
+        for name in removed:
+            del new_profiles[name]
+
+        if current is None:
+            current = self.current
+        elif current not in new_profiles:
+            raise KeyError(current)
+        if current not in new_profiles and new_profiles:
+            current = next(iter(new_profiles))
+
+        snapshot = ContextSnapshot(current=current, version=self.version + 1)
+        # Unchanged profiles are shared with this snapshot
+        object.__setattr__(snapshot, "_profiles",
+                           MappingProxyType(new_profiles))
+        return snapshot
+
+    @classmethod
+    def from_settings_list(cls, settings_list):
+        """Returns snapshot of a PwmSettingsList"""
+
+        return cls(settings_list.items(), settings_list.current)
+
+    def to_settings_list(self):
+        """Returns a PwmSettingsList with copies of the profiles"""
+
+        names = list(self._profiles)
+        return PwmSettingsList(self.current, names,
+                               [self.get(name) for name in names])
+
+
+@attr.s
+class DerivationContext(object):
+    """Shared, thread-safe holder of the current ContextSnapshot
+
+    Readers call derive or take snapshot and never lock. Writers are
+    serialized by a lock; each update builds a new snapshot and publishes it
+    with a single reference assignment, so that readers see either the old
+    or the new profile set but never a partial update.
+
+    l33t transformed SecretKey master passwords may be cached in leet_keys.
+    Call wipe when the context is no longer used.
+
+    Parameters
+    ----------
+
+    * snapshot: ContextSnapshot (default: empty snapshot)
+    \tInitial snapshot
+    * leet_keys: LeetKeyCache (default: None)
+    \tOpt-in cache of l33t transformed keys
+
+    """
+
+    _snapshot = attr.ib(default=attr.Factory(ContextSnapshot))
+    leet_keys = attr.ib(default=None, repr=False, eq=False)
+    _write_lock = attr.ib(init=False, repr=False, eq=False,
+                          default=attr.Factory(threading.Lock))
+
+    @property
+    def snapshot(self):
+        """Returns the currently published snapshot"""
+
+        return self._snapshot
+
+    def derive(self, name=None, **overrides):
+        """Derives the password of profile name from the current snapshot"""
+
+        return self._snapshot.derive(name, self.leet_keys, **overrides)
+
+    def update(self, profiles=None, removed=(), current=None):
+        """Publishes a new snapshot and returns it
+
+        Parameters are the same as for ContextSnapshot.evolve.
+
+        """
+
+        with self._write_lock:
+            self._snapshot = self._snapshot.evolve(profiles, removed, current)
+            return self._snapshot
+
+    def set_profile(self, name, pwm):
+        """Adds or replaces profile name"""
+
+        return self.update(profiles={name: pwm})
+
+    def remove_profile(self, name):
+        """Removes profile name"""
+
+        return self.update(removed=(name,))
+
+    def set_current(self, name):
+        """Makes profile name the current profile"""
+
+        return self.update(current=name)
+
+    def wipe(self):
+        """Wipes the cached l33t transformed keys"""
+
+        if self.leet_keys is not None:
+            self.leet_keys.wipe()
+
+    @classmethod
+    def from_settings_list(cls, settings_list):
+        """Returns context with a snapshot of a PwmSettingsList"""
+
+        return cls(ContextSnapshot.from_settings_list(settings_list))
+
+
+# Main PasswordMaker functions
+
+
+def get_leet_mapping(leet_level):
+    """Returns a leet mappings for given leet level
+
+    For levels not in [1, 9], an empty dict is returned.
+
+    Parameters
+    ----------
+    * leet_level: Integer in [1, 9]
+    \tLeet level.
+
+    """
+
+    # In leet_additional_mappings_per_level low level conversions are
+    # maintained at higher levels unless they are overridden.
+    # Conversions in the dicts always refer to the original character,
+    # i. e. not to converted ones.
+
+    leet_additional_mappings_per_level = [
+        {},
+        {"a": "4", "e": "3", "l": "1", "o": "0", "q": "9", "t": "7"},
+        {"i": "l", "s": "5", "z": "2"},
+        {"b": "8", "g": "6", "i": "'", "y": "'/"},
+        {"a": "@"},
+        {"b": "|3", "h": "#", "i": "!", "j": "7", "k": "|<", "p": "|>",
+         "r": "|2", "s": "$", "v": "\\/"},
+        {"d": "|)", "e": "&", "f": "|=", "j": ",|"},
+        {"c": "[", "m": "^^", "n": "^/", "p": "|*", "s": "5", "u": "(_)",
+         "w": "\\/\\/", "x": "><"},
+        {"b": "8", "c": "(", "h": "|-|", "j": "_|", "k": "|(", "m": "|\\/|",
+         "n": "|\\|", "o": "()", "p": "|>", "q": "(,)", "r": "|2", "s": "$",
+         "t": "|", "u": "|_|", "w": "\\^/", "x": ")(", "z": "\"/_"},
+        {"k": "|{", "l": "|_", "m": "/\\/\\"},
+    ]
+
+    leet_mapping = {}
+    for j in range(leet_level + 1):
+        leet_mapping.update(leet_additional_mappings_per_level[j])
+
+    return leet_mapping
+
+
+# str.translate tables of the leet levels, built on first use. Levels <= 0
+# share the empty table of level 0.
+
+_LEET_TABLES = {}
+
+
+def get_leet_table(leet_level):
+    """Returns the leet mapping for leet_level as str.translate table
+
+    Parameters
+    ----------
+    * leet_level: Integer in [1, 9]
+    \tLeet level.
+
+    """
+
+    leet_level = max(leet_level, 0)
+    try:
+        return _LEET_TABLES[leet_level]
+    except KeyError:
+        table = dict((ord(char), leet_char) for char, leet_char
+                     in get_leet_mapping(leet_level).items())
+        _LEET_TABLES[leet_level] = table
+        return table
+
+
+@_profiled("leet")
+def leet(leet_level, message):
+    """Converts the string in message to l33t-speak
+
+    The l33t level is specified by leet_level.
+    l33t levels are 1-9 with 1 being the simplest form of l33t-speak and
+    9 being the most complex.
+
+    Note that _message_ is converted to lower-case if the l33t conversion is
+    performed. Using a _leetLevel_ <= 0 results in the original message
+    being returned.
+
+    """
+
+    return message.lower().translate(get_leet_table(leet_level))
+
+
+# l33t of ASCII bytes, lists byte value -> transformed bytes per level
+
+_LEET_BYTE_TABLES = {}
+
+
+def leet_buffer(leet_level, buf):
+    """Returns the UTF-8 encoded text in buf in l33t-speak as new bytearray
+
+    ASCII text is transformed bytewise, so that no immutable copy of it is
+    made, e. g. of a SecretKey. Other text is decoded, because lowercasing
+    non-ASCII characters may depend on their context.
+
+    Parameters
+    ----------
+
+    * leet_level: Integer
+    \tl33t level as for leet
+    * buf: Bytes-like object
+    \tUTF-8 encoded text
+
+    """
+
+    if any(byte > 127 for byte in buf):
+        message = leet(leet_level, str(buf, "utf-8"))
+        return bytearray(message.encode("utf-8"))
+
+    leet_level = max(leet_level, 0)
+    try:
+        byte_table = _LEET_BYTE_TABLES[leet_level]
+    except KeyError:
+        table = get_leet_table(leet_level)
+        byte_table = [chr(byte).lower().translate(table).encode("ascii")
+                      for byte in range(128)]
+        _LEET_BYTE_TABLES[leet_level] = byte_table
+
+    return bytearray().join([byte_table[byte] for byte in buf])
+
+
+# URLParts string -> pwmurl.UrlNormalizer
+_URL_NORMALIZERS = {}
+
+
+def get_settings_url(settings):
+    """Returns the URL of settings reduced to its URLParts
+
+    Without URLParts, the URL is used as given. The UrlNormalizer of each
+    URLParts value is created once.
+
+    Parameters
+    ----------
+
+    * settings: PwmSettings
+    \tSettings instance
+
+    """
+
+    if not settings.URLParts:
+        return settings.URL
+
+    normalizer = _URL_NORMALIZERS.get(settings.URLParts)
+    if normalizer is None:
+        # pwmurl imports pwmlib and loads the public suffix list, so it is
+        # imported on first use
+        from pwmurl import UrlNormalizer
+
+        parts = settings.URLParts.split()
+        normalizer = UrlNormalizer(use_protocol="protocol" in parts,
+                                   use_subdomains="subdomains" in parts,
+                                   use_domain="domain" in parts,
+                                   use_path="path" in parts)
+        _URL_NORMALIZERS[settings.URLParts] = normalizer
+    return normalizer.normalize(settings.URL)
+
+
+def generatepasswordfrom(settings, leet_keys=None):
+    """Calls self.generatepassword with parameters from settings
+
+    Parameters
+    ----------
+
+    * settings: PwmSettingsList
+    \tSettings instance
+    * leet_keys: LeetKeyCache (default: None)
+    \tCache of l33t transformed keys
+
+    """
+
+    concat_url = get_settings_url(settings) + settings.Username + \
+        settings.Modifier
+
+    if settings.Algorithm == "md5" and settings.Length == 8 and \
+       settings.UseLeet == "none" and not settings.Prefix and \
+       not settings.Suffix and settings.CharacterSet == FULL_CHARSET:
+        return _generatepassword_default(settings.MasterPass, concat_url)
+
+    return generatepassword(hash_algorithm=settings.Algorithm,
+                            key=settings.MasterPass,
+                            data=concat_url,
+                            password_length=settings.Length,
+                            charset=settings.CharacterSet,
+                            prefix=settings.Prefix,
+                            suffix=settings.Suffix,
+                            use_leet=settings.UseLeet,
+                            leet_level=settings.LeetLvl,
+                            cost=settings.Cost,
+                            leet_keys=leet_keys)
+
+
+def generatepasswordsfrom(settings_seq, workers=None):
+    """Returns list of passwords, one for each PwmSettings in settings_seq
+
+    Derivations run in a thread pool. hashlib releases the GIL while hashing
+    longer inputs and while stretching keys, so that key stretching
+    algorithms are spread across cores.
+
+    Parameters
+    ----------
+
+    * settings_seq: Iterable of PwmSettings
+    \tSettings instances
+    * workers: Integer (default: number of CPUs)
+    \tNumber of threads
+
+    """
+
+    settings_seq = list(settings_seq)
+    if workers is None:
+        workers = cpu_count()
+
+    if workers <= 1 or len(settings_seq) <= 1:
+        return [generatepasswordfrom(settings) for settings in settings_seq]
+
+    pool = ThreadPool(min(workers, len(settings_seq)))
+    try:
+        return pool.map(generatepasswordfrom, settings_seq)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def igeneratepasswordsfrom(settings_iter, workers=None, chunk_size=1024):
+    """Yields (settings, password) for each PwmSettings in settings_iter
+
+    In contrast to generatepasswordsfrom, settings_iter is consumed lazily
+    in chunks of chunk_size, so that memory does not grow with the number of
+    settings. Order is preserved.
+
+    Parameters
+    ----------
+
+    * settings_iter: Iterable of PwmSettings
+    \tSettings instances
+    * workers: Integer (default: number of CPUs)
+    \tNumber of threads
+    * chunk_size: Integer (default: 1024)
+    \tNumber of settings that are derived per thread pool call
+
+    """
+
+    settings_iter = iter(settings_iter)
+    if workers is None:
+        workers = cpu_count()
+
+    pool = ThreadPool(workers) if workers > 1 else None
+    try:
+        while True:
+            chunk = list(islice(settings_iter, chunk_size))
+            if not chunk:
+                return
+            if pool is None:
+                passwords = [generatepasswordfrom(settings)
+                             for settings in chunk]
+            else:
+                passwords = pool.map(generatepasswordfrom, chunk)
+            for item in zip(chunk, passwords):
+                yield item
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+
+def calibrate_cost(algorithm, target_seconds=0.25, password_length=8,
+                   charset=FULL_CHARSET):
+    """Returns the cost of algorithm that takes about target_seconds
+
+    The runtime of key stretching algorithms doubles with each cost step.
+    Therefore, the cost is extrapolated from a probe that takes at least
+    10 ms on the current machine.
+
+    Parameters
+    ----------
+
+    * algorithm: String
+    \tKey stretching algorithm from STRETCHING_ALGORITHM_2_HASH_FUNC
+    * target_seconds: Float (default: 0.25)
+    \tTarget runtime of one generatepassword call
+    * password_length: Integer (default: 8)
+    \tPassword length of the probe
+    * charset: String (default: FULL_CHARSET)
+    \tCharset of the probe
+
+    """
+
+    if algorithm not in STRETCHING_ALGORITHM_2_HASH_FUNC:
+        msg = "{} is no key stretching algorithm."
+        raise ValueError(msg.format(algorithm))
+
+    max_cost = MAX_COSTS[algorithm]
+    cost = min(10, max_cost)
+    while True:
+        start = default_timer()
+        generatepassword(algorithm, "calibration", "passwordmaker.org",
+                         password_length, charset, cost=cost)
+        elapsed = default_timer() - start
+        if elapsed >= 0.01 or cost >= max_cost:
+            break
+        cost += 1
+
+    target_cost = cost + log(target_seconds / elapsed) / log(2)
+    return int(max(1, min(max_cost, round(target_cost))))
+
+
+# Fast path for the default profile: md5, FULL_CHARSET, length 8, no leet,
+# prefix or suffix
+
+_DEFAULT_LENGTH = 8
+_BASE_94 = len(FULL_CHARSET)
+# 94 ** 20 > 2 ** 128, i.e. an md5 digest has at most 20 base 94 digits
+_POWERS_94 = [_BASE_94 ** i for i in range(21)]
+# Two base 94 digits -> two characters
+_PAIRS_94 = [FULL_CHARSET[i] + FULL_CHARSET[j]
+             for i in range(_BASE_94) for j in range(_BASE_94)]
+
+
+@_profiled("generatepassword")
+def _generatepassword_default(key, data):
+    """Returns generatepassword("md5", key, data, 8, FULL_CHARSET)
+
+    Instead of converting the whole digest, only its 8 most significant
+    base 94 digits are computed from the digest's integer value. They are
+    looked up pairwise in a precomputed table.
+
+    """
+
+    digest = _DIGEST_FUNCS["md5"](key.encode("utf-8") + data.encode("utf-8"))
+    value = int.from_bytes(digest, "big")
+
+    n_digits = bisect_right(_POWERS_94, value)
+    if n_digits < _DEFAULT_LENGTH:
+        # The first round yields less than 8 characters (p < 1e-25)
+        return generatepassword("md5", key, data, _DEFAULT_LENGTH,
+                                FULL_CHARSET)
+
+    top = value // _POWERS_94[n_digits - _DEFAULT_LENGTH]
+    high, low = divmod(top, _POWERS_94[4])
+    high_1, high_2 = divmod(high, _POWERS_94[2])
+    low_1, low_2 = divmod(low, _POWERS_94[2])
+    return _PAIRS_94[high_1] + _PAIRS_94[high_2] + _PAIRS_94[low_1] + \
+        _PAIRS_94[low_2]
+
+
+_HASH_UTILS_CACHE = LRUCache(CHARSET_CACHE_SIZE)
+
+
+def _get_hash_utils(hash_algorithm, charset, cost=0):
+    """Returns cached PwmHashUtils for hash_algorithm, charset and cost"""
+
+    key = (hash_algorithm, charset, cost)
+    hash_utils = _HASH_UTILS_CACHE.get(key)
+    if hash_utils is None:
+        hash_utils = PwmHashUtils(hash_algorithm, compile_charset(charset),
+                                  cost)
+        _HASH_UTILS_CACHE[key] = hash_utils
+    return hash_utils
+
+
+_ZEROS = bytes(4096)
+
+
+def _wipe(buf):
+    """Overwrites the bytearray buf with zeros in place"""
+
+    size = len(buf)
+    if size <= len(_ZEROS):
+        # Equal length slice assignment overwrites in place
+        buf[:] = _ZEROS[:size]
+        return
+
+    with memoryview(buf) as buf_view:
+        for start in range(0, size, len(_ZEROS)):
+            end = min(start + len(_ZEROS), size)
+            buf_view[start:end] = _ZEROS[:end - start]
+
+
+class SecretKey(object):
+    """Master password in a single mutable buffer that can be wiped
+
+    The UTF-8 encoded secret is held in one bytearray. generatepassword
+    reads it via a memoryview and builds the round keys in reused buffers
+    that are wiped afterwards, so that no immutable copies of the key are
+    left behind. Only l33t "before" of non-ASCII keys needs a temporary str
+    of the key.
+
+    Use as context manager or call wipe when the secret is no longer needed.
+
+    Parameters
+    ----------
+
+    * secret: String, bytes or bytearray
+    \tSecret. Strings are UTF-8 encoded. A bytearray is copied and should
+    \tbe wiped by the caller; use from_buffer for taking it over.
+
+    """
+
+    __slots__ = ("_buffer",)
+
+    def __init__(self, secret=b""):
+        if isinstance(secret, str):
+            secret = secret.encode("utf-8")
+        self._buffer = bytearray(secret)
+
+    @classmethod
+    def from_buffer(cls, buf):
+        """Returns SecretKey that takes over and later wipes bytearray buf"""
+
+        secret_key = cls()
+        secret_key._buffer = buf
+        return secret_key
+
+    def __len__(self):
+        return len(self._buffer)
+
+    def __repr__(self):
+        return "SecretKey(<{} bytes>)".format(len(self._buffer))
+
+    def __eq__(self, other):
+        if not isinstance(other, SecretKey):
+            return NotImplemented
+        return hmac.compare_digest(self._buffer, other._buffer)
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    __hash__ = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.wipe()
+
+    def __del__(self):
+        self.wipe()
+
+    def view(self):
+        """Returns read-only memoryview of the secret
+
+        Release the view when done, otherwise wipe cannot empty the buffer.
+
+        """
+
+        with memoryview(self._buffer) as buf_view:
+            return buf_view.toreadonly()
+
+    def wipe(self):
+        """Overwrites the secret with zeros and empties it
+
+        The buffer keeps its length as long as views of it exist.
+
+        """
+
+        _wipe(self._buffer)
+        try:
+            del self._buffer[:]
+        except BufferError:
+            pass
+
+    @property
+    def wiped(self):
+        """True if the secret has been wiped or is empty"""
+
+        return not any(self._buffer)
+
+
+def _iter_round_keys(key, tail=b""):
+    """Yields the key of each derivation round followed by tail
+
+    Round keys are key, key + b"\\n1", key + b"\\n2", ... They are built in
+    place in a bytearray that is reused while its length is unchanged. The
+    buffers are wiped when they are replaced and when the generator is
+    closed.
+
+    Parameters
+    ----------
+
+    * key: Bytes-like object
+    \tUTF-8 encoded key. For bytes, new bytes objects are yielded.
+    * tail: Bytes (default: b"")
+    \tAppended to each round key, e. g. the data of non-HMAC algorithms
+
+    """
+
+    if isinstance(key, bytes):
+        # Immutable keys cannot be wiped, concatenation is faster
+        yield key + tail
+        for i in range(1, 1000):
+            yield key + b"\n" + str(i).encode("utf-8") + tail
+        return
+
+    key_length = len(key)
+    buf = bytearray(key_length + len(tail))
+    try:
+        for i in range(1000):
+            if i:
+                round_suffix = b"\n" + str(i).encode("utf-8")
+                size = key_length + len(round_suffix) + len(tail)
+                if len(buf) != size:
+                    _wipe(buf)
+                    del buf[:]
+                    buf = bytearray(size)
+                    key_in_buf = False
+                buf[key_length:] = round_suffix + tail
+            else:
+                key_in_buf = False
+                buf[key_length:] = tail
+            # Slice assignment to a bytearray would copy a memoryview key
+            # into a temporary bytearray. A memoryview target copies directly.
+            if not key_in_buf:
+                with memoryview(buf) as buf_view:
+                    buf_view[:key_length] = key
+                key_in_buf = True
+            yield buf
+    finally:
+        _wipe(buf)
+
+
+@attr.s
+class PrimedKey(object):
+    """Hash states that have absorbed the key of each derivation round
+
+    Deriving many passwords with one master password repeats the key
+    schedule: the HMAC key padding or, for plain hashes, the key prefix.
+    PrimedKey computes these states once per round and copies them for each
+    derivation. Obtain instances via get_primed_key.
+
+    Parameters
+    ----------
+
+    * hash_algorithm: String
+    \tHash algorithm from ALGORITHMS, no key stretching algorithm
+    * key: Bytes
+    \tUTF-8 encoded key after l33t has been applied
+
+    """
+
+    hash_algorithm = attr.ib()
+    key = attr.ib(repr=False)
+    _states = attr.ib(init=False, repr=False, default=attr.Factory(dict))
+
+    def _prime(self, round_key):
+        """Returns hash state that has absorbed round_key"""
+
+        # The wrapper name, e. g. any_hmac_sha1, decides the digest
+        hash_func_name = ALGORITHM_2_HASH_FUNC[self.hash_algorithm]
+        if hash_func_name.startswith("any_hmac_"):
+            return hmac.new(round_key, None,
+                            HASHLIB_NAMES[hash_func_name[9:]])
+        return hashlib.new(HASHLIB_NAMES[hash_func_name[4:]], round_key)
+
+    def digest(self, round_no, data):
+        """Returns the raw digest of derivation round round_no for data"""
+
+        try:
+            state = self._states[round_no]
+        except KeyError:
+            round_key = self.key
+            if round_no:
+                round_key += b"\n" + str(round_no).encode("utf-8")
+            state = self._states[round_no] = self._prime(round_key)
+
+        state = state.copy()
+        state.update(data)
+        return state.digest()
+
+
+def get_primed_key(hash_algorithm, key, use_leet="none", leet_level=0):
+    """Returns PrimedKey for generatepassword or None if not supported
+
+    Key stretching algorithms and algorithms without hashlib support are
+    not primed.
+
+    Parameters
+    ----------
+
+    * hash_algorithm: String
+    \tHash algorithm from ALGORITHMS or STRETCHING_ALGORITHMS
+    * key: String
+    \tPassword key, normally the master password
+    * use_leet: String (default: "none")
+    \tUse leet speech. May be from ["none", "before", "after", "both"]
+    * leet_level: Integer (default: 0)
+    \tl33t level may be from [1-9]. Other values disable leet
+
+    """
+
+    hash_func_name = ALGORITHM_2_HASH_FUNC.get(hash_algorithm, "")
+    digest_name = hash_func_name.replace("any_hmac_", "").replace("any_", "")
+    if digest_name not in HASHLIB_NAMES or \
+       HASH_BACKENDS.get(digest_name, {}).get("hashlib") is None:
+        return None
+
+    if use_leet in ("before", "both"):
+        key = leet(leet_level, key)
+    return PrimedKey(hash_algorithm, key.encode("utf-8"))
+
+
+@_profiled("generatepassword")
+def generatepassword(hash_algorithm, key, data, password_length, charset,
+                     prefix="", suffix="", use_leet="none", leet_level=0,
+                     cost=0, primed_key=None, leet_keys=None):
+    """Generates PasswordMaker password
+
+    Note: L33t ist not supported, yet.
+
+    Parameters
+    ----------
+
+    * hash_algorithm: String
+    \tHash algorithm from ALGORITHMS or STRETCHING_ALGORITHMS
+    * key: String or SecretKey
+    \tPassword key, normally maps from master password(!)
+    * data: String
+    \tBase data string, normally concatenates url, username and modifier
+    * password_length: Integer
+    \tLength of the generated password, must be in range(2, 129)
+    * charset: String or CompiledCharset
+    \tCharacters that may appear in the generated password
+    * prefix: String (default: "")
+    \tPassword prefix
+    * suffix: String (default: "")
+    \tPassword suffix
+    * use_leet: String (default: "none")
+    \tUse leet speech. May be from ["none", "before", "after", "both"]
+    * leet_level: Integer (default: 0)
+    \tl33t level may be from [1-9]. Other values disable leet
+    * cost: Integer (default: 0)
+    \tlog2 work factor of key stretching algorithms, 0 for DEFAULT_COSTS
+    * primed_key: PrimedKey (default: None)
+    \tPrimed states of key from get_primed_key with the same hash_algorithm,
+    \tuse_leet and leet_level. Avoids hashing the key for each call.
+    * leet_keys: LeetKeyCache (default: None)
+    \tCache of l33t transformed keys. Avoids l33t of the key for each call.
+
+    """
+
+    # apply the algorithm
+    hash_utils = _get_hash_utils(hash_algorithm, charset, cost)
+    hash_func_wrapper = hash_utils.hash_func_wrapper
+    # Key stretching algorithms take key and data like HMAC algorithms
+    hash_uses_hmac = hash_algorithm.count("hmac") > 0 or \
+        hash_algorithm in STRETCHING_ALGORITHM_2_HASH_FUNC
+
+    if _PROFILE_HOOKS:
+        hash_func_wrapper = _profiled("hash")(hash_func_wrapper)
+
+    if isinstance(key, SecretKey) and primed_key is not None:
+        raise ValueError("SecretKey and primed_key are exclusive")
+
+    leet_key = None
+
+    # Apply l33t before the algorithm?
+    if use_leet in ("before", "both"):
+        if leet_keys is not None:
+            key = leet_keys.get(key, leet_level)
+        elif isinstance(key, SecretKey):
+            with key.view() as key_view:
+                key = leet_key = SecretKey.from_buffer(
+                    leet_buffer(leet_level, key_view))
+        else:
+            key = leet(leet_level, key)
+        data = leet(leet_level, data)
+
+    # Ensure encoding to avoid Python3 issues
+    if isinstance(key, SecretKey):
+        key = key.view()
+    else:
+        key = key.encode("utf-8")
+    data = data.encode("utf-8")
+
+    # A suffix longer than the password slices from the end of the password
+    head_only = len(suffix) <= password_length
+
+    password = ''
+
+    # For non-hmac algorithms, the key is master pw and url
+    # concatenated
+    if primed_key is not None:
+        round_keys = (None for _ in range(1000))
+    else:
+        round_keys = _iter_round_keys(key, b"" if hash_uses_hmac else data)
+
+    try:
+        for i, round_key in enumerate(round_keys):
+            # Only the digits that survive the truncation below are
+            # computed. l33t maps single characters to non-empty strings, so
+            # it does not need more.
+            max_digits = password_length - len(password) if head_only \
+                else None
+
+            if primed_key is not None:
+                # The primed states have absorbed the key of round i
+                password += hash_utils.rstr2any(primed_key.digest(i, data),
+                                                max_digits=max_digits)
+            elif hash_uses_hmac:
+                password += hash_func_wrapper(round_key, data,
+                                              max_digits=max_digits)
+            else:
+                password += hash_func_wrapper(round_key,
+                                              max_digits=max_digits)
+
+            if len(password) >= password_length:
+                break
+    finally:
+        round_keys.close()
+        if isinstance(key, memoryview):
+            key.release()
+        if leet_key is not None:
+            leet_key.wipe()
+
+    return finish_password(password, password_length, prefix, suffix,
+                            use_leet, leet_level)
+
+
+def finish_password(password, password_length, prefix="", suffix="",
+                    use_leet="none", leet_level=0):
+    """Applies l33t, prefix, suffix and length to the hashed password
+
+    This is the last step of generatepassword.
+
+    """
+
+    # Apply l33t after the algorithm?
+    if use_leet in ("after", "both"):
+        password = leet(leet_level, password)
+
+    if prefix:
+        password = prefix + password
+    if suffix:
+        password = password[:password_length-len(suffix)] + suffix
+
+    return password[:password_length]
+
+
+class SharedRounds(object):
+    """Round inputs of one key and data, shared by several algorithms
+
+    Round keys and the concatenations with data of non-HMAC algorithms are
+    computed once per round and cached. Threads may compute a round twice,
+    which is harmless.
+
+    Parameters
+    ----------
+
+    * key: Bytes
+    \tUTF-8 encoded key after l33t
+    * data: Bytes
+    \tUTF-8 encoded data after l33t
+
+    """
+
+    def __init__(self, key, data):
+        self.key = key
+        self.data = data
+        self._round_keys = {0: key}
+        self._messages = {}
+
+    @classmethod
+    def create(cls, key, data, use_leet="none", leet_level=0):
+        """Returns SharedRounds for string key and data
+
+        l33t "before" is applied and the strings are UTF-8 encoded as in
+        generatepassword.
+
+        """
+
+        if use_leet in ("before", "both"):
+            key = leet(leet_level, key)
+            data = leet(leet_level, data)
+        return cls(key.encode("utf-8"), data.encode("utf-8"))
+
+    def round_key(self, round_no):
+        """Returns key of round round_no"""
+
+        try:
+            return self._round_keys[round_no]
+        except KeyError:
+            round_key = self.key + b"\n" + str(round_no).encode("utf-8")
+            return self._round_keys.setdefault(round_no, round_key)
+
+    def message(self, round_no):
+        """Returns round key and data concatenated for non-HMAC algorithms"""
+
+        try:
+            return self._messages[round_no]
+        except KeyError:
+            message = self.round_key(round_no) + self.data
+            return self._messages.setdefault(round_no, message)
+
+
+def _derive_shared(hash_algorithm, rounds, password_length, charset,
+                   prefix="", suffix="", use_leet="none", leet_level=0,
+                   cost=0, known=None, stop=None):
+    """Returns password of hash_algorithm from SharedRounds rounds
+
+    If known is given, None is returned as soon as the password cannot start
+    with known. Derivation is aborted with None if the threading.Event stop
+    is set.
+
+    """
+
+    hash_utils = _get_hash_utils(hash_algorithm, charset, cost)
+    hash_func_wrapper = hash_utils.hash_func_wrapper
+    hash_uses_hmac = hash_algorithm.count("hmac") > 0 or \
+        hash_algorithm in STRETCHING_ALGORITHM_2_HASH_FUNC
+
+    head_only = len(suffix) <= password_length
+    if head_only and known is not None:
+        # Without the suffix, partial passwords are prefixes of the result
+        head_length = password_length - len(suffix) if suffix \
+            else password_length
+        known_head = known[:head_length]
+    else:
+        known_head = None
+
+    password = ''
+
+    for i in range(1000):
+        if stop is not None and stop.is_set():
+            return None
+
+        max_digits = password_length - len(password) if head_only else None
+        if hash_uses_hmac:
+            password += hash_func_wrapper(rounds.round_key(i), rounds.data,
+                                          max_digits=max_digits)
+        else:
+            password += hash_func_wrapper(rounds.message(i),
+                                          max_digits=max_digits)
+
+        if known_head is not None:
+            partial = finish_password(password, len(known_head), prefix, "",
+                                       use_leet, leet_level)
+            if not known_head.startswith(partial[:len(known_head)]):
+                return None
+
+        if len(password) >= password_length:
+            break
+
+    return finish_password(password, password_length, prefix, suffix,
+                            use_leet, leet_level)
+
+
+def _map_algorithms(func, algorithms, workers):
+    """Yields func(algorithm) for each algorithm in order via a thread pool"""
+
+    if workers is None:
+        workers = cpu_count()
+
+    if workers <= 1 or len(algorithms) <= 1:
+        for algorithm in algorithms:
+            yield func(algorithm)
+        return
+
+    pool = ThreadPool(min(workers, len(algorithms)))
+    try:
+        for result in pool.imap(func, algorithms):
+            yield result
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def generatepasswords_all(key, data, password_length, charset, prefix="",
+                          suffix="", use_leet="none", leet_level=0,
+                          algorithms=None, cost=0, workers=None):
+    """Returns OrderedDict algorithm -> password for each algorithm
+
+    The result equals generatepassword(algorithm, key, data, ...) for each
+    algorithm. Encoding, l33t and round keys are computed once and shared.
+    The hash families run concurrently in a thread pool.
+
+    Parameters
+    ----------
+
+    * key: String
+    \tPassword key, normally maps from master password(!)
+    * data: String
+    \tBase data string, normally concatenates url, username and modifier
+    * password_length: Integer
+    \tLength of the generated passwords
+    * charset: String or CompiledCharset
+    \tCharacters that may appear in the generated passwords
+    * prefix, suffix, use_leet, leet_level, cost:
+    \tAs in generatepassword
+    * algorithms: Sequence of String (default: ALGORITHMS)
+    \tHash algorithms
+    * workers: Integer (default: number of CPUs)
+    \tNumber of threads
+
+    """
+
+    if algorithms is None:
+        algorithms = ALGORITHMS
+    algorithms = list(algorithms)
+
+    rounds = SharedRounds.create(key, data, use_leet, leet_level)
+
+    def derive(algorithm):
+        """Derives the password of algorithm"""
+        return _derive_shared(algorithm, rounds, password_length, charset,
+                              prefix, suffix, use_leet, leet_level, cost)
+
+    return OrderedDict(zip(algorithms,
+                           _map_algorithms(derive, algorithms, workers)))
+
+
+def find_matching_algorithm(password, key, data, charset, prefix="",
+                            suffix="", use_leet="none", leet_level=0,
+                            algorithms=None, lengths=None, cost=0,
+                            workers=None):
+    """Returns (algorithm, length) that generates password or None
+
+    A match is a length for which generatepassword(algorithm, key, data,
+    length, ...) starts with password, e. g. because a site has truncated
+    it. Algorithms are tried concurrently in the order of algorithms and
+    lengths in ascending order. The derivation of an algorithm stops after
+    the first round that contradicts password, and all derivations stop
+    at the first match.
+
+    Parameters
+    ----------
+
+    * password: String
+    \tKnown password
+    * key, data, charset, prefix, suffix, use_leet, leet_level, cost:
+    \tAs in generatepassword
+    * algorithms: Sequence of String (default: ALGORITHMS)
+    \tCandidate hash algorithms
+    * lengths: Iterable of Integer (default: [len(password)])
+    \tCandidate password lengths. Lengths below len(password) are ignored.
+
+    """
+
+    if algorithms is None:
+        algorithms = ALGORITHMS
+    algorithms = list(algorithms)
+    if lengths is None:
+        lengths = [len(password)]
+    lengths = sorted(length for length in set(lengths)
+                     if length >= len(password))
+
+    rounds = SharedRounds.create(key, data, use_leet, leet_level)
+    stop = threading.Event()
+
+    def match(algorithm):
+        """Returns the smallest matching length of algorithm or None"""
+        for length in lengths:
+            candidate = _derive_shared(algorithm, rounds, length, charset,
+                                       prefix, suffix, use_leet, leet_level,
+                                       cost, known=password, stop=stop)
+            if candidate is not None and candidate.startswith(password):
+                return length
+        return None
+
+    for algorithm, length in zip(algorithms,
+                                 _map_algorithms(match, algorithms, workers)):
+        if length is not None:
+            stop.set()
+            return algorithm, length
+    return None
 
-    return password[:password_length]
@@ -0,0 +1,386 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+PasswordMaker - Profile recovery
+================================
+
+Create and manage passwords.
+
+
+Copyright (C):
+
+    2005      Eric H. Jung, Miquel Burns and LeahScape, Inc.
+              <http://passwordmaker.org>
+              <grimholtz@yahoo.com>
+    2005-2007 Pedro Gimeno Fortea and Miquel Matthew 'Fire' Burns
+              <http://www.formauri.es/personal/pgimeno/>
+              <miquelfire@gmail.com>
+    2010      Aurelien Bompard
+              <http://aurelien.bompard.org>
+    2012      Richard Beales
+              <rich@richbeales.net>
+    2014      Richard Beales, Laurent Bachelier and Christoph Sarnowski
+              <rich@richbeales.net>
+    2018      Martin Manns
+              <mmanns@gmx.net>
+
+    This file is part of PasswordMaker.
+
+    PasswordMaker is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Foobar is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with Foobar.  If not, see <https://www.gnu.org/licenses/>.
+
+Searches PwmSettings that reproduce a known site password, e. g. after a
+profile has been lost. The candidates are the combinations of the values in
+a SearchSpace. Candidates that cannot match because of the length, the
+prefix, the suffix or the characters of the known password are pruned
+before any hashing. The remaining candidates are grouped by derivation
+input, so that l33t, encoding, round keys and digests are computed once per
+group and algorithm and shared by all charsets, prefixes, suffixes and
+l33t after variants. Groups are derived in a process pool.
+
+"""
+
+import itertools
+from multiprocessing import Pool, cpu_count
+from timeit import default_timer
+
+import attr
+
+from pwmlib import ALGORITHMS, CHARSET_PRESETS, LEET_OPTIONS
+from pwmlib import STRETCHING_ALGORITHM_2_HASH_FUNC
+from pwmlib import PwmHashUtils, PwmSettings, SharedRounds
+from pwmlib import finish_password, get_leet_mapping
+
+SEARCH_ALGORITHMS = ALGORITHMS
+LEET_LEVELS = tuple(range(1, 10))
+
+_DEFAULT_LEET_LEVEL = attr.fields(PwmSettings).LeetLvl.default
+
+
+@attr.s
+class SearchSpace(object):
+    """Values of PwmSettings fields that are tried by recover_settings
+
+    Parameters
+    ----------
+
+    * algorithms: Iterable of String (default: SEARCH_ALGORITHMS)
+    \tSEARCH_ALGORITHMS excludes the key stretching algorithms, which are
+    \tslow by design. Listed ones are searched with their default cost.
+    * lengths: Iterable of Integer (default: None)
+    \tNone for the length of the known password
+    * charsets: Iterable of String (default: CHARSET_PRESETS values)
+    * leet_options: Iterable of String (default: LEET_OPTIONS)
+    * leet_levels: Iterable of Integer (default: LEET_LEVELS)
+    \tLevels for l33t options other than "none"
+    * usernames: Iterable of String (default: ("",))
+    * modifiers: Iterable of String (default: ("",))
+    * prefixes: Iterable of String (default: ("",))
+    * suffixes: Iterable of String (default: ("",))
+
+    """
+
+    algorithms = attr.ib(default=SEARCH_ALGORITHMS, converter=tuple)
+    lengths = attr.ib(default=None)
+    charsets = attr.ib(default=tuple(CHARSET_PRESETS.values()),
+                       converter=tuple)
+    leet_options = attr.ib(default=LEET_OPTIONS, converter=tuple)
+    leet_levels = attr.ib(default=LEET_LEVELS, converter=tuple)
+    usernames = attr.ib(default=("",), converter=tuple)
+    modifiers = attr.ib(default=("",), converter=tuple)
+    prefixes = attr.ib(default=("",), converter=tuple)
+    suffixes = attr.ib(default=("",), converter=tuple)
+
+    @property
+    def size(self):
+        """Number of candidates before pruning"""
+
+        lengths = 1 if self.lengths is None else len(tuple(self.lengths))
+        leet_variants = sum(1 if use_leet == "none"
+                            else len(self.leet_levels)
+                            for use_leet in self.leet_options)
+        return len(self.algorithms) * lengths * len(self.charsets) * \
+            leet_variants * len(self.usernames) * len(self.modifiers) * \
+            len(self.prefixes) * len(self.suffixes)
+
+
+@attr.s
+class SearchProgress(object):
+    """Progress of recover_settings, passed to the progress callback
+
+    Attributes
+    ----------
+
+    * done: Integer
+    \tNumber of derived candidates
+    * total: Integer
+    \tNumber of candidates after pruning
+    * pruned: Integer
+    \tNumber of candidates that have been pruned without derivation
+    * matches: Integer
+    \tNumber of candidates that reproduce the password
+    * elapsed: Float
+    \tSeconds since the start of the search
+
+    """
+
+    done = attr.ib(default=0)
+    total = attr.ib(default=0)
+    pruned = attr.ib(default=0)
+    matches = attr.ib(default=0)
+    elapsed = attr.ib(default=0.0)
+
+    @property
+    def rate(self):
+        """Derived candidates per second"""
+
+        return self.done / self.elapsed if self.elapsed else 0.0
+
+
+def _get_allowed_chars(charset, use_leet, leet_level):
+    """Returns set of characters that passwords of the candidate may hold"""
+
+    if use_leet not in ("after", "both"):
+        return frozenset(charset)
+
+    # l33t after lowercases the password and replaces mapped characters
+    leet_mapping = get_leet_mapping(leet_level)
+    allowed_chars = set()
+    for char in charset.lower():
+        allowed_chars.update(leet_mapping.get(char, char))
+    return frozenset(allowed_chars)
+
+
+def _iter_leet_variants(space):
+    """Yields (use_leet, leet_level) of space"""
+
+    for use_leet in space.leet_options:
+        if use_leet == "none":
+            yield use_leet, _DEFAULT_LEET_LEVEL
+        else:
+            for leet_level in space.leet_levels:
+                yield use_leet, leet_level
+
+
+def get_search_tasks(password, space):
+    """Returns list of search tasks and number of pruned candidates
+
+    A task holds username, modifier, l33t before level (None for no l33t
+    before), algorithm and the list of its finishing variants
+    (charset, prefix, suffix, use_leet, leet_level). All candidates of a
+    task share their digests.
+
+    """
+
+    length = len(password)
+    if space.lengths is not None and length not in space.lengths:
+        return [], space.size
+
+    # Prune finishing variants that cannot produce the password
+    variants = []
+    allowed_chars_cache = {}
+    for prefix, suffix in itertools.product(space.prefixes, space.suffixes):
+        # finish_password keeps prefix[:head_length] and the whole suffix
+        head_length = length - len(suffix)
+        if head_length < 0:
+            # The result depends on the length of the hashed password
+            body = ""
+        elif not password.startswith(prefix[:head_length]) or \
+                not password.endswith(suffix):
+            continue
+        else:
+            body = password[min(len(prefix), head_length):head_length]
+        for charset in space.charsets:
+            for use_leet, leet_level in _iter_leet_variants(space):
+                allowed_chars_id = charset, use_leet, leet_level
+                try:
+                    allowed_chars = allowed_chars_cache[allowed_chars_id]
+                except KeyError:
+                    allowed_chars = _get_allowed_chars(charset, use_leet,
+                                                       leet_level)
+                    allowed_chars_cache[allowed_chars_id] = allowed_chars
+                if allowed_chars.issuperset(body):
+                    variants.append((charset, prefix, suffix, use_leet,
+                                     leet_level))
+
+    variant_groups = {}
+    for variant in variants:
+        use_leet, leet_level = variant[3:]
+        before_level = leet_level if use_leet in ("before", "both") else None
+        variant_groups.setdefault(before_level, []).append(variant)
+
+    tasks = []
+    for username, modifier in itertools.product(space.usernames,
+                                                space.modifiers):
+        for before_level, group in sorted(variant_groups.items(),
+                                          key=lambda item: item[0] or 0):
+            for algorithm in space.algorithms:
+                tasks.append((username, modifier, before_level, algorithm,
+                              group))
+
+    total = sum(len(task[4]) for task in tasks)
+    return tasks, space.size - total
+
+
+# Search parameters of a worker process, set by _init_worker
+_WORKER_SEARCH = None
+
+
+def _init_worker(password, url, master_pass):
+    """Pool initializer: stores the search parameters in the worker"""
+
+    global _WORKER_SEARCH
+    _WORKER_SEARCH = password, url, master_pass
+
+
+def _search_task(task, search=None):
+    """Returns number of candidates and list of matches of a search task"""
+
+    password, url, master_pass = search or _WORKER_SEARCH
+    username, modifier, before_level, algorithm, variants = task
+
+    if before_level is None:
+        rounds = SharedRounds.create(master_pass, url + username + modifier)
+    else:
+        rounds = SharedRounds.create(master_pass, url + username + modifier,
+                                     "before", before_level)
+
+    hash_uses_hmac = algorithm.count("hmac") > 0 or \
+        algorithm in STRETCHING_ALGORITHM_2_HASH_FUNC
+    digest_func = PwmHashUtils(algorithm, variants[0][0]).digest_func
+    length = len(password)
+    digests = []
+
+    def get_digest(round_no):
+        """Returns digest of round round_no, shared by all charsets"""
+
+        while len(digests) <= round_no:
+            i = len(digests)
+            if hash_uses_hmac:
+                digests.append(digest_func(rounds.round_key(i), rounds.data))
+            else:
+                digests.append(digest_func(rounds.message(i)))
+        return digests[round_no]
+
+    matches = []
+    raw_passwords = {}
+    for charset, prefix, suffix, use_leet, leet_level in variants:
+        # As in generatepassword, only the head of the converted digests is
+        # needed unless the suffix is longer than the password
+        head_only = len(suffix) <= length
+        try:
+            raw_password = raw_passwords[charset, head_only]
+        except KeyError:
+            hash_utils = PwmHashUtils(algorithm, charset)
+            raw_password = ""
+            for i in range(1000):
+                max_digits = length - len(raw_password) if head_only \
+                    else None
+                raw_password += hash_utils.rstr2any(get_digest(i),
+                                                    max_digits=max_digits)
+                if len(raw_password) >= length:
+                    break
+            raw_passwords[charset, head_only] = raw_password
+
+        if finish_password(raw_password, length, prefix, suffix, use_leet,
+                           leet_level) == password:
+            matches.append((algorithm, charset, prefix, suffix, use_leet,
+                            leet_level, username, modifier))
+
+    return len(variants), matches
+
+
+def recover_settings(password, url, master_pass, space=None, workers=None,
+                     progress=None, progress_interval=1.0, max_matches=None):
+    """Returns list of PwmSettings that reproduce password
+
+    The MasterPass of the returned settings is empty.
+
+    Parameters
+    ----------
+
+    * password: String
+    \tKnown site password
+    * url: String
+    \tURL of the site as used in the lost profile
+    * master_pass: String
+    \tMaster password
+    * space: SearchSpace (default: SearchSpace())
+    \tCandidate values of the searched fields
+    * workers: Integer (default: number of CPUs)
+    \tNumber of processes
+    * progress: Callable (default: None)
+    \tCalled with a SearchProgress at most every progress_interval seconds
+    \tand once at the end of the search
+    * progress_interval: Float (default: 1.0)
+    \tMinimum time between progress calls in seconds
+    * max_matches: Integer (default: None)
+    \tStop after this number of matches, None for a full search
+
+    """
+
+    if space is None:
+        space = SearchSpace()
+
+    start = default_timer()
+    tasks, pruned = get_search_tasks(password, space)
+    state = SearchProgress(total=sum(len(task[4]) for task in tasks),
+                           pruned=pruned)
+
+    if workers is None:
+        workers = cpu_count()
+
+    pool = None
+    if workers > 1 and len(tasks) > 1:
+        pool = Pool(min(workers, len(tasks)), _init_worker,
+                    (password, url, master_pass))
+        results = pool.imap_unordered(_search_task, tasks)
+    else:
+        search = password, url, master_pass
+        results = (_search_task(task, search) for task in tasks)
+
+    matches = []
+    last_report = 0.0
+    try:
+        for count, task_matches in results:
+            matches.extend(task_matches)
+            state.done += count
+            state.matches = len(matches)
+            state.elapsed = default_timer() - start
+            if max_matches is not None and len(matches) >= max_matches:
+                break
+            if progress is not None and \
+               state.elapsed - last_report >= progress_interval:
+                progress(state)
+                last_report = state.elapsed
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+    if progress is not None:
+        state.elapsed = default_timer() - start
+        progress(state)
+
+    # Results of imap_unordered arrive in any order
+    matches.sort(key=lambda match: (space.algorithms.index(match[0]),
+                                    space.charsets.index(match[1])) +
+                 match[2:])
+
+    return [PwmSettings(URL=url, Algorithm=algorithm, Username=username,
+                        Modifier=modifier, Length=len(password),
+                        CharacterSet=charset, Prefix=prefix, Suffix=suffix,
+                        UseLeet=use_leet, LeetLvl=leet_level)
+            for algorithm, charset, prefix, suffix, use_leet, leet_level,
+            username, modifier in matches[:max_matches]]
@@ -0,0 +1,243 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+PasswordMaker - Master password rotation
+========================================
+
+Create and manage passwords.
+
+
+Copyright (C):
+
+    2005      Eric H. Jung, Miquel Burns and LeahScape, Inc.
+              <http://passwordmaker.org>
+              <grimholtz@yahoo.com>
+    2005-2007 Pedro Gimeno Fortea and Miquel Matthew 'Fire' Burns
+              <http://www.formauri.es/personal/pgimeno/>
+              <miquelfire@gmail.com>
+    2010      Aurelien Bompard
+              <http://aurelien.bompard.org>
+    2012      Richard Beales
+              <rich@richbeales.net>
+    2014      Richard Beales, Laurent Bachelier and Christoph Sarnowski
+              <rich@richbeales.net>
+    2018      Martin Manns
+              <mmanns@gmx.net>
+
+    This file is part of PasswordMaker.
+
+    PasswordMaker is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Foobar is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with Foobar.  If not, see <https://www.gnu.org/licenses/>.
+
+Derives the (old, new) password pair of every profile of a PwmSettingsList
+for a master password change. Each worker primes the hash states of both
+master passwords once per algorithm and l33t setting (see PrimedKey) and
+reuses them for all profiles. Pairs are streamed into an OutputSink in
+profile order. A checkpoint file records how many profiles have been
+written, so that an interrupted rotation resumes where it stopped.
+
+"""
+
+import hashlib
+import json
+import os
+from multiprocessing import Pool, cpu_count
+
+import attr
+
+from pwmlib import generatepassword, get_primed_key, get_settings_url
+
+ROTATION_FIELDS = ("Name", "URL", "Username", "Modifier", "OldPassword",
+                   "NewPassword")
+CHECKPOINT_VERSION = 1
+
+
+@attr.s
+class KeyDeriver(object):
+    """Derives passwords of PwmSettings with one master password
+
+    Primed key states are cached per algorithm and l33t setting. The
+    MasterPass of the settings is ignored.
+
+    Parameters
+    ----------
+
+    * master_pass: String
+    \tMaster password
+
+    """
+
+    master_pass = attr.ib(repr=False)
+    _primed_keys = attr.ib(init=False, repr=False,
+                           default=attr.Factory(dict))
+
+    def __call__(self, settings):
+        """Returns password of settings"""
+
+        primed_key_id = settings.Algorithm, settings.UseLeet, settings.LeetLvl
+        try:
+            primed_key = self._primed_keys[primed_key_id]
+        except KeyError:
+            primed_key = get_primed_key(settings.Algorithm, self.master_pass,
+                                        settings.UseLeet, settings.LeetLvl)
+            self._primed_keys[primed_key_id] = primed_key
+
+        return generatepassword(
+            settings.Algorithm, self.master_pass,
+            get_settings_url(settings) + settings.Username +
+            settings.Modifier,
+            settings.Length, settings.CharacterSet, prefix=settings.Prefix,
+            suffix=settings.Suffix, use_leet=settings.UseLeet,
+            leet_level=settings.LeetLvl, cost=settings.Cost,
+            primed_key=primed_key)
+
+
+# Derivers of a worker process, set by _init_worker
+_WORKER_DERIVERS = None
+
+
+def _init_worker(old_master_pass, new_master_pass):
+    """Pool initializer: creates the derivers of the worker process"""
+
+    global _WORKER_DERIVERS
+    _WORKER_DERIVERS = KeyDeriver(old_master_pass), \
+        KeyDeriver(new_master_pass)
+
+
+def _derive_pairs(chunk, derivers=None):
+    """Returns list of (old, new) passwords for a list of PwmSettings"""
+
+    old_deriver, new_deriver = derivers or _WORKER_DERIVERS
+    return [(old_deriver(settings), new_deriver(settings))
+            for settings in chunk]
+
+
+def get_rotation_fingerprint(settings_list):
+    """Returns hex digest that identifies the profiles of settings_list
+
+    The fingerprint covers names, order and all fields except MasterPass.
+    Master passwords are never stored in a checkpoint.
+
+    """
+
+    fingerprint = hashlib.sha256()
+    for name, pwm in settings_list.items():
+        record = attr.asdict(pwm, filter=lambda field, _:
+                             field.name != "MasterPass")
+        fingerprint.update(json.dumps([name, record],
+                                      sort_keys=True).encode("utf-8"))
+    return fingerprint.hexdigest()
+
+
+def load_checkpoint(filepath, fingerprint):
+    """Returns number of finished profiles from a checkpoint file
+
+    Returns 0 if the file is missing, unreadable or belongs to different
+    profiles.
+
+    """
+
+    try:
+        with open(filepath) as infile:
+            checkpoint = json.load(infile)
+    except (IOError, OSError, ValueError):
+        return 0
+
+    if checkpoint.get("version") != CHECKPOINT_VERSION or \
+       checkpoint.get("fingerprint") != fingerprint:
+        return 0
+    return checkpoint.get("done", 0)
+
+
+def save_checkpoint(filepath, fingerprint, done):
+    """Atomically writes a checkpoint file"""
+
+    tmp_filepath = filepath + ".tmp"
+    with open(tmp_filepath, "w") as outfile:
+        json.dump({"version": CHECKPOINT_VERSION, "fingerprint": fingerprint,
+                   "done": done}, outfile)
+    os.replace(tmp_filepath, filepath)
+
+
+def rotate_passwords(settings_list, old_master_pass, new_master_pass, sink,
+                     workers=None, checkpoint=None, chunk_size=256):
+    """Writes the (old, new) password pair of each profile into sink
+
+    Returns the number of profiles that have been derived in this call.
+
+    Records are written in profile order with the values of
+    ROTATION_FIELDS. After each chunk, the sink is flushed and the
+    checkpoint is updated. If the checkpoint belongs to the same profiles,
+    the profiles that it records as done are skipped. Open the sink in
+    append mode when resuming.
+
+    Parameters
+    ----------
+
+    * settings_list: PwmSettingsList
+    \tProfiles to rotate
+    * old_master_pass: String
+    \tCurrent master password
+    * new_master_pass: String
+    \tNew master password
+    * sink: pwmsink.OutputSink
+    \tDestination, e. g. open_sink("csv", path, fields=ROTATION_FIELDS)
+    * workers: Integer (default: number of CPUs)
+    \tNumber of processes
+    * checkpoint: String (default: None)
+    \tPath of the checkpoint file, None for no checkpointing
+    * chunk_size: Integer (default: 256)
+    \tNumber of profiles per worker task and checkpoint
+
+    """
+
+    items = list(settings_list.items())
+    fingerprint = None
+    start = 0
+    if checkpoint is not None:
+        fingerprint = get_rotation_fingerprint(settings_list)
+        start = load_checkpoint(checkpoint, fingerprint)
+
+    chunks = [items[i:i + chunk_size]
+              for i in range(start, len(items), chunk_size)]
+    settings_chunks = ([pwm for _, pwm in chunk] for chunk in chunks)
+
+    if workers is None:
+        workers = cpu_count()
+
+    pool = None
+    if workers > 1 and len(chunks) > 1:
+        pool = Pool(min(workers, len(chunks)), _init_worker,
+                    (old_master_pass, new_master_pass))
+        results = pool.imap(_derive_pairs, settings_chunks)
+    else:
+        derivers = KeyDeriver(old_master_pass), KeyDeriver(new_master_pass)
+        results = (_derive_pairs(chunk, derivers)
+                   for chunk in settings_chunks)
+
+    done = start
+    try:
+        for chunk, pairs in zip(chunks, results):
+            for (name, pwm), (old, new) in zip(chunk, pairs):
+                sink.write(pwm, Name=name, OldPassword=old, NewPassword=new)
+            sink.flush()
+            done += len(chunk)
+            if checkpoint is not None:
+                save_checkpoint(checkpoint, fingerprint, done)
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+    return done - start
@@ -0,0 +1,400 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+PasswordMaker - Output sinks
+============================
+
+Create and manage passwords.
+
+
+Copyright (C):
+
+    2005      Eric H. Jung, Miquel Burns and LeahScape, Inc.
+              <http://passwordmaker.org>
+              <grimholtz@yahoo.com>
+    2005-2007 Pedro Gimeno Fortea and Miquel Matthew 'Fire' Burns
+              <http://www.formauri.es/personal/pgimeno/>
+              <miquelfire@gmail.com>
+    2010      Aurelien Bompard
+              <http://aurelien.bompard.org>
+    2012      Richard Beales
+              <rich@richbeales.net>
+    2014      Richard Beales, Laurent Bachelier and Christoph Sarnowski
+              <rich@richbeales.net>
+    2018      Martin Manns
+              <mmanns@gmx.net>
+
+    This file is part of PasswordMaker.
+
+    PasswordMaker is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Foobar is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with Foobar.  If not, see <https://www.gnu.org/licenses/>.
+
+Streaming output of bulk derivations. A sink formats one record per
+password and writes them in buffered chunks, so that memory stays constant
+regardless of the number of records. Sinks exist for JSON lines, CSV,
+fixed-width records and tab separated text. For audit runs, passwords may
+be redacted or replaced by a hash.
+
+"""
+
+import csv
+import hashlib
+import io
+import json
+import os
+import sys
+from collections import OrderedDict
+from timeit import default_timer
+
+import attr
+
+from pwmlib import PwmSettings, igeneratepasswordsfrom
+
+SINK_FIELDS = ("URL", "Username", "Modifier", "Algorithm", "Length",
+               "Password")
+# Fields that are not taken from PwmSettings but passed to OutputSink.write
+PASSWORD_FIELDS = ("Password", "OldPassword", "NewPassword")
+EXTRA_FIELDS = ("Name",) + PASSWORD_FIELDS
+REDACT_OPTIONS = ("none", "redact", "hash")
+REDACTED = "********"
+
+# Field widths of fixed-width records
+FIXED_WIDTHS = {
+    "URL": 64,
+    "Username": 32,
+    "Modifier": 16,
+    "Algorithm": 12,
+    "Length": 4,
+    "CharacterSet": 96,
+    "Prefix": 16,
+    "Suffix": 16,
+    "UseLeet": 6,
+    "LeetLvl": 2,
+    "URLPatterns": 64,
+    "Cost": 2,
+    "URLParts": 40,
+    "Name": 64,
+    "Password": 128,
+    "OldPassword": 128,
+    "NewPassword": 128,
+}
+
+
+def _check_fields(instance, attribute, value):
+    """Validator for sink fields: PwmSettings fields or EXTRA_FIELDS"""
+
+    names = [field.name for field in attr.fields(PwmSettings)]
+    for name in value:
+        if name == "MasterPass":
+            raise ValueError("MasterPass must not be written to a sink")
+        if name not in EXTRA_FIELDS and name not in names:
+            raise ValueError("Unknown field {}".format(name))
+
+
+@attr.s
+class OutputSink(object):
+    """Base class of buffered streaming sinks for password records
+
+    Records are formatted into an in-memory buffer. The buffer is written to
+    fileobj when it exceeds buffer_size characters and, together with a
+    flush of fileobj, when flush_interval seconds have passed since the
+    last flush. Use as context manager or call close.
+
+    Parameters
+    ----------
+
+    * fileobj: File-like object
+    \tText stream, e. g. an open file, sys.stdout or a pipe
+    * fields: Sequence of String (default: SINK_FIELDS)
+    \tPwmSettings field names and EXTRA_FIELDS in output order
+    * redact: String (default: "none")
+    \tOne of REDACT_OPTIONS. "redact" replaces PASSWORD_FIELDS with REDACTED,
+    \t"hash" with the hex SHA-256 of the password.
+    * buffer_size: Integer (default: 65536)
+    \tNumber of characters that are buffered before writing
+    * flush_interval: Float (default: 1.0)
+    \tSeconds between flushes of fileobj, None for flushing only on close
+    * close_fileobj: Bool (default: False)
+    \tClose fileobj on close
+    * header: Bool (default: True)
+    \tWrite a header if the format has one, False for appending
+
+    """
+
+    fileobj = attr.ib()
+    fields = attr.ib(default=SINK_FIELDS, converter=tuple,
+                     validator=_check_fields)
+    redact = attr.ib(default="none", validator=attr.validators.in_(
+        REDACT_OPTIONS))
+    buffer_size = attr.ib(default=65536)
+    flush_interval = attr.ib(default=1.0)
+    close_fileobj = attr.ib(default=False)
+    header = attr.ib(default=True)
+    count = attr.ib(init=False, default=0)
+    _buffer = attr.ib(init=False, repr=False, factory=io.StringIO)
+    _last_flush = attr.ib(init=False, repr=False, factory=default_timer)
+
+    def __attrs_post_init__(self):
+        if self.header:
+            self.write_header()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write_header(self):
+        """Writes a header into the buffer, no header by default"""
+
+    def format_values(self, values):
+        """Writes one record into the buffer, tab separated values by default
+
+        Parameters
+        ----------
+
+        * values: List
+        \tValues in the order of self.fields
+
+        """
+
+        self._buffer.write("\t".join(str(value) for value in values))
+        self._buffer.write("\n")
+
+    def _get_password(self, password):
+        """Returns password as it is written"""
+
+        if self.redact == "redact":
+            return REDACTED
+        elif self.redact == "hash":
+            return hashlib.sha256(password.encode("utf-8")).hexdigest()
+        return password
+
+    def write(self, settings, password="", **extra):
+        """Writes the record of one derivation
+
+        Parameters
+        ----------
+
+        * settings: PwmSettings
+        \tSettings the password has been derived from
+        * password: String (default: "")
+        \tDerived password
+        * extra: Keyword arguments
+        \tValues of EXTRA_FIELDS, e. g. Name, OldPassword and NewPassword
+
+        """
+
+        extra["Password"] = password
+
+        values = []
+        for name in self.fields:
+            if name in PASSWORD_FIELDS:
+                values.append(self._get_password(extra.get(name, "")))
+            elif name in EXTRA_FIELDS:
+                values.append(extra.get(name, ""))
+            else:
+                values.append(getattr(settings, name))
+        self.format_values(values)
+        self.count += 1
+
+        if self._buffer.tell() >= self.buffer_size:
+            self._write_buffer()
+
+        if self.flush_interval is not None and \
+           default_timer() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def write_many(self, items):
+        """Writes records from an iterable of (settings, password) tuples
+
+        Returns the number of written records.
+
+        """
+
+        count = self.count
+        for settings, password in items:
+            self.write(settings, password)
+        return self.count - count
+
+    def _write_buffer(self):
+        """Writes the buffer to fileobj and empties it"""
+
+        data = self._buffer.getvalue()
+        if data:
+            self.fileobj.write(data)
+            self._buffer.seek(0)
+            self._buffer.truncate()
+
+    def flush(self):
+        """Writes all buffered records and flushes fileobj"""
+
+        self._write_buffer()
+        self.fileobj.flush()
+        self._last_flush = default_timer()
+
+    def close(self):
+        """Flushes and, if close_fileobj is set, closes fileobj"""
+
+        if self._buffer.closed:
+            return
+        self.flush()
+        self._buffer.close()
+        if self.close_fileobj:
+            self.fileobj.close()
+
+
+@attr.s
+class JsonLinesSink(OutputSink):
+    """Writes one JSON object per line"""
+
+    def format_values(self, values):
+        record = OrderedDict(zip(self.fields, values))
+        self._buffer.write(json.dumps(record))
+        self._buffer.write("\n")
+
+
+@attr.s
+class CsvSink(OutputSink):
+    """Writes CSV rows with a header row"""
+
+    _writer = attr.ib(init=False, repr=False, default=attr.Factory(
+        lambda self: csv.writer(self._buffer, lineterminator="\n"),
+        takes_self=True))
+
+    def write_header(self):
+        self._writer.writerow(self.fields)
+
+    def format_values(self, values):
+        self._writer.writerow(values)
+
+
+@attr.s
+class FixedWidthSink(OutputSink):
+    """Writes left-aligned, space-padded records of constant width
+
+    Field widths are taken from FIXED_WIDTHS. Values that do not fit raise
+    a ValueError instead of being truncated.
+
+    """
+
+    def format_values(self, values):
+        for name, value in zip(self.fields, values):
+            value = str(value)
+            width = FIXED_WIDTHS[name]
+            if len(value) > width:
+                msg = "{} exceeds the field width {} of {}"
+                raise ValueError(msg.format(value, width, name))
+            self._buffer.write(value.ljust(width))
+        self._buffer.write("\n")
+
+
+@attr.s
+class TextSink(OutputSink):
+    """Writes tab separated values without header, e. g. plain passwords"""
+
+
+SINK_FORMATS = OrderedDict([
+    ("jsonl", JsonLinesSink),
+    ("csv", CsvSink),
+    ("fixed", FixedWidthSink),
+    ("text", TextSink),
+])
+
+
+def open_sink(sink_format, filepath="-", append=False, **kwargs):
+    """Returns an OutputSink for sink_format that writes to filepath
+
+    Parameters
+    ----------
+
+    * sink_format: String
+    \tKey of SINK_FORMATS
+    * filepath: String (default: "-")
+    \tOutput file, "-" for stdout, e. g. for piping into another program
+    * append: Bool (default: False)
+    \tAppend to filepath. A header is only written into an empty file.
+    * kwargs: Keyword arguments
+    \tPassed on to the sink, e. g. fields, redact or flush_interval
+
+    """
+
+    try:
+        sink_class = SINK_FORMATS[sink_format]
+    except KeyError:
+        msg = "Unknown sink format {}. Use one of {}."
+        raise ValueError(msg.format(sink_format, ", ".join(SINK_FORMATS)))
+
+    if filepath == "-":
+        return sink_class(sys.stdout, **kwargs)
+
+    if append:
+        kwargs["header"] = not os.path.exists(filepath) or \
+            not os.path.getsize(filepath)
+
+    fileobj = io.open(filepath, "a" if append else "w", encoding="utf-8",
+                      newline="")
+    return sink_class(fileobj, close_fileobj=True, **kwargs)
+
+
+def write_passwords(settings_iter, sink, workers=None, chunk_size=1024):
+    """Derives a password for each PwmSettings and streams it into sink
+
+    Returns the number of written records.
+
+    Parameters
+    ----------
+
+    * settings_iter: Iterable of PwmSettings
+    \tSettings instances, consumed lazily
+    * sink: OutputSink
+    \tDestination of the records
+    * workers: Integer (default: number of CPUs)
+    \tNumber of threads
+    * chunk_size: Integer (default: 1024)
+    \tNumber of settings that are derived at once
+
+    """
+
+    return sink.write_many(igeneratepasswordsfrom(settings_iter, workers,
+                                                  chunk_size))
+
+
+def iter_settings_jsonl(lines, base=None):
+    """Yields PwmSettings from JSON lines, e. g. from an open file
+
+    Each non-empty line is a JSON object of PwmSettings fields that override
+    the fields of base. Lines are parsed lazily.
+
+    Parameters
+    ----------
+
+    * lines: Iterable of String
+    \tJSON lines
+    * base: PwmSettings (default: PwmSettings())
+    \tSettings that provide values for missing fields, e. g. MasterPass
+
+    """
+
+    if base is None:
+        base = PwmSettings()
+
+    for line_no, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            settings = attr.evolve(base, **json.loads(line))
+        except (ValueError, TypeError) as err:
+            raise ValueError("Line {}: {}".format(line_no, err))
+        yield settings
@@ -0,0 +1,406 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+PasswordMaker - URL normalisation
+=================================
+
+Create and manage passwords.
+
+
+Copyright (C):
+
+    2005      Eric H. Jung, Miquel Burns and LeahScape, Inc.
+              <http://passwordmaker.org>
+              <grimholtz@yahoo.com>
+    2005-2007 Pedro Gimeno Fortea and Miquel Matthew 'Fire' Burns
+              <http://www.formauri.es/personal/pgimeno/>
+              <miquelfire@gmail.com>
+    2010      Aurelien Bompard
+              <http://aurelien.bompard.org>
+    2012      Richard Beales
+              <rich@richbeales.net>
+    2014      Richard Beales, Laurent Bachelier and Christoph Sarnowski
+              <rich@richbeales.net>
+    2018      Martin Manns
+              <mmanns@gmx.net>
+
+    This file is part of PasswordMaker.
+
+    PasswordMaker is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Foobar is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with Foobar.  If not, see <https://www.gnu.org/licenses/>.
+
+Reduces URLs to the parts that enter the password generation, as in the
+PasswordMaker browser extension. By default, only the registrable domain is
+used, e.g. "https://www.example.co.uk/login?x=1" becomes "example.co.uk".
+
+Registrable domains are found via a public suffix trie that is built from
+public_suffix_list.dat, which is shipped with this module.
+
+ProfileIndex resolves the PwmSettings profile for a URL from the profiles'
+URLPatterns.
+
+"""
+
+import os
+import re
+
+import attr
+
+from pwmlib import LRUCache
+
+PUBLIC_SUFFIX_LIST_PATH = os.path.join(os.path.dirname(os.path.abspath(
+    __file__)), "public_suffix_list.dat")
+
+# Trie node keys that mark the end of a rule and of an exception rule.
+# Domain labels never are None or False.
+
+_RULE = None
+_EXCEPTION = False
+
+# Back references in profile regexes, which prevent a regex union
+
+_BACKREF_RE = re.compile(r"\\[1-9]|\(\?P=")
+
+# scheme://authority remainder
+
+_URL_RE = re.compile(r"^(?:([A-Za-z][A-Za-z0-9+.\-]*)://)?([^/?#]*)(.*)$",
+                     re.DOTALL)
+
+
+class SuffixTrie(object):
+    """Trie of public suffix rules keyed by reversed domain labels
+
+    Rules follow the Public Suffix List format: "co.uk" is a normal rule,
+    "*.ck" a wildcard rule and "!www.ck" an exception rule.
+
+    """
+
+    def __init__(self, rules=()):
+        self.root = {}
+        for rule in rules:
+            self.add_rule(rule)
+
+    @classmethod
+    def load(cls, filepath=PUBLIC_SUFFIX_LIST_PATH):
+        """Returns SuffixTrie from a file in Public Suffix List format"""
+
+        trie = cls()
+        with open(filepath) as infile:
+            for line in infile:
+                rule = line.split()[0] if line.strip() else ""
+                if rule and not rule.startswith("//"):
+                    trie.add_rule(rule)
+        return trie
+
+    def add_rule(self, rule):
+        """Adds one public suffix rule"""
+
+        is_exception = rule.startswith("!")
+        if is_exception:
+            rule = rule[1:]
+
+        node = self.root
+        for label in reversed(rule.lower().split(".")):
+            node = node.setdefault(label, {})
+
+        node[_EXCEPTION if is_exception else _RULE] = True
+
+    def suffix_length(self, labels):
+        """Returns the number of labels of the public suffix
+
+        Parameters
+        ----------
+
+        * labels: List of strings
+        \tDomain labels in reversed order, i.e. top level domain first
+
+        """
+
+        # Unlisted top level domains are public suffixes (implicit "*" rule)
+        suffix_length = 1
+
+        # A label may match a literal and a wildcard rule branch. Both are
+        # followed, the longest matching rule wins.
+        nodes = [self.root]
+        for i, label in enumerate(labels):
+            children = []
+            for node in nodes:
+                for key in (label, "*"):
+                    child = node.get(key)
+                    if child is None:
+                        continue
+                    if child.get(_EXCEPTION):
+                        # The exception's parent is the public suffix
+                        return i
+                    if child.get(_RULE):
+                        suffix_length = i + 1
+                    children.append(child)
+            if not children:
+                break
+            nodes = children
+
+        return suffix_length
+
+    def split_host(self, host):
+        """Returns tuple (subdomains, registrable domain) of host
+
+        Hosts that are public suffixes or IP addresses are returned as
+        registrable domain without subdomains.
+
+        """
+
+        if not host or host.startswith("[") or \
+           host.replace(".", "").isdigit():
+            return "", host
+
+        labels = host.split(".")
+        labels.reverse()
+        domain_length = self.suffix_length(labels) + 1
+        if domain_length >= len(labels):
+            return "", host
+
+        labels.reverse()
+        split_idx = len(labels) - domain_length
+        return ".".join(labels[:split_idx]), ".".join(labels[split_idx:])
+
+
+_DEFAULT_SUFFIX_TRIE = []
+
+
+def get_default_suffix_trie():
+    """Returns the SuffixTrie of the shipped list, which is loaded once"""
+
+    if not _DEFAULT_SUFFIX_TRIE:
+        _DEFAULT_SUFFIX_TRIE.append(SuffixTrie.load())
+    return _DEFAULT_SUFFIX_TRIE[0]
+
+
+@attr.s
+class UrlNormalizer(object):
+    """Reduces URLs to the components that are used for passwords
+
+    The components are concatenated in the order protocol, subdomains,
+    domain, path like in the PasswordMaker browser extension.
+    Host splits are memoised in a bounded cache, so that normalising many
+    URLs of the same hosts only parses each host once.
+
+    Parameters
+    ----------
+
+    * use_protocol: Bool (default: False)
+    \tKeep scheme, e.g. "https://"
+    * use_subdomains: Bool (default: False)
+    \tKeep subdomains, e.g. "www"
+    * use_domain: Bool (default: True)
+    \tKeep registrable domain, e.g. "example.co.uk"
+    * use_path: Bool (default: False)
+    \tKeep port, path, query and fragment
+    * suffix_trie: SuffixTrie (default: shipped public suffix list)
+    * cache_size: Integer (default: 65536)
+    \tMaximum number of memoised hosts
+
+    """
+
+    use_protocol = attr.ib(default=False)
+    use_subdomains = attr.ib(default=False)
+    use_domain = attr.ib(default=True)
+    use_path = attr.ib(default=False)
+    suffix_trie = attr.ib(default=attr.Factory(get_default_suffix_trie),
+                          repr=False)
+    cache_size = attr.ib(default=65536)
+    _host_cache = attr.ib(init=False, repr=False)
+
+    @_host_cache.default
+    def _host_cache_default(self):
+        return LRUCache(self.cache_size)
+
+    def split_url(self, url):
+        """Returns tuple (protocol, subdomains, domain, path) of url"""
+
+        scheme, authority, path = _URL_RE.match(url.strip()).groups()
+        protocol = scheme.lower() + "://" if scheme else ""
+
+        # Strip user info and port
+        host = authority.rpartition("@")[2]
+        if host.startswith("["):
+            host, _, port = host.partition("]")
+            host += "]"
+        else:
+            host, _, port = host.partition(":")
+        if port.startswith(":"):
+            port = port[1:]
+        if port:
+            path = ":" + port + path
+
+        host = host.lower().rstrip(".")
+
+        split = self._host_cache.get(host)
+        if split is None:
+            split = self.suffix_trie.split_host(host)
+            self._host_cache[host] = split
+
+        return protocol, split[0], split[1], path
+
+    def normalize(self, url):
+        """Returns url reduced to the configured components"""
+
+        protocol, subdomains, domain, path = self.split_url(url)
+
+        host_parts = []
+        if self.use_subdomains and subdomains:
+            host_parts.append(subdomains)
+        if self.use_domain and domain:
+            host_parts.append(domain)
+
+        components = []
+        if self.use_protocol:
+            components.append(protocol)
+        components.append(".".join(host_parts))
+        if self.use_path:
+            components.append(path)
+
+        return "".join(components)
+
+    def normalize_many(self, urls):
+        """Generator that normalises each url in the iterable urls"""
+
+        normalize = self.normalize
+        for url in urls:
+            yield normalize(url)
+
+
+_DEFAULT_NORMALIZER = []
+
+
+def normalize_url(url):
+    """Returns the registrable domain of url
+
+    Uses a shared default UrlNormalizer.
+
+    >>> normalize_url("https://www.example.co.uk/login?next=/")
+    'example.co.uk'
+
+    """
+
+    if not _DEFAULT_NORMALIZER:
+        _DEFAULT_NORMALIZER.append(UrlNormalizer())
+    return _DEFAULT_NORMALIZER[0].normalize(url)
+
+
+@attr.s
+class ProfileIndex(object):
+    """Resolves the profile name for a URL from profile URL patterns
+
+    Patterns are taken from PwmSettings.URLPatterns and may be
+
+    * "example.com": Exact host, looked up in a dict
+    * "*.example.com": example.com and all its subdomains, looked up in a
+      trie of reversed host labels. The longest matching suffix wins.
+    * "/regex/": Regular expression that is searched in the full URL.
+      Regular expressions are only tried if no host pattern matches. Misses
+      are filtered by a union of all regular expressions.
+
+    If several profiles share a pattern, the first added profile wins.
+
+    Parameters
+    ----------
+
+    * normalizer: UrlNormalizer (default: hosts with subdomains)
+    \tExtracts the host from URLs
+
+    """
+
+    normalizer = attr.ib(default=attr.Factory(
+        lambda: UrlNormalizer(use_subdomains=True)))
+    _exact = attr.ib(default=attr.Factory(dict), init=False, repr=False)
+    _suffixes = attr.ib(default=attr.Factory(dict), init=False, repr=False)
+    _regexes = attr.ib(default=attr.Factory(list), init=False, repr=False)
+    _regex_union = attr.ib(default=None, init=False, repr=False)
+
+    @classmethod
+    def from_settings_list(cls, settings_list, **kwargs):
+        """Returns ProfileIndex of all profiles in a PwmSettingsList"""
+
+        index = cls(**kwargs)
+        for name, settings in settings_list.items():
+            index.add(name, settings.URLPatterns)
+        return index
+
+    def add(self, name, patterns):
+        """Adds the space separated patterns of profile name"""
+
+        for pattern in patterns.split():
+            if len(pattern) > 2 and pattern[0] == pattern[-1] == "/":
+                self._regexes.append((re.compile(pattern[1:-1]), name))
+                self._regex_union = None
+
+            elif pattern.startswith("*."):
+                node = self._suffixes
+                for label in reversed(pattern[2:].lower().split(".")):
+                    node = node.setdefault(label, {})
+                node.setdefault(_RULE, name)
+
+            else:
+                self._exact.setdefault(pattern.lower(), name)
+
+    def resolve(self, url):
+        """Returns the name of the profile for url or None"""
+
+        host = self.normalizer.normalize(url)
+
+        name = self._exact.get(host)
+        if name is not None:
+            return name
+
+        node = self._suffixes
+        for label in reversed(host.split(".")):
+            node = node.get(label)
+            if node is None:
+                break
+            name = node.get(_RULE, name)
+        if name is not None:
+            return name
+
+        if not self._regexes:
+            return None
+
+        if self._regex_union is None:
+            self._regex_union = self._compile_regex_union()
+        if self._regex_union is not False and \
+           not self._regex_union.search(url):
+            return None
+
+        for regex, name in self._regexes:
+            if regex.search(url):
+                return name
+
+        return None
+
+    def _compile_regex_union(self):
+        """Returns a regex that matches if any profile regex matches
+
+        Returns False if the regexes cannot be combined, e.g. because of
+        numbered back references.
+
+        """
+
+        patterns = [regex.pattern for regex, _ in self._regexes]
+        if any(_BACKREF_RE.search(pattern) for pattern in patterns):
+            return False
+
+        union = "|".join("(?:{})".format(pattern) for pattern in patterns)
+        try:
+            return re.compile(union)
+        except (re.error, OverflowError, RecursionError):
+            return False
@@ -81,7 +81,7 @@ setup(
                      'password.',
     license='GPL v3 :: GNU General Public License',
     keywords=['PasswordMaker'],
-    requires=['attrs (>=17.0)'],
+    requires=['attrs (>=19.2)'],
     packages=['.'],
     scripts=['passwordmaker.py'],
     cmdclass={'test': PyTest},
@@ -90,6 +90,7 @@ setup(
             '*.py',
             'COPYING',
             'COPYING.LESSER',
+            'public_suffix_list.dat',
             'README.md',
             'todo.txt',
         ],
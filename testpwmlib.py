@@ -49,8 +49,61 @@ It can be used both on the command-line and with a GUI based on TKinter.
 """
 
 from pwmlib import generatepassword, leet, ALGORITHMS, FULL_CHARSET
+from pwmlib import profile, _PROFILE_HOOKS
+from pwmlib import PwmHashUtils, rstr2any_batch
+from pwmlib import CompiledCharset, compile_charset, CHARSET_PRESETS
+from pwmlib import LRUCache, PwmSettings, generatepasswordfrom
+from pwmlib import PwmSettingsList, PrefixIndex
+from pwmlib import STRETCHING_ALGORITHMS, STRETCHING_ALGORITHM_2_HASH_FUNC
+from pwmlib import calibrate_cost
+from pwmlib import generatepasswordsfrom
+from pwmlib import HASH_BACKENDS, select_backend, get_selected_backends
+from pwmlib import load_backend_cache, save_backend_cache
+from pwmcalibrate import calibrate, format_result
+from pwmlib import _generatepassword_default, _DIGEST_FUNCS
+from pwmlib import igeneratepasswordsfrom
+from pwmlib import DerivationContext
+from pwmarchive import PwmArchive, export_archive, import_archive
+from pwmurl import SuffixTrie, UrlNormalizer, ProfileIndex, normalize_url
+from pwmfuzz import FuzzCase, generate_case, reference_generatepassword
+from pwmfuzz import candidate_generatepassword, run_fuzz, shrink
+from pwmlib import get_primed_key, LEET_OPTIONS
+from pwmlib import SecretKey, _iter_round_keys
+from pwmlib import LeetKeyCache, leet_buffer
+from pwmlib import list_profiles, load_profile
+from pwmlib import complete_profiles, resolve_profile, load_profile_index
+from pwmlib import PROFILE_INDEX_FILENAME
+from pwmlib import generatepasswords_all, find_matching_algorithm
+from pwmbulk import ProfileImportError, export_profiles, import_profiles
+from pwmbulk import iter_records_rdf
+from pwmrecover import SearchSpace, get_search_tasks, recover_settings
+from pwmrotate import ROTATION_FIELDS, rotate_passwords
+from pwmsink import CsvSink, FixedWidthSink, JsonLinesSink, OutputSink
+from pwmsink import REDACTED
+from pwmsink import iter_settings_jsonl, open_sink, write_passwords
+import pwmlib
+import contextlib
+import csv
+import hashlib
+import io
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import tracemalloc
 import unittest
 
+import attr
+
+try:
+    import passwordmaker
+except (ImportError, AttributeError):
+    passwordmaker = None  # Tkinter is missing
+
 
 class TestGeneratepassword(unittest.TestCase):
     """Unit test class for generatepassword"""
@@ -265,5 +318,1667 @@ class TestLeet(unittest.TestCase):
         self.assertEqual(res, r)
 
 
+class TestProfile(unittest.TestCase):
+    """Unit test class for the instrumentation hooks"""
+
+    def test_profile_counters(self):
+        with profile() as prof:
+            res = generatepassword("md5", "asdf", "passwordmaker.org", 64,
+                                   FULL_CHARSET, use_leet="both",
+                                   leet_level=1)
+        self.assertEqual(len(res), 64)
+        self.assertEqual(prof.counters["generatepassword"], 1)
+        self.assertEqual(prof.counters["leet"], 3)
+        self.assertEqual(prof.counters["hash"], prof.counters["rstr2any"])
+        self.assertTrue(prof.counters["hash"] > 1)
+
+    def test_profile_hook_removed(self):
+        with profile():
+            self.assertEqual(len(_PROFILE_HOOKS), 1)
+        self.assertEqual(len(_PROFILE_HOOKS), 0)
+
+    def test_profile_unchanged_password(self):
+        with profile():
+            res = generatepassword("md5", "asdf", "passwordmaker.org", 19,
+                                   FULL_CHARSET)
+        self.assertEqual(res, 'FRRHm)k+UyQiY~%Dj;h')
+
+
+class TestRstr2anyBatch(unittest.TestCase):
+    """Unit test class for rstr2any_batch"""
+
+    charsets = [FULL_CHARSET, "01", "abc", "0123456789abcdef"]
+
+    def _digests(self, algorithm="md5", n_digests=200):
+        digests = [getattr(hashlib, algorithm)(str(i).encode()).digest()
+                   for i in range(n_digests)]
+        return digests + [b"\0" * len(digests[0])]
+
+    def _check(self, digests):
+        for charset in self.charsets:
+            hash_utils = PwmHashUtils("md5", charset)
+            res = rstr2any_batch(digests, charset)
+            r = [hash_utils.rstr2any(digest) for digest in digests]
+            self.assertEqual(res, r)
+
+    def test_rstr2any_batch_md5(self):
+        self._check(self._digests("md5"))
+
+    def test_rstr2any_batch_sha256(self):
+        self._check(self._digests("sha256"))
+
+    def test_rstr2any_batch_small(self):
+        self._check(self._digests("md5", n_digests=1))
+
+    def test_rstr2any_batch_fallback(self):
+        has_numpy = pwmlib.HAS_NUMPY
+        pwmlib.HAS_NUMPY = False
+        try:
+            self._check(self._digests("sha1"))
+        finally:
+            pwmlib.HAS_NUMPY = has_numpy
+
+    @unittest.skipUnless(pwmlib.HAS_NUMPY, "NumPy unavailable")
+    def test_rstr2any_batch_ndarray(self):
+        import numpy
+
+        digests = self._digests("md5")
+        array = numpy.array([bytearray(d) for d in digests],
+                            dtype=numpy.uint8)
+        self.assertEqual(rstr2any_batch(array, FULL_CHARSET),
+                         rstr2any_batch(digests, FULL_CHARSET))
+
+    def test_rstr2any_batch_short_charset(self):
+        self.assertRaises(ValueError, rstr2any_batch, [b"ab"], "a")
+
+
+class TestRstr2anyHead(unittest.TestCase):
+    """Unit test class for rstr2any with max_digits"""
+
+    charsets = [FULL_CHARSET, "01", "abc", "0123456789abcdef"]
+
+    def test_rstr2any_head(self):
+        rand = random.Random(38)
+        digests = [b"", b"\0" * 16, b"\0" * 15 + b"\1", b"\xff" * 32]
+        digests += [bytes(bytearray(rand.randrange(256) for _ in range(size)))
+                    for size in (16, 20, 32, 64) for _ in range(50)]
+        for charset in self.charsets:
+            hash_utils = PwmHashUtils("md5", charset)
+            for digest in digests:
+                for trim in (True, False):
+                    full = hash_utils.rstr2any(digest, trim)
+                    for max_digits in (0, 1, 7, 20, len(full), 200):
+                        self.assertEqual(
+                            hash_utils.rstr2any(digest, trim, max_digits),
+                            full[:max_digits])
+
+    def test_generatepassword_suffix(self):
+        # A suffix longer than the password slices from the end of the
+        # fully converted first round
+        hash_utils = PwmHashUtils("hmac-md5", FULL_CHARSET)
+        full = leet(3, hash_utils.any_hmac_md5(b"asdf", b"x"))
+        self.assertEqual(generatepassword("hmac-md5", "asdf", "x", 2,
+                                          FULL_CHARSET, suffix="suf",
+                                          use_leet="after", leet_level=3),
+                         (full[:-1] + "suf")[:2])
+
+
+class TestCompiledCharset(unittest.TestCase):
+    """Unit test class for CompiledCharset and compile_charset"""
+
+    def test_compile_charset_cached(self):
+        charset = "abcdefgh"
+        self.assertTrue(compile_charset(charset) is compile_charset(charset))
+
+    def test_compile_charset_presets(self):
+        for charset in CHARSET_PRESETS.values():
+            self.assertTrue(isinstance(compile_charset(charset),
+                                       CompiledCharset))
+
+    def test_compiled_charset_attributes(self):
+        charset = compile_charset("0123456789abcdef")
+        self.assertEqual(charset.length, 16)
+        self.assertEqual(charset.bits_per_char, 4.0)
+        self.assertEqual(charset.digits_per_block(16), 32)
+        self.assertEqual(charset.table[10], "a")
+        self.assertEqual(charset, "0123456789abcdef")
+
+    def test_compiled_charset_too_short(self):
+        self.assertRaises(ValueError, compile_charset, "a")
+        self.assertRaises(ValueError, generatepassword, "md5", "asdf",
+                          "passwordmaker.org", 8, "a")
+
+    def test_compiled_charset_generatepassword(self):
+        res = generatepassword("md5", "asdf", "passwordmaker.org", 19,
+                               compile_charset(FULL_CHARSET))
+        self.assertEqual(res, 'FRRHm)k+UyQiY~%Dj;h')
+
+    def test_compiled_charset_settings(self):
+        settings = PwmSettings(URL="passwordmaker.org", MasterPass="asdf",
+                               Length=19,
+                               CharacterSet=compile_charset(FULL_CHARSET))
+        self.assertEqual(generatepasswordfrom(settings), 'FRRHm)k+UyQiY~%Dj;h')
+
+    def test_rstr2any_untrimmed(self):
+        hash_utils = PwmHashUtils("md5", "01")
+        res = hash_utils.rstr2any(b"\0" * 15 + b"\1", trim=False)
+        self.assertEqual(res, "0" * 127 + "1")
+
+    def test_lru_cache_eviction(self):
+        cache = LRUCache(2)
+        cache["a"] = 1
+        cache["b"] = 2
+        cache.get("a")
+        cache["c"] = 3
+        self.assertEqual(len(cache), 2)
+        self.assertTrue("a" in cache)
+        self.assertFalse("b" in cache)
+
+
+class TestUrlNormalizer(unittest.TestCase):
+    """Unit test class for pwmurl"""
+
+    def test_normalize_url(self):
+        urls = {
+            "https://www.example.co.uk/login?next=/": "example.co.uk",
+            "http://user:pw@a.b.github.io:8080/x": "b.github.io",
+            "passwordmaker.org": "passwordmaker.org",
+            "HTTP://WWW.PasswordMaker.ORG./": "passwordmaker.org",
+            "localhost:8000": "localhost",
+            "http://192.168.0.1/x": "192.168.0.1",
+            "http://[::1]:80/p": "[::1]",
+            "co.uk": "co.uk",
+        }
+        for url, domain in urls.items():
+            self.assertEqual(normalize_url(url), domain)
+
+    def test_normalize_components(self):
+        url = "https://mail.google.com:443/mail/u/0"
+        normalizer = UrlNormalizer(use_protocol=True, use_subdomains=True,
+                                   use_path=True)
+        self.assertEqual(normalizer.normalize(url), url)
+        normalizer = UrlNormalizer(use_subdomains=True)
+        self.assertEqual(normalizer.normalize(url), "mail.google.com")
+        normalizer = UrlNormalizer(use_protocol=True)
+        self.assertEqual(normalizer.normalize(url), "https://google.com")
+
+    def test_suffix_trie_wildcard_exception(self):
+        trie = SuffixTrie(["jp", "*.kawasaki.jp", "!city.kawasaki.jp"])
+        self.assertEqual(trie.split_host("a.b.x.kawasaki.jp"),
+                         ("a", "b.x.kawasaki.jp"))
+        self.assertEqual(trie.split_host("a.city.kawasaki.jp"),
+                         ("a", "city.kawasaki.jp"))
+
+        # The wildcard applies where a literal branch ends without a rule
+        trie = SuffixTrie(["*.foo", "a.b.foo"])
+        self.assertEqual(trie.split_host("y.x.b.foo"), ("y", "x.b.foo"))
+        self.assertEqual(trie.split_host("y.a.b.foo"), ("", "y.a.b.foo"))
+        self.assertEqual(trie.split_host("y.c.foo"), ("", "y.c.foo"))
+
+    def test_generatepasswordfrom(self):
+        url = "https://www.example.co.uk:8080/login"
+        self.assertEqual(
+            generatepasswordfrom(PwmSettings(URL=url, MasterPass="asdf",
+                                             URLParts="domain")),
+            generatepasswordfrom(PwmSettings(URL="example.co.uk",
+                                             MasterPass="asdf")))
+        self.assertEqual(
+            generatepasswordfrom(PwmSettings(URL=url, MasterPass="asdf",
+                                             URLParts="subdomains domain",
+                                             Username="me")),
+            generatepassword("md5", "asdf", "www.example.co.ukme", 8,
+                             FULL_CHARSET))
+        # Without URLParts, the URL is used as given
+        self.assertEqual(
+            generatepasswordfrom(PwmSettings(URL=url, MasterPass="asdf")),
+            generatepassword("md5", "asdf", url, 8, FULL_CHARSET))
+        self.assertRaises(ValueError, PwmSettings, URLParts="host")
+
+    def test_normalize_many(self):
+        urls = ["https://www.example.com/{}".format(i) for i in range(10)]
+        res = list(UrlNormalizer().normalize_many(urls))
+        self.assertEqual(res, ["example.com"] * 10)
+
+
+class TestProfileIndex(unittest.TestCase):
+    """Unit test class for pwmurl.ProfileIndex"""
+
+    def setUp(self):
+        self.index = ProfileIndex()
+        self.index.add("default", "")
+        self.index.add("google", "*.google.com")
+        self.index.add("mail", "mail.google.com /bank/")
+        self.index.add("com", "*.com")
+        self.index.add("google2", "*.google.com")
+
+    def test_resolve_exact(self):
+        self.assertEqual(self.index.resolve("https://mail.google.com/x"),
+                         "mail")
+
+    def test_resolve_suffix(self):
+        self.assertEqual(self.index.resolve("google.com"), "google")
+        self.assertEqual(self.index.resolve("http://www.google.com/"),
+                         "google")
+        self.assertEqual(self.index.resolve("example.com"), "com")
+
+    def test_resolve_regex(self):
+        self.assertEqual(self.index.resolve("http://mybank.de/bank/"),
+                         "mail")
+
+    def test_resolve_none(self):
+        self.assertEqual(self.index.resolve("example.org"), None)
+
+
+class TestPwmSettingsList(unittest.TestCase):
+    """Unit test class for PwmSettingsList"""
+
+    def setUp(self):
+        self.settings_list = PwmSettingsList()
+        for name in ("a", "b", "c"):
+            self.settings_list.add(name, PwmSettings(URL=name))
+
+    def test_defaults_not_shared(self):
+        settings_list = PwmSettingsList()
+        self.assertEqual(settings_list.pwm_names, ("default",))
+        self.assertFalse(settings_list.get_pwm_settings() is
+                         PwmSettingsList().get_pwm_settings())
+
+    def test_add(self):
+        self.assertEqual(self.settings_list.pwm_names,
+                         ("default", "a", "b", "c"))
+        self.assertEqual(self.settings_list["b"].URL, "b")
+        self.assertTrue("c" in self.settings_list)
+        self.assertRaises(ValueError, self.settings_list.add, "a")
+
+    def test_remove(self):
+        self.settings_list.current = "b"
+        self.assertEqual(self.settings_list.remove("b").URL, "b")
+        self.assertEqual(self.settings_list.pwm_names, ("default", "a", "c"))
+        self.assertEqual(self.settings_list.current, "default")
+        self.assertRaises(KeyError, self.settings_list.remove, "b")
+
+    def test_rename(self):
+        self.settings_list.current = "a"
+        self.settings_list.rename("a", "x")
+        self.assertEqual(self.settings_list.pwm_names,
+                         ("default", "x", "b", "c"))
+        self.assertEqual(self.settings_list.get_pwm_settings().URL, "a")
+        self.assertRaises(ValueError, self.settings_list.rename, "x", "b")
+
+    def test_list_accessors(self):
+        self.assertEqual([pwm.URL for pwm in self.settings_list.pwms],
+                         ["", "a", "b", "c"])
+        self.assertEqual(tuple(self.settings_list),
+                         self.settings_list.pwm_names)
+        with self.assertRaises(AttributeError):
+            self.settings_list.pwm_names.append("d")
+
+    def test_save_load(self):
+        directory = tempfile.mkdtemp()
+        try:
+            self.settings_list.save(directory)
+            self.settings_list.remove("c")
+            self.settings_list.save(directory)
+            self.assertEqual(sorted(os.listdir(directory)),
+                             ["pwm.a.setting", "pwm.b.setting",
+                              "pwm.default.setting", PROFILE_INDEX_FILENAME])
+
+            settings_list = PwmSettingsList(pwm_names=[], pwms=[])
+            settings_list.load(directory)
+            self.assertEqual(settings_list, self.settings_list)
+        finally:
+            shutil.rmtree(directory)
+
+    def test_reload(self):
+        directory = tempfile.mkdtemp()
+        try:
+            self.settings_list.save(directory)
+            settings_list = PwmSettingsList()
+            settings_list.load(directory)
+            self.assertFalse(settings_list.reload())
+
+            # External changes
+            PwmSettings(URL="changed", Length=12).save(
+                os.path.join(directory, "pwm.a.setting"))
+            PwmSettings(URL="d").save(os.path.join(directory,
+                                                   "pwm.d.setting"))
+            os.remove(os.path.join(directory, "pwm.b.setting"))
+            with open(os.path.join(directory, "pwm.e.setting"), "w") as f:
+                f.write("{")  # Partially written
+
+            changes = settings_list.reload()
+            self.assertEqual(changes.added, ["d"])
+            self.assertEqual(changes.changed, ["a"])
+            self.assertEqual(changes.removed, ["b"])
+            self.assertEqual(settings_list["a"].Length, 12)
+            self.assertEqual(settings_list.pwm_names,
+                             ("default", "a", "c", "d"))
+
+            PwmSettings(URL="e").save(os.path.join(directory,
+                                                   "pwm.e.setting"))
+            self.assertEqual(settings_list.reload().added, ["e"])
+        finally:
+            shutil.rmtree(directory)
+
+    def test_save_profiles(self):
+        directory = tempfile.mkdtemp()
+        try:
+            self.settings_list.save(directory)
+            settings_list = PwmSettingsList()
+            settings_list.load(directory)
+            settings_list["a"].Length = 20
+            settings_list["c"].Length = 30
+            settings_list.add("d", PwmSettings(URL="d"))
+
+            # A failing write leaves all files as they were
+            settings_list["d"].URL = object()
+            self.assertRaises(TypeError, settings_list.save_profiles,
+                              ["a", "d"], directory)
+            self.assertEqual(sorted(os.listdir(directory)),
+                             ["pwm.a.setting", "pwm.b.setting",
+                              "pwm.c.setting", "pwm.default.setting",
+                              PROFILE_INDEX_FILENAME])
+            self.assertEqual(load_profile("a", directory).Length, 8)
+
+            settings_list["d"].URL = "d"
+            settings_list.save_profiles(["a", "d"], directory)
+            self.assertEqual(load_profile("a", directory).Length, 20)
+            self.assertEqual(load_profile("c", directory).Length, 8)
+            self.assertEqual(load_profile("d", directory).URL, "d")
+            self.assertIn("d", load_profile_index(directory))
+            self.assertTrue(settings_list.is_modified("c"))
+            self.assertFalse(settings_list.is_modified("d"))
+        finally:
+            shutil.rmtree(directory)
+
+    def test_reload_modified(self):
+        directory = tempfile.mkdtemp()
+        try:
+            self.settings_list.save(directory)
+            settings_list = PwmSettingsList()
+            settings_list.load(directory)
+            # Edits of a profile that is not current, e.g. from the GUI
+            settings_list["a"].Length = 20
+            settings_list["b"].MasterPass = "secret"
+            self.assertTrue(settings_list.is_modified("a"))
+            self.assertFalse(settings_list.is_modified("b"))
+
+            for name in ("a", "b"):
+                filepath = os.path.join(directory,
+                                        "pwm.{}.setting".format(name))
+                stat = os.stat(filepath)
+                os.utime(filepath, (stat.st_atime, stat.st_mtime + 10))
+            os.remove(os.path.join(directory, "pwm.c.setting"))
+            settings_list["c"].URL = "edited"
+
+            changes = settings_list.reload()
+            self.assertEqual(changes.conflicts, ["a", "c"])
+            self.assertEqual(changes.changed, ["b"])
+            self.assertEqual(settings_list["a"].Length, 20)
+            self.assertEqual(settings_list["c"].URL, "edited")
+            self.assertFalse(settings_list.reload())
+
+            settings_list.save(directory)
+            self.assertFalse(settings_list.is_modified("a"))
+            self.assertEqual(load_profile("a", directory).Length, 20)
+        finally:
+            shutil.rmtree(directory)
+
+
+class TestPrefixIndex(unittest.TestCase):
+    """Unit test class for PrefixIndex"""
+
+    def setUp(self):
+        self.index = PrefixIndex(["mail", "bank", "mailbox", "default",
+                                  "maps"])
+
+    def test_find(self):
+        self.assertEqual(self.index.find("ma"), ["mail", "mailbox", "maps"])
+        self.assertEqual(self.index.find("mail"), ["mail", "mailbox"])
+        self.assertEqual(self.index.find("x"), [])
+        self.assertEqual(self.index.find("", limit=2), ["bank", "default"])
+
+    def test_add_remove(self):
+        self.index.add("mad")
+        self.assertEqual(self.index.find("ma"),
+                         ["mad", "mail", "mailbox", "maps"])
+        self.index.remove("mail")
+        self.assertFalse("mail" in self.index)
+        self.assertEqual(len(self.index), 5)
+        self.assertRaises(KeyError, self.index.remove, "mail")
+
+
+class TestPwmArchive(unittest.TestCase):
+    """Unit test class for pwmarchive"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filepath = os.path.join(self.directory, "profiles.pwma")
+
+        settings_list = PwmSettingsList()
+        settings_list.add("zeta", PwmSettings(URL="zeta.org", Length=20,
+                                              UseLeet="both", LeetLvl=3))
+        settings_list.add("\xfcml\xe4ut", PwmSettings(Prefix="\u20ac",
+                                                     Algorithm="sha1"))
+        settings_list.add("alpha", PwmSettings(URLPatterns="*.alpha.com",
+                                               CharacterSet="0123456789"))
+        settings_list.current = "alpha"
+        self.settings_list = settings_list
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_roundtrip_json(self):
+        # JSON .setting files -> archive -> PwmSettingsList
+        json_directory = os.path.join(self.directory, "json")
+        os.mkdir(json_directory)
+        self.settings_list.save(json_directory)
+        json_list = PwmSettingsList()
+        json_list.load(json_directory)
+
+        export_archive(json_list, self.filepath)
+        self.assertEqual(import_archive(self.filepath), json_list)
+
+    def test_lookup(self):
+        export_archive(self.settings_list, self.filepath)
+        with PwmArchive(self.filepath) as archive:
+            self.assertEqual(len(archive), 4)
+            self.assertEqual(tuple(archive), self.settings_list.pwm_names)
+            self.assertEqual(archive.current, "alpha")
+            for name, pwm in self.settings_list.items():
+                self.assertEqual(archive[name], pwm)
+            self.assertFalse("beta" in archive)
+            self.assertEqual(archive.get("beta"), None)
+            self.assertRaises(KeyError, archive.__getitem__, "beta")
+
+    def test_no_master_password(self):
+        self.settings_list["zeta"].MasterPass = "secret"
+        export_archive(self.settings_list, self.filepath)
+        with open(self.filepath, "rb") as infile:
+            self.assertFalse(b"secret" in infile.read())
+
+    def test_invalid_archive(self):
+        with open(self.filepath, "wb") as outfile:
+            outfile.write(b"{}")
+        self.assertRaises(ValueError, PwmArchive, self.filepath)
+
+
+class TestKeyStretching(unittest.TestCase):
+    """Unit test class for the key stretching algorithms"""
+
+    def test_pbkdf2_sha256(self):
+        alg = "pbkdf2-sha256"
+        if alg not in STRETCHING_ALGORITHMS:
+            raise Warning("Algorithm {} unavailable.".format(alg))
+        res = generatepassword(alg, "asdf", "passwordmaker.org", 19,
+                               FULL_CHARSET, cost=4)
+        digest = hashlib.pbkdf2_hmac("sha256", b"asdf", b"passwordmaker.org",
+                                     16)
+        r = PwmHashUtils("md5", FULL_CHARSET).rstr2any(digest)[:19]
+        self.assertEqual(res, r)
+
+    def test_opt_in(self):
+        for alg in STRETCHING_ALGORITHMS:
+            self.assertNotIn(alg, ALGORITHMS)
+            self.assertEqual(PwmSettings(Algorithm=alg).Algorithm, alg)
+        # Bounds of the GUI cost spinbox
+        self.assertEqual(attr.fields(PwmSettings).Cost.metadata["range"],
+                         (0, 30))
+
+    def test_stretching_algorithms(self):
+        for alg in STRETCHING_ALGORITHMS:
+            res = generatepassword(alg, "asdf", "passwordmaker.org", 64,
+                                   FULL_CHARSET, cost=4)
+            self.assertEqual(len(res), 64)
+            self.assertNotEqual(res, generatepassword(
+                alg, "asdf", "passwordmaker.org", 64, FULL_CHARSET, cost=5))
+
+    def test_stretching_settings(self):
+        for alg in STRETCHING_ALGORITHMS:
+            settings = PwmSettings(URL="passwordmaker.org", MasterPass="asdf",
+                                   Algorithm=alg, Cost=4)
+            res = generatepassword(alg, "asdf", "passwordmaker.org", 8,
+                                   FULL_CHARSET, cost=4)
+            self.assertEqual(generatepasswordfrom(settings), res)
+
+    def test_invalid_cost(self):
+        self.assertRaises(ValueError, generatepassword, "scrypt", "asdf",
+                          "passwordmaker.org", 8, FULL_CHARSET, cost=99)
+
+    def test_calibrate_cost(self):
+        for alg in STRETCHING_ALGORITHMS:
+            cost = calibrate_cost(alg, target_seconds=0.001)
+            self.assertTrue(1 <= cost <= 20)
+        self.assertRaises(ValueError, calibrate_cost, "md5")
+
+    def test_generatepasswordsfrom(self):
+        settings_seq = [PwmSettings(URL="site{}.com".format(i),
+                                    MasterPass="asdf", Algorithm=alg, Cost=4)
+                        for i in range(8)
+                        for alg in ("md5",) + STRETCHING_ALGORITHMS]
+        res = generatepasswordsfrom(settings_seq, workers=4)
+        r = [generatepasswordfrom(settings) for settings in settings_seq]
+        self.assertEqual(res, r)
+
+
+class TestBackends(unittest.TestCase):
+    """Unit test class for hash backends and calibration"""
+
+    def setUp(self):
+        self.selected = get_selected_backends()
+
+    def tearDown(self):
+        for algorithm, backend in self.selected.items():
+            select_backend(algorithm, backend)
+
+    def test_backends_identical(self):
+        for algorithm, backends in HASH_BACKENDS.items():
+            res = set()
+            for backend in backends:
+                select_backend(algorithm, backend)
+                res.add(generatepassword(algorithm, "asdf",
+                                         "passwordmaker.org", 19,
+                                         FULL_CHARSET))
+            self.assertEqual(len(res), 1)
+
+    def test_select_unavailable_backend(self):
+        self.assertRaises(ValueError, select_backend, "md5", "unknown")
+
+    def test_backend_cache(self):
+        directory = tempfile.mkdtemp()
+        filepath = os.path.join(directory, "sub", "backends.json")
+        try:
+            save_backend_cache({"hmac-md5": "hmac.new", "md5": "unknown"},
+                               filepath)
+            self.assertEqual(load_backend_cache(filepath),
+                             {"hmac-md5": "hmac.new"})
+            self.assertEqual(get_selected_backends()["hmac-md5"], "hmac.new")
+            self.assertEqual(load_backend_cache(filepath + ".missing"), {})
+        finally:
+            shutil.rmtree(directory)
+
+    def test_calibrate(self):
+        results = list(calibrate(algorithms=["md5", "hmac-sha1"],
+                                 lengths=[8], min_time=0.001))
+        self.assertEqual([r.algorithm for r in results], ["md5", "hmac-sha1"])
+        for result in results:
+            self.assertEqual(len(result.rates), len(CHARSET_PRESETS))
+            self.assertTrue(result.recommended_backend in
+                            HASH_BACKENDS[result.algorithm])
+            self.assertTrue(result.algorithm in format_result(result))
+
+        # Custom charsets are listed after the presets
+        charsets = dict(CHARSET_PRESETS, zz="ab", custom="0123456789")
+        result, = calibrate(algorithms=["md5"], lengths=[8],
+                            charsets=charsets, min_time=0.001)
+        header = format_result(result).splitlines()[2].split()
+        self.assertEqual(header, ["length"] + list(CHARSET_PRESETS) +
+                         ["custom", "zz"])
+
+
+class TestDefaultFastPath(unittest.TestCase):
+    """Differential tests of the default profile fast path"""
+
+    def _general(self, key, data):
+        return generatepassword("md5", key, data, 8, FULL_CHARSET)
+
+    def test_fast_path_random(self):
+        rand = random.Random(37)
+        alphabet = "abcXYZ019.-/\xe4\u20ac\U0001f511"
+        for _ in range(2000):
+            key = "".join(rand.choice(alphabet)
+                          for _ in range(rand.randint(0, 16)))
+            data = "".join(rand.choice(alphabet)
+                           for _ in range(rand.randint(0, 32)))
+            self.assertEqual(_generatepassword_default(key, data),
+                             self._general(key, data))
+
+    def test_fast_path_short_digest(self):
+        # Digests with less than 8 base 94 digits need further rounds
+        md5 = _DIGEST_FUNCS["md5"]
+        _DIGEST_FUNCS["md5"] = lambda inp: b"\0" * 14 + md5(inp)[:2]
+        try:
+            self.assertEqual(_generatepassword_default("asdf", "x"),
+                             self._general("asdf", "x"))
+        finally:
+            _DIGEST_FUNCS["md5"] = md5
+
+    def test_fast_path_selected(self):
+        settings = PwmSettings(URL="passwordmaker.org", MasterPass="asdf")
+        with profile() as prof:
+            self.assertEqual(generatepasswordfrom(settings), 'FRRHm)k+')
+        self.assertFalse("hash" in prof.counters)
+
+    def test_fast_path_not_selected(self):
+        settings = PwmSettings(URL="passwordmaker.org", MasterPass="asdf",
+                               UseLeet="after")
+        with profile() as prof:
+            generatepasswordfrom(settings)
+        self.assertTrue("hash" in prof.counters)
+
+
+class _CountingStream(io.StringIO):
+    """StringIO that counts write and flush calls"""
+
+    def __init__(self):
+        io.StringIO.__init__(self)
+        self.writes = 0
+        self.flushes = 0
+
+    def write(self, data):
+        self.writes += 1
+        return io.StringIO.write(self, data)
+
+    def flush(self):
+        self.flushes += 1
+
+
+class TestOutputSinks(unittest.TestCase):
+    """Unit test class for pwmsink"""
+
+    def setUp(self):
+        self.settings_seq = [PwmSettings(URL="site{}.com".format(i),
+                                         MasterPass="asdf", Length=8 + i % 5)
+                             for i in range(50)]
+        self.passwords = [generatepasswordfrom(settings)
+                          for settings in self.settings_seq]
+
+    def test_igeneratepasswordsfrom(self):
+        for workers in (1, 3):
+            res = list(igeneratepasswordsfrom(iter(self.settings_seq),
+                                              workers, chunk_size=7))
+            self.assertEqual([settings for settings, _ in res],
+                             self.settings_seq)
+            self.assertEqual([pwd for _, pwd in res], self.passwords)
+
+    def test_default_format(self):
+        stream = io.StringIO()
+        with OutputSink(stream, fields=("URL", "Password")) as sink:
+            self.assertEqual(write_passwords(self.settings_seq[:2], sink), 2)
+        self.assertEqual(stream.getvalue(), "site0.com\t{}\nsite1.com\t{}\n"
+                         .format(*self.passwords[:2]))
+
+    def test_jsonl(self):
+        stream = io.StringIO()
+        with JsonLinesSink(stream) as sink:
+            self.assertEqual(write_passwords(self.settings_seq, sink), 50)
+        records = [json.loads(line)
+                   for line in stream.getvalue().splitlines()]
+        self.assertEqual([r["Password"] for r in records], self.passwords)
+        self.assertEqual(records[1]["Length"], 9)
+        self.assertFalse("MasterPass" in records[0])
+
+    def test_csv(self):
+        stream = io.StringIO()
+        with CsvSink(stream, fields=("URL", "Password")) as sink:
+            write_passwords(self.settings_seq, sink)
+        rows = list(csv.reader(io.StringIO(stream.getvalue())))
+        self.assertEqual(rows[0], ["URL", "Password"])
+        self.assertEqual(rows[1:], [[s.URL, p] for s, p in
+                                    zip(self.settings_seq, self.passwords)])
+
+    def test_fixed_width(self):
+        stream = io.StringIO()
+        with FixedWidthSink(stream, fields=("URL", "Password")) as sink:
+            write_passwords(self.settings_seq, sink)
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(len(set(len(line) for line in lines)), 1)
+        self.assertEqual(lines[0][64:].rstrip(), self.passwords[0])
+
+        settings = PwmSettings(URL="x" * 65)
+        with FixedWidthSink(io.StringIO()) as sink:
+            self.assertRaises(ValueError, sink.write, settings, "pwd")
+
+    def test_redact(self):
+        for redact, expected in [("redact", REDACTED),
+                                 ("hash", hashlib.sha256(
+                                     self.passwords[0].encode()).hexdigest())]:
+            stream = io.StringIO()
+            with JsonLinesSink(stream, redact=redact) as sink:
+                sink.write(self.settings_seq[0], self.passwords[0])
+            record = json.loads(stream.getvalue())
+            self.assertEqual(record["Password"], expected)
+
+    def test_fields(self):
+        self.assertRaises(ValueError, JsonLinesSink, io.StringIO(),
+                          fields=("URL", "MasterPass"))
+        self.assertRaises(ValueError, JsonLinesSink, io.StringIO(),
+                          fields=("Unknown",))
+
+    def test_buffering(self):
+        stream = _CountingStream()
+        sink = JsonLinesSink(stream, buffer_size=1000, flush_interval=None)
+        write_passwords(self.settings_seq, sink)
+        self.assertTrue(0 < stream.writes < 50)
+        self.assertEqual(stream.flushes, 0)
+        sink.close()
+        self.assertEqual(stream.flushes, 1)
+        self.assertEqual(len(stream.getvalue().splitlines()), 50)
+
+        stream = _CountingStream()
+        with JsonLinesSink(stream, flush_interval=0) as sink:
+            write_passwords(self.settings_seq, sink)
+            self.assertEqual(stream.flushes, 50)
+
+    def test_open_sink(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            filepath = os.path.join(tmpdir, "out.csv")
+            with open_sink("csv", filepath) as sink:
+                write_passwords(self.settings_seq, sink)
+            with open(filepath) as infile:
+                self.assertEqual(len(infile.readlines()), 51)
+        finally:
+            shutil.rmtree(tmpdir)
+        self.assertRaises(ValueError, open_sink, "xml")
+
+    def test_iter_settings_jsonl(self):
+        base = PwmSettings(MasterPass="asdf")
+        lines = ['{"URL": "a.com"}\n', "\n", '{"URL": "b.com", "Length": 12}']
+        settings_seq = list(iter_settings_jsonl(lines, base))
+        self.assertEqual([s.URL for s in settings_seq], ["a.com", "b.com"])
+        self.assertEqual(settings_seq[1].Length, 12)
+        self.assertEqual(settings_seq[1].MasterPass, "asdf")
+        self.assertRaises(ValueError, list,
+                          iter_settings_jsonl(['{"Unknown": 1}'], base))
+
+
+class TestDerivationContext(unittest.TestCase):
+    """Unit test class for ContextSnapshot and DerivationContext"""
+
+    def setUp(self):
+        self.settings_list = PwmSettingsList(
+            "b", ["a", "b"], [PwmSettings(URL="a.com", MasterPass="asdf"),
+                              PwmSettings(URL="b.com", MasterPass="asdf",
+                                          Length=12)])
+        self.context = DerivationContext.from_settings_list(
+            self.settings_list)
+
+    def test_snapshot_copies(self):
+        snapshot = self.context.snapshot
+        self.settings_list["a"].Length = 20
+        snapshot.get("a").Length = 30
+        snapshot.profiles["a"].Length = 40
+        self.assertEqual(snapshot.get("a").Length, 8)
+        self.assertEqual(snapshot.profiles["a"].Length, 8)
+        with self.assertRaises(TypeError):
+            snapshot.profiles["c"] = PwmSettings()
+        self.assertEqual(snapshot.to_settings_list().pwm_names, ("a", "b"))
+
+    def test_derive(self):
+        self.assertEqual(self.context.derive(),
+                         generatepasswordfrom(self.settings_list["b"]))
+        self.assertEqual(self.context.derive("a", URL="c.com"),
+                         generatepasswordfrom(PwmSettings(URL="c.com",
+                                                          MasterPass="asdf")))
+
+    def test_copy_on_write(self):
+        old = self.context.snapshot
+        new = self.context.set_profile("c", PwmSettings(URL="c.com"))
+        self.assertEqual(list(old), ["a", "b"])
+        self.assertEqual(list(new), ["a", "b", "c"])
+        self.assertEqual(new.version, old.version + 1)
+        self.assertTrue(new._profiles["a"] is old._profiles["a"])
+        self.assertTrue(self.context.snapshot is new)
+
+    def test_remove_current(self):
+        self.context.remove_profile("b")
+        self.assertEqual(self.context.snapshot.current, "a")
+        self.assertRaises(KeyError, self.context.remove_profile, "b")
+        self.assertRaises(KeyError, self.context.set_current, "b")
+
+    def test_stress(self):
+        """Readers derive while a writer publishes new snapshots"""
+
+        names = ["p{}".format(i) for i in range(8)]
+        errors = []
+        done = threading.Event()
+
+        def write():
+            try:
+                for version in range(1, 200):
+                    self.context.update(dict(
+                        (name, PwmSettings(URL=name, MasterPass="asdf",
+                                           Modifier=str(version),
+                                           Length=8 + version % 8))
+                        for name in names))
+            except Exception as err:
+                errors.append(err)
+            finally:
+                done.set()
+
+        def read():
+            try:
+                while not done.is_set():
+                    snapshot = self.context.snapshot
+                    if "p0" not in snapshot:
+                        continue
+                    # All profiles of a snapshot stem from the same update
+                    modifiers = set(snapshot.profiles[name].Modifier
+                                    for name in names)
+                    self.assertEqual(len(modifiers), 1)
+                    for name in names:
+                        pwm = snapshot.profiles[name]
+                        self.assertEqual(snapshot.derive(name),
+                                         generatepassword(
+                                             "md5", "asdf",
+                                             name + pwm.Modifier,
+                                             pwm.Length, FULL_CHARSET))
+            except Exception as err:
+                errors.append(err)
+
+        threads = [threading.Thread(target=read) for _ in range(4)]
+        threads.append(threading.Thread(target=write))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(self.context.snapshot.version, 199)
+
+
+def _candidate_key_x(case):
+    """Fuzz candidate that is wrong if the key contains an x"""
+
+    password = candidate_generatepassword(case)
+    return password + "!" if "x" in case.key else password
+
+
+class TestFuzz(unittest.TestCase):
+    """Differential tests of the optimised paths against the reference"""
+
+    def test_reference(self):
+        self.assertEqual(reference_generatepassword(
+            "md5", "asdf", "passwordmaker.org", 8, FULL_CHARSET), 'FRRHm)k+')
+
+    def test_generate_case(self):
+        self.assertEqual(generate_case(41, 3), generate_case(41, 3))
+        self.assertNotEqual(generate_case(41, 3), generate_case(41, 4))
+        charsets = [generate_case(41, i).charset for i in range(100)]
+        self.assertTrue(any(len(set(c)) < len(c) for c in charsets))
+        self.assertTrue(any(len(c) > 200 for c in charsets))
+
+    def test_fuzz(self):
+        self.assertEqual(run_fuzz(1000, seed=41, workers=1), [])
+
+    def test_fuzz_parallel(self):
+        self.assertEqual(run_fuzz(200, seed=42, workers=2, chunk_size=50),
+                         [])
+
+    def test_shrink(self):
+        failures = run_fuzz(100, seed=41, workers=1,
+                            candidates={"key_x": _candidate_key_x})
+        self.assertTrue(failures)
+        for failure in failures:
+            self.assertTrue("x" in failure.case.key)
+            self.assertEqual(failure.shrunk_case,
+                             FuzzCase(key="x", length=1, charset="AB"))
+        self.assertEqual(shrink(_candidate_key_x, FuzzCase(key="axb")),
+                         FuzzCase(key="x", length=1, charset="AB"))
+
+
+class _FailingSink(CsvSink):
+    """CsvSink that raises IOError after max_count records"""
+
+    max_count = None
+
+    def write(self, settings, password="", **extra):
+        if self.count == self.max_count:
+            raise IOError("Disk full")
+        CsvSink.write(self, settings, password, **extra)
+
+
+class TestRotation(unittest.TestCase):
+    """Unit test class for primed keys and pwmrotate"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        algorithms = ALGORITHMS
+        names = ["site{}".format(i) for i in range(40)]
+        pwms = [PwmSettings(URL=name + ".com",
+                            Algorithm=algorithms[i % len(algorithms)],
+                            UseLeet=LEET_OPTIONS[i % 4], LeetLvl=i % 9,
+                            Length=4 + i)
+                for i, name in enumerate(names)]
+        self.settings_list = PwmSettingsList(names[0], names, pwms)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _expected(self):
+        rows = [list(ROTATION_FIELDS)]
+        for name, pwm in self.settings_list.items():
+            old = generatepasswordfrom(attr.evolve(pwm, MasterPass="old"))
+            new = generatepasswordfrom(attr.evolve(pwm, MasterPass="new"))
+            rows.append([name, pwm.URL, "", "", old, new])
+        return rows
+
+    def _read(self, filepath):
+        with open(filepath) as infile:
+            return list(csv.reader(infile))
+
+    def test_primed_key(self):
+        for algorithm in ALGORITHMS + STRETCHING_ALGORITHMS:
+            primed_key = get_primed_key(algorithm, "k\xe4y", "before", 3)
+            if algorithm in STRETCHING_ALGORITHM_2_HASH_FUNC:
+                self.assertTrue(primed_key is None)
+                continue
+            for length in (1, 8, 60):
+                self.assertEqual(
+                    generatepassword(algorithm, "k\xe4y", "data", length,
+                                     FULL_CHARSET, use_leet="before",
+                                     leet_level=3, primed_key=primed_key),
+                    generatepassword(algorithm, "k\xe4y", "data", length,
+                                     FULL_CHARSET, use_leet="before",
+                                     leet_level=3))
+
+    def test_rotate(self):
+        for workers in (1, 2):
+            filepath = os.path.join(self.tmpdir, "out.csv")
+            with open_sink("csv", filepath, fields=ROTATION_FIELDS) as sink:
+                self.assertEqual(rotate_passwords(
+                    self.settings_list, "old", "new", sink, workers=workers,
+                    chunk_size=7), 40)
+            self.assertEqual(self._read(filepath), self._expected())
+
+    def test_resume(self):
+        filepath = os.path.join(self.tmpdir, "out.csv")
+        checkpoint = os.path.join(self.tmpdir, "rotation.checkpoint")
+
+        with io.open(filepath, "w", newline="") as outfile:
+            sink = _FailingSink(outfile, fields=ROTATION_FIELDS)
+            sink.max_count = 17
+            self.assertRaises(IOError, rotate_passwords, self.settings_list,
+                              "old", "new", sink, workers=1,
+                              checkpoint=checkpoint, chunk_size=5)
+            sink.close()
+
+        # The complete chunks 1 to 3 have been written
+        with open(checkpoint) as infile:
+            self.assertEqual(json.load(infile)["done"], 15)
+        self.assertFalse("old" in open(checkpoint).read())
+
+        with open_sink("csv", filepath, append=True,
+                       fields=ROTATION_FIELDS) as sink:
+            self.assertEqual(rotate_passwords(
+                self.settings_list, "old", "new", sink, workers=1,
+                checkpoint=checkpoint, chunk_size=5), 25)
+        rows = self._read(filepath)
+        # Records 16 and 17 of the interrupted chunk are written twice
+        self.assertEqual(rows[:16] + rows[18:], self._expected())
+
+        # A checkpoint of other profiles is ignored
+        self.settings_list["site0"].Length = 20
+        with open_sink("csv", filepath, fields=ROTATION_FIELDS) as sink:
+            self.assertEqual(rotate_passwords(
+                self.settings_list, "old", "new", sink, workers=1,
+                checkpoint=checkpoint, chunk_size=5), 40)
+
+
+class TestSecretKey(unittest.TestCase):
+    """Unit test class for SecretKey"""
+
+    def test_secret_key(self):
+        secret_key = SecretKey("m\xe4ster")
+        self.assertEqual(len(secret_key), 7)
+        self.assertFalse("ster" in repr(secret_key))
+        self.assertEqual(secret_key, SecretKey(b"m\xc3\xa4ster"))
+        self.assertNotEqual(secret_key, SecretKey("other"))
+        with secret_key:
+            pass
+        self.assertTrue(secret_key.wiped)
+        self.assertEqual(len(secret_key), 0)
+
+    def test_from_buffer(self):
+        buf = bytearray(b"master")
+        with SecretKey.from_buffer(buf) as secret_key:
+            self.assertEqual(secret_key, SecretKey("master"))
+        self.assertEqual(buf, b"")
+
+    def test_wipe_with_view(self):
+        buf = bytearray(b"master")
+        secret_key = SecretKey.from_buffer(buf)
+        view = secret_key.view()
+        secret_key.wipe()
+        self.assertEqual(view.tobytes(), b"\0" * 6)
+        self.assertTrue(secret_key.wiped)
+        view.release()
+
+    def test_generatepassword(self):
+        for algorithm in ALGORITHMS + STRETCHING_ALGORITHMS:
+            cost = 1 if algorithm in STRETCHING_ALGORITHM_2_HASH_FUNC else 0
+            for use_leet in LEET_OPTIONS:
+                for length in (8, 60):
+                    with SecretKey("M\xe4ster") as secret_key:
+                        res = generatepassword(
+                            algorithm, secret_key, "site.com", length,
+                            FULL_CHARSET, use_leet=use_leet, leet_level=5,
+                            cost=cost)
+                        self.assertEqual(len(secret_key), 7)
+                    self.assertEqual(res, generatepassword(
+                        algorithm, "M\xe4ster", "site.com", length,
+                        FULL_CHARSET, use_leet=use_leet, leet_level=5,
+                        cost=cost))
+
+    def test_round_keys(self):
+        with SecretKey("master") as secret_key:
+            key = secret_key.view()
+            round_keys = _iter_round_keys(key, b"data")
+            buffers = []
+            for i, round_key in enumerate(round_keys):
+                expected = b"master\n" + str(i).encode() if i else b"master"
+                self.assertEqual(round_key, expected + b"data")
+                if not buffers or buffers[-1] is not round_key:
+                    buffers.append(round_key)
+                if i == 12:
+                    break
+            round_keys.close()
+            key.release()
+        # Buffers of round 0, rounds 1 to 9 and rounds 10 to 12
+        self.assertEqual(len(buffers), 3)
+        for buf in buffers:
+            self.assertFalse(any(buf))
+
+    def test_primed_key(self):
+        primed_key = get_primed_key("md5", "master")
+        self.assertRaises(ValueError, generatepassword, "md5",
+                          SecretKey("master"), "site.com", 8, FULL_CHARSET,
+                          primed_key=primed_key)
+
+    def _count_copies(self, key, key_length):
+        """Returns (peak, remaining) allocations in units of key_length"""
+
+        tracemalloc.start()
+        try:
+            base = tracemalloc.get_traced_memory()[0]
+            generatepassword("md5", key, "site.com", 60, FULL_CHARSET)
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return (float(peak - base) / key_length,
+                float(current - base) / key_length)
+
+    def test_copies(self):
+        """Counts key sized allocations during and after a derivation"""
+
+        key = "k" * 8192
+
+        # str key: str, bytes and per round concatenations
+        peak, remaining = self._count_copies(key, len(key))
+        self.assertTrue(peak > 3, peak)
+        self.assertTrue(remaining < 0.5, remaining)
+
+        # SecretKey: only the reused round key buffer, wiped afterwards
+        with SecretKey(key) as secret_key:
+            peak, remaining = self._count_copies(secret_key, len(key))
+        self.assertTrue(peak < 2, peak)
+        self.assertTrue(remaining < 0.5, remaining)
+
+
+class TestLeetKeyCache(unittest.TestCase):
+    """Unit test class for LeetKeyCache"""
+
+    def test_generatepassword(self):
+        leet_keys = LeetKeyCache(maxsize=32)
+        for algorithm in ("md5", "hmac-sha1", "sha256"):
+            for use_leet in LEET_OPTIONS:
+                for leet_level in range(10):
+                    for key in ("M\xe4ster", SecretKey("M\xe4ster"),
+                                SecretKey("Master")):
+                        res = generatepassword(
+                            algorithm, key, "Site.com", 40, FULL_CHARSET,
+                            use_leet=use_leet, leet_level=leet_level,
+                            leet_keys=leet_keys)
+                        self.assertEqual(res, generatepassword(
+                            algorithm, str(key.view(), "utf-8")
+                            if isinstance(key, SecretKey) else key,
+                            "Site.com", 40, FULL_CHARSET, use_leet=use_leet,
+                            leet_level=leet_level))
+        # Only SecretKey keys are cached
+        self.assertEqual(len(leet_keys), 20)
+
+    def test_get(self):
+        leet_keys = LeetKeyCache()
+        leet_key = leet_keys.get(SecretKey("Master"), 5)
+        self.assertEqual(bytes(leet_key.view()), leet(5, "Master").encode())
+        self.assertIs(leet_keys.get(SecretKey("Master"), 5), leet_key)
+        self.assertIsNot(leet_keys.get(SecretKey("Master"), 4), leet_key)
+        self.assertIsNot(leet_keys.get(SecretKey("master"), 5), leet_key)
+        # The cache stores no plain key
+        self.assertNotIn("Master", repr(leet_keys))
+        self.assertNotIn(b"Master", b"".join(
+            key_id for key_id, _ in leet_keys._keys._data))
+
+        self.assertEqual(leet_keys.get("Master", 5), leet(5, "Master"))
+        self.assertEqual(len(leet_keys), 3)
+
+    def test_leet_buffer(self):
+        for message in ("Master", "M\xe4ster \u03a3\u03a3", "", "QUIT me"):
+            for leet_level in range(-1, 10):
+                self.assertEqual(
+                    leet_buffer(leet_level, message.encode("utf-8")),
+                    leet(leet_level, message).encode("utf-8"))
+
+    def test_bounded(self):
+        leet_keys = LeetKeyCache(maxsize=3)
+        first = leet_keys.get(SecretKey("key0"), 1)
+        for i in range(1, 10):
+            leet_keys.get(SecretKey("key{}".format(i)), 1)
+        self.assertEqual(len(leet_keys), 3)
+        self.assertIsNot(leet_keys.get(SecretKey("key0"), 1), first)
+
+    def test_wipe(self):
+        leet_keys = LeetKeyCache()
+        leet_key_list = [leet_keys.get(SecretKey("key"), leet_level)
+                         for leet_level in range(1, 10)]
+        leet_keys.wipe()
+        self.assertEqual(len(leet_keys), 0)
+        for leet_key in leet_key_list:
+            self.assertTrue(leet_key.wiped)
+
+    def test_context(self):
+        settings = PwmSettings(URL="site.com", UseLeet="both", LeetLvl=7)
+        reference = generatepasswordfrom(attr.evolve(settings,
+                                                     MasterPass="master"))
+        for leet_keys in (None, LeetKeyCache()):
+            context = DerivationContext(leet_keys=leet_keys)
+            context.set_profile("default", settings)
+            self.assertEqual(context.derive(MasterPass="master"), reference)
+            context.wipe()
+        # The cache is opt-in
+        self.assertIsNone(DerivationContext().leet_keys)
+
+
+class TestMultiAlgorithm(unittest.TestCase):
+    """Unit test class for generatepasswords_all and find_matching_algorithm"""
+
+    algorithms = ALGORITHMS
+
+    def test_generatepasswords_all(self):
+        for workers in (1, 4):
+            for use_leet in LEET_OPTIONS:
+                for length, prefix, suffix in [(8, "", ""), (70, "ab", "xyz"),
+                                               (2, "", "xyz")]:
+                    res = generatepasswords_all(
+                        "k\xe9y", "site.com", length, FULL_CHARSET, prefix,
+                        suffix, use_leet, 5, cost=1, workers=workers)
+                    self.assertEqual(list(res), list(ALGORITHMS))
+                    for algorithm, pwd in res.items():
+                        self.assertEqual(pwd, generatepassword(
+                            algorithm, "k\xe9y", "site.com", length,
+                            FULL_CHARSET, prefix, suffix, use_leet, 5,
+                            cost=1))
+
+    def test_find_matching_algorithm(self):
+        for algorithm in ("sha1", "hmac-md5", "rmd160"):
+            if algorithm not in self.algorithms:
+                continue
+            pwd = generatepassword(algorithm, "key", "site.com", 14,
+                                   FULL_CHARSET, "ab", "", "after", 3)
+            res = find_matching_algorithm(pwd, "key", "site.com",
+                                          FULL_CHARSET, "ab", "", "after", 3,
+                                          algorithms=self.algorithms)
+            self.assertEqual(generatepassword(res[0], "key", "site.com",
+                                              res[1], FULL_CHARSET, "ab", "",
+                                              "after", 3), pwd)
+            self.assertEqual(res[1], 14)
+
+    def test_find_truncated(self):
+        pwd = generatepassword("sha256", "key", "site.com", 20,
+                               FULL_CHARSET, suffix="!1")
+        res = find_matching_algorithm(pwd[:12], "key", "site.com",
+                                      FULL_CHARSET, suffix="!1",
+                                      algorithms=self.algorithms,
+                                      lengths=range(8, 33), workers=2)
+        # Length 14 is the shortest whose suffix starts after the 12 chars
+        self.assertEqual(res, ("sha256", 14))
+        self.assertEqual(find_matching_algorithm("nomatch", "key", "site.com",
+                                                 FULL_CHARSET,
+                                                 algorithms=self.algorithms),
+                         None)
+
+    def test_find_stops_early(self):
+        pwd = generatepassword("md5", "key", "site.com", 128, FULL_CHARSET)
+        with profile() as prof:
+            find_matching_algorithm("x" + pwd[1:], "key", "site.com",
+                                    FULL_CHARSET, algorithms=self.algorithms,
+                                    workers=1)
+        # One round per algorithm instead of about seven
+        self.assertEqual(prof.counters["rstr2any"], len(self.algorithms))
+
+
+class TestRecovery(unittest.TestCase):
+    """Unit test class for recover_settings"""
+
+    algorithms = ALGORITHMS
+
+    def _check_recovery(self, settings, space, workers):
+        pwd = generatepasswordfrom(settings)
+        res = recover_settings(pwd, settings.URL, settings.MasterPass, space,
+                               workers=workers)
+        self.assertTrue(res)
+        for recovered in res:
+            self.assertEqual(recovered.MasterPass, "")
+            recovered = attr.evolve(recovered,
+                                    MasterPass=settings.MasterPass)
+            self.assertEqual(generatepasswordfrom(recovered), pwd)
+        return res
+
+    def test_recover_settings(self):
+        space = SearchSpace(algorithms=self.algorithms,
+                            modifiers=("", "2018", "x"),
+                            prefixes=("", "ab"), suffixes=("", "!"))
+        for workers in (1, 2):
+            for use_leet in LEET_OPTIONS:
+                # The l33t level of "none" is reported as the default
+                leet_level = 1 if use_leet == "none" else 6
+                settings = PwmSettings(
+                    URL="site.com", MasterPass="k\xe9y", Algorithm="sha1",
+                    Length=10, Modifier="x", UseLeet=use_leet,
+                    LeetLvl=leet_level,
+                    CharacterSet=CHARSET_PRESETS["alphanumeric"],
+                    Prefix="ab", Suffix="!")
+                res = self._check_recovery(settings, space, workers)
+                self.assertIn(attr.astuple(settings)[2:],
+                              [attr.astuple(r)[2:] for r in res])
+
+    def test_recover_default(self):
+        settings = PwmSettings(URL="site.com", MasterPass="key")
+        res = self._check_recovery(settings, SearchSpace(leet_levels=[1]), 1)
+        self.assertEqual(res[0], PwmSettings(URL="site.com"))
+
+    def test_pruning(self):
+        space = SearchSpace(algorithms=["md5"], lengths=range(4, 9),
+                            prefixes=("", "ab"), suffixes=("", "!", "?"),
+                            leet_options=("none",))
+        tasks, pruned = get_search_tasks("ab123!", space)
+        candidates = [variant for task in tasks for variant in task[4]]
+        # Bodies "ab123!", "123!", "ab123" and "123" fit 1, 1, 3 and 4
+        # charsets, "?" never matches
+        self.assertEqual(len(candidates) + pruned, space.size)
+        self.assertEqual(len(candidates), 9)
+        self.assertNotIn(CHARSET_PRESETS["letters"],
+                         [variant[0] for variant in candidates])
+        self.assertEqual(get_search_tasks("abc", space), ([], space.size))
+
+    def test_prefix_suffix_overlap(self):
+        # finish_password cuts the prefix, if prefix and suffix overlap
+        space = SearchSpace(algorithms=["md5", "sha1"],
+                            charsets=[FULL_CHARSET], leet_options=("none",),
+                            prefixes=("", "abcdef", "abcdefghijk"),
+                            suffixes=("", "xyz", "0123456789"))
+        for prefix, suffix in (("abcdef", "xyz"), ("abcdefghijk", ""),
+                               ("", "0123456789"), ("abcdef", "0123456789")):
+            settings = PwmSettings(URL="site.com", MasterPass="key",
+                                   Algorithm="sha1", Length=8, Prefix=prefix,
+                                   Suffix=suffix)
+            res = self._check_recovery(settings, space, 1)
+            self.assertIn(settings, [attr.evolve(r, MasterPass="key")
+                                     for r in res])
+
+        self.assertEqual(generatepasswordfrom(PwmSettings(
+            URL="site.com", MasterPass="key", Length=8, Prefix="abcdef",
+            Suffix="xyz")), "abcdexyz")
+
+    def test_one_conversion_per_charset(self):
+        space = SearchSpace(algorithms=["md5"], leet_options=("none",))
+        with profile() as prof:
+            recover_settings("abcdefgh", "site.com", "key", space, workers=1)
+        # Only full, alphanumeric and letters survive pruning, one round each
+        self.assertEqual(prof.counters["rstr2any"], 3)
+
+    def test_progress(self):
+        reports = []
+        space = SearchSpace(algorithms=self.algorithms[:2])
+        res = recover_settings("abcdefgh", "site.com", "key", space,
+                               workers=1, progress=reports.append,
+                               progress_interval=0)
+        self.assertEqual(res, [])
+        self.assertGreater(len(reports), 1)
+        final = reports[-1]
+        self.assertEqual(final.done, final.total)
+        self.assertEqual(final.done + final.pruned, space.size)
+        self.assertGreaterEqual(final.rate, 0)
+
+    def test_max_matches(self):
+        settings = PwmSettings(URL="site.com", MasterPass="key",
+                               Algorithm="hmac-sha1")
+        pwd = generatepasswordfrom(settings)
+        space = SearchSpace(algorithms=["hmac-sha1", "hmac-sha256"])
+        self.assertEqual(len(recover_settings(pwd, "site.com", "key", space,
+                                              workers=1)), 2)
+        self.assertEqual(len(recover_settings(pwd, "site.com", "key", space,
+                                              workers=1, max_matches=1)), 1)
+
+
+class TestProfileNameIndex(unittest.TestCase):
+    """Unit test class for the profile name index file"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.settings_list = PwmSettingsList()
+        for name in ("work", "wolf", "home"):
+            self.settings_list.add(name)
+        self.settings_list.save(self.directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_save(self):
+        names = ["default", "home", "wolf", "work"]
+        self.assertEqual(load_profile_index(self.directory), names)
+        self.assertEqual(list_profiles(self.directory), names)
+
+        self.settings_list.remove("wolf")
+        self.settings_list.save(self.directory)
+        self.assertEqual(load_profile_index(self.directory),
+                         ["default", "home", "work"])
+
+    def test_stale(self):
+        open(os.path.join(self.directory, "pwm.new.setting"), "w").close()
+        self.assertIsNone(load_profile_index(self.directory))
+        # Listing scans the directory but leaves the index to save
+        self.assertIn("new", list_profiles(self.directory))
+        self.assertIsNone(load_profile_index(self.directory))
+
+        os.remove(os.path.join(self.directory, "pwm.home.setting"))
+        self.assertNotIn("home", list_profiles(self.directory))
+
+        filepath = os.path.join(self.directory, PROFILE_INDEX_FILENAME)
+        with open(filepath, "w") as outfile:
+            outfile.write("{")
+        self.assertIsNone(load_profile_index(self.directory))
+        self.assertIn("work", list_profiles(self.directory))
+
+    def test_index_used(self):
+        # A listed index is trusted while the directory is unchanged
+        filepath = os.path.join(self.directory, PROFILE_INDEX_FILENAME)
+        with open(filepath) as infile:
+            index = json.load(infile)
+        index["names"].append("indexed")
+        with open(filepath, "w") as outfile:
+            json.dump(index, outfile)
+        self.assertIn("indexed", list_profiles(self.directory))
+
+    def test_complete_resolve(self):
+        self.assertEqual(complete_profiles("wo", self.directory),
+                         ["wolf", "work"])
+        self.assertEqual(complete_profiles("x", self.directory), [])
+        self.assertEqual(resolve_profile("work", self.directory), "work")
+        # Prefixes never select a profile
+        self.assertRaises(KeyError, resolve_profile, "h", self.directory)
+        self.assertRaises(KeyError, resolve_profile, "wo", self.directory)
+        self.assertRaises(KeyError, resolve_profile, "x", self.directory)
+
+
+class TestBulkProfiles(unittest.TestCase):
+    """Unit test class for bulk profile export and import"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.settings_list = PwmSettingsList()
+        self.settings_list.add("work", PwmSettings(
+            URL="work.com", Length=12, UseLeet="after", LeetLvl=3,
+            URLPatterns="*.work.com /^https?://x\\.org/$/"))
+        self.settings_list.add("n\xe4me<&>", PwmSettings(
+            Algorithm="hmac-sha1", CharacterSet="ab\"<&>'\t", Prefix="\xe9"))
+        for i in range(25):
+            self.settings_list.add("site{}".format(i),
+                                   PwmSettings(URL="site{}.com".format(i)))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_round_trip(self):
+        for bulk_format in ("jsonl", "rdf"):
+            filepath = os.path.join(self.directory, "profiles." + bulk_format)
+            self.assertEqual(export_profiles(self.settings_list, filepath),
+                             28)
+            settings_list = PwmSettingsList()
+            self.assertEqual(import_profiles(filepath, settings_list,
+                                             batch_size=4), 28)
+            self.assertEqual(list(settings_list.items()),
+                             list(self.settings_list.items()))
+            self.assertFalse(os.path.exists(filepath + ".tmp"))
+
+    def test_extension_rdf(self):
+        filepath = os.path.join(self.directory, "passwordmaker.rdf")
+        with io.open(filepath, "w", encoding="utf-8") as outfile:
+            outfile.write(
+                '<?xml version="1.0"?>\n<RDF:RDF xmlns:NS1='
+                '"http://passwordmaker.mozdev.org/rdf#" xmlns:RDF='
+                '"http://www.w3.org/1999/02/22-rdf-syntax-ns#">\n'
+                '<RDF:Description RDF:about="rdf:#$a1" NS1:name="Mail" '
+                'NS1:urlToUse="mail.com" NS1:hashAlgorithmLB="sha1" '
+                'NS1:passwordLength="10" NS1:whereLeetLB="before-hashing" '
+                'NS1:leetLevelLB="4" NS1:counter="2" NS1:pattern0="mail.*" '
+                'NS1:patterntype0="wildcard" NS1:patternenabled0="true" '
+                'NS1:pattern1="old" NS1:patterntype1="wildcard" '
+                'NS1:patternenabled1="false" />\n'
+                '<RDF:Description RDF:about="rdf:#$f1" NS1:name="Folder" />\n'
+                '<RDF:Seq '
+                'RDF:about="http://passwordmaker.mozdev.org/accounts">'
+                '<RDF:li RDF:resource="rdf:#$a1"/></RDF:Seq>\n</RDF:RDF>\n')
+
+        with open(filepath, "rb") as infile:
+            self.assertEqual(len(list(iter_records_rdf(infile))), 1)
+
+        settings_list = PwmSettingsList()
+        self.assertEqual(import_profiles(filepath, settings_list), 1)
+        self.assertEqual(settings_list["Mail"], PwmSettings(
+            URL="mail.com", Algorithm="sha1", Length=10, UseLeet="before",
+            LeetLvl=4, Modifier="2", URLPatterns="/^mail\\..*$/"))
+
+    def test_rdf_wildcards(self):
+        patterns = ("http://*.example.com/*", "*://*.work.com/*",
+                    "*://home.org/*")
+        settings_list = PwmSettingsList()
+        settings_list.add("wild", PwmSettings())
+        filepath = os.path.join(self.directory, "wildcards.rdf")
+        export_profiles(settings_list, filepath)
+        with io.open(filepath, encoding="utf-8") as infile:
+            rdf = infile.read()
+        attributes = "".join(
+            ' NS1:pattern{0}="{1}" NS1:patterntype{0}="wildcard"'.format(
+                i, pattern) for i, pattern in enumerate(patterns))
+        with io.open(filepath, "w", encoding="utf-8") as outfile:
+            outfile.write(rdf.replace('NS1:name="wild"',
+                                      'NS1:name="wild"' + attributes))
+
+        settings_list = PwmSettingsList()
+        import_profiles(filepath, settings_list)
+        url_patterns = settings_list["wild"].URLPatterns
+        self.assertEqual(url_patterns.split()[1:], ["*.work.com", "home.org"])
+
+        index = ProfileIndex.from_settings_list(settings_list)
+        self.assertEqual(index.resolve("http://www.example.com/login"),
+                         "wild")
+        self.assertEqual(index.resolve("https://a.work.com/"), "wild")
+        self.assertEqual(index.resolve("https://home.org/x"), "wild")
+        self.assertIsNone(index.resolve("https://www.example.com/login"))
+
+        # Exported again, the extension gets the original wildcards
+        export_profiles(settings_list, filepath)
+        with open(filepath, "rb") as infile:
+            records = [record for _, record in iter_records_rdf(infile)]
+        self.assertEqual(records[-1]["URLPatterns"], url_patterns)
+        with io.open(filepath, encoding="utf-8") as infile:
+            rdf = infile.read()
+        for pattern in patterns:
+            self.assertIn('"{}"'.format(pattern), rdf)
+
+    def test_invalid(self):
+        filepath = os.path.join(self.directory, "bad.jsonl")
+        with open(filepath, "w") as outfile:
+            outfile.write('{"Name": "a"}\n\n{"Name": "b", "Length": "8"}\n'
+                          'no json\n{"Name": "c", "Algorithm": "x"}\n'
+                          '{"Name": "a"}\n{"Name": "d", "MasterPass": "x"}\n'
+                          '{"Name": "../e"}\n{"Name": "f"}\n')
+        before = list(self.settings_list.items())
+        with self.assertRaises(ProfileImportError) as context:
+            import_profiles(filepath, self.settings_list, batch_size=2)
+        self.assertEqual(len(context.exception.errors), 6)
+        self.assertIn("Record 3", context.exception.errors[0])
+        # Nothing is committed
+        self.assertEqual(list(self.settings_list.items()), before)
+
+        filepath = os.path.join(self.directory, "existing.jsonl")
+        with open(filepath, "w") as outfile:
+            outfile.write('{"Name": "new"}\n{"Name": "work"}\n')
+        self.assertRaises(ProfileImportError, import_profiles, filepath,
+                          self.settings_list, replace=False)
+        self.assertNotIn("new", self.settings_list)
+        self.assertEqual(import_profiles(filepath, self.settings_list), 2)
+        self.assertEqual(self.settings_list["work"], PwmSettings())
+
+        filepath = os.path.join(self.directory, "bad.rdf")
+        with open(filepath, "w") as outfile:
+            outfile.write("<RDF:RDF>")
+        self.assertRaises(ProfileImportError, import_profiles, filepath,
+                          self.settings_list)
+
+    def test_stretching_rdf(self):
+        self.settings_list.add("stretched", PwmSettings(Algorithm="scrypt"))
+        filepath = os.path.join(self.directory, "profiles.rdf")
+        self.assertRaises(ValueError, export_profiles, self.settings_list,
+                          filepath)
+        self.assertFalse(os.path.exists(filepath))
+        self.assertFalse(os.path.exists(filepath + ".tmp"))
+
+
+@unittest.skipIf(passwordmaker is None, "passwordmaker needs Tkinter")
+class TestCommandLine(unittest.TestCase):
+    """Unit test class for the passwordmaker command line interface"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        settings_list = PwmSettingsList()
+        settings_list.add("work", PwmSettings(URL="work.com", Length=12,
+                                              UseLeet="after", LeetLvl=3))
+        for i in range(20):
+            settings_list.add("site{}".format(i))
+        settings_list.save(self.directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _run(self, *argv):
+        """Returns stdout of the command line argv"""
+
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            passwordmaker.cmd(list(argv))
+        return stdout.getvalue()
+
+    def test_help(self):
+        for argv in (["-h"], ["generate", "-h"], ["batch", "-h"]):
+            with self.assertRaises(SystemExit) as context:
+                self._run(*argv)
+            self.assertEqual(context.exception.code, 0)
+
+    def test_parser_reused(self):
+        self.assertIs(passwordmaker.get_parser(), passwordmaker.get_parser())
+
+    def test_legacy_options(self):
+        # Options without command keep their former meaning
+        res = self._run("-r", "site.com", "-m", "asdf", "-u", "me", "-l",
+                        "before", "-L", "5", "-g", "12")
+        self.assertEqual(res, generatepassword(
+            "md5", "asdf", "site.commeme", 12, FULL_CHARSET,
+            use_leet="before", leet_level=4) + "\n")
+        self.assertEqual(self._run("generate", "-r", "site.com", "-m", "asdf"),
+                         self._run("-r", "site.com", "-m", "asdf"))
+
+    def test_profile(self):
+        with profile() as prof:
+            res = self._run("--profile", "work", "--dir", self.directory,
+                            "-m", "asdf", "-g", "20")
+        # Only the file of the selected profile is read
+        self.assertEqual(prof.counters["settings_io"], 1)
+        settings = load_profile("work", self.directory)
+        self.assertEqual(settings.Length, 12)
+        settings = attr.evolve(settings, MasterPass="asdf", Length=20)
+        self.assertEqual(res, generatepasswordfrom(settings) + "\n")
+
+        with self.assertRaises(SystemExit) as context:
+            self._run("--profile", "wor", "--dir", self.directory, "-m",
+                      "asdf")
+        self.assertIn("work", str(context.exception))
+        with self.assertRaises(SystemExit):
+            self._run("--profile", "nope", "--dir", self.directory, "-m", "x")
+        self.assertRaises(KeyError, load_profile, "../work", self.directory)
+
+    def test_batch(self):
+        infile = os.path.join(self.directory, "jobs.jsonl")
+        with open(infile, "w") as outfile:
+            outfile.write('{"URL": "a.com"}\n{"URL": "b.com", "Length": 4}\n')
+        res = self._run("batch", infile, "--profile", "work", "--dir",
+                        self.directory, "-m", "asdf")
+        records = [json.loads(line) for line in res.splitlines()]
+        self.assertEqual([record["URL"] for record in records],
+                         ["a.com", "b.com"])
+        settings = attr.evolve(load_profile("work", self.directory),
+                               MasterPass="asdf", URL="b.com", Length=4)
+        self.assertEqual(records[1]["Password"],
+                         generatepasswordfrom(settings))
+
+    def test_command_aliases(self):
+        infile = os.path.join(self.directory, "jobs.jsonl")
+        with open(infile, "w") as outfile:
+            outfile.write('{"URL": "a.com"}\n')
+        res = self._run("batch", infile, "-m", "asdf")
+        self.assertEqual(self._run("--batch", infile, "-m", "asdf"), res)
+        self.assertEqual(self._run("-m", "asdf", "--batch=" + infile), res)
+
+        expand = passwordmaker.expand_command_alias
+        self.assertEqual(expand(["--calibrate", "--write-cache"]),
+                         ["calibrate", "--write-cache"])
+        self.assertEqual(expand(["-m", "x", "--", "--batch"]),
+                         ["generate", "-m", "x", "--", "--batch"])
+
+    def test_profiles_import(self):
+        filepath = os.path.join(self.directory, "pwm.site0.setting")
+        os.utime(filepath, (0, 0))
+        infile = os.path.join(self.directory, "import.jsonl")
+        with open(infile, "w") as outfile:
+            outfile.write('{"Name": "new", "URL": "n.com"}\n'
+                          '{"Name": "work", "Length": 5}\n')
+        self.assertEqual(self._run("profiles", "import", infile, "--dir",
+                                   self.directory), "2 profiles imported\n")
+        self.assertEqual(load_profile("new", self.directory).URL, "n.com")
+        self.assertEqual(load_profile("work", self.directory).Length, 5)
+        # Profiles that the import does not change are not rewritten
+        self.assertEqual(os.stat(filepath).st_mtime, 0)
+
+    def test_profiles(self):
+        res = self._run("profiles", "list", "--dir", self.directory)
+        self.assertEqual(res.split(), list_profiles(self.directory))
+        self.assertEqual(len(res.split()), 22)
+
+        res = json.loads(self._run("profiles", "show", "work", "--dir",
+                                   self.directory))
+        self.assertEqual(res["URL"], "work.com")
+        self.assertNotIn("MasterPass", res)
+
+        res = self._run("profiles", "complete", "site1", "--dir",
+                        self.directory)
+        self.assertEqual(res.split(), ["site1"] + ["site1{}".format(i)
+                                                   for i in range(10)])
+
+        res = self._run("profiles", "export", "--dir", self.directory)
+        records = [json.loads(line) for line in res.splitlines()]
+        self.assertEqual(len(records), 22)
+        self.assertEqual(records[0]["Name"], "default")
+        self.assertNotIn("MasterPass", records[0])
+
+    def test_lazy_imports(self):
+        code = ("import sys, passwordmaker; print(sorted(set(sys.modules) & "
+                "{'numpy', 'pwmbulk', 'pwmgui', 'pwmsink', 'tkinter'}))")
+        output = subprocess.check_output([sys.executable, "-c", code],
+                                         cwd=os.path.dirname(pwmlib.__file__))
+        self.assertEqual(output.decode("utf-8").strip(), "[]")
+
+
 if __name__ == '__main__':
     unittest.main()